@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:02
+
+from django.db import migrations
+
+# The community app has no migrations, so Follow is not part of the migration
+# state; its table is read with plain SQL instead.
+FOLLOW_TABLE = 'community_follow'
+
+
+def backfill_follow_counts(apps, schema_editor):
+    connection = schema_editor.connection
+    if FOLLOW_TABLE not in connection.introspection.table_names():
+        return
+    profile_table = schema_editor.quote_name(apps.get_model('accounts', 'Profile')._meta.db_table)
+    follow_table = schema_editor.quote_name(FOLLOW_TABLE)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {profile_table} SET "
+            f"followers_count = (SELECT COUNT(*) FROM {follow_table} WHERE following_id = {profile_table}.user_id), "
+            f"following_count = (SELECT COUNT(*) FROM {follow_table} WHERE follower_id = {profile_table}.user_id)"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_profile_follow_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_follow_counts, migrations.RunPython.noop),
+    ]
@@ -107,6 +107,8 @@ class Profile(models.Model):
     total_books_read = models.IntegerField(default=0)
     total_pages_read = models.IntegerField(default=0)
     total_minutes_read = models.IntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
     achievements = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
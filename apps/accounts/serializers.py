@@ -50,9 +50,10 @@ class ProfileSerializer(serializers.ModelSerializer):
             'id', 'email', 'display_name', 'website', 'twitter',
             'facebook', 'linkedin', 'favorite_genres', 'reading_preferences',
             'social_connections', 'total_books_read', 'total_pages_read',
-            'total_minutes_read', 'achievements', 'created_at', 'updated_at'
+            'total_minutes_read', 'followers_count', 'following_count',
+            'achievements', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'email', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'email', 'followers_count', 'following_count', 'created_at', 'updated_at']
 
 
 class ChangePasswordSerializer(serializers.Serializer):
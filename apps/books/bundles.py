@@ -0,0 +1,169 @@
+"""
+Offline reading bundles.
+
+A bundle is a zip with every published chapter of a book, its table of
+contents and cover. Bundles are named after a hash of the chapter ids and
+``updated_at`` values, so they are built once per content version and reused
+until a chapter actually changes.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import zipfile
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+from .models import Chapter
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def bundle_root():
+    return Path(getattr(settings, 'BOOKS_BUNDLE_ROOT', Path(settings.MEDIA_ROOT) / 'bundles'))
+
+
+def content_version(book):
+    """Hash of the published chapter ids and timestamps plus the cover name."""
+    digest = hashlib.sha256()
+    digest.update(str(book.cover_image or '').encode('utf-8'))
+    chapters = (
+        Chapter.objects.filter(book=book, is_published=True)
+        .order_by('order', 'id')
+        .values_list('id', 'updated_at')
+    )
+    for chapter_id, updated_at in chapters:
+        digest.update(f"{chapter_id}:{updated_at.isoformat()};".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def bundle_path(book, version):
+    return bundle_root() / str(book.id) / f"{version}.zip"
+
+
+def _write_bundle(book, version, path):
+    chapters = (
+        Chapter.objects.filter(book=book, is_published=True)
+        .order_by('order', 'id')
+        .values('id', 'title', 'slug', 'order', 'content')
+    )
+    toc = []
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh, zipfile.ZipFile(fh, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for chapter in chapters.iterator(chunk_size=50):
+                name = f"chapters/{chapter['order']:04d}-{chapter['slug']}.html"
+                archive.writestr(name, chapter['content'])
+                toc.append({
+                    'id': chapter['id'],
+                    'title': chapter['title'],
+                    'slug': chapter['slug'],
+                    'order': chapter['order'],
+                    'path': name,
+                })
+            cover = None
+            if book.cover_image:
+                cover = f"cover{Path(book.cover_image.name).suffix}"
+                with book.cover_image.open('rb') as image:
+                    archive.writestr(cover, image.read())
+            archive.writestr('toc.json', json.dumps({
+                'book_id': book.id,
+                'title': book.title,
+                'slug': book.slug,
+                'version': version,
+                'cover': cover,
+                'chapters': toc,
+            }))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Older versions of this book's bundle are no longer served.
+    for stale in path.parent.glob('*.zip'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+
+def open_bundle(book):
+    """
+    Return ``(file, version)`` for the current bundle, building it if needed.
+
+    The bundle is opened rather than returned by path: a concurrent rebuild
+    may unlink it as stale at any time, and an open file stays readable.
+    """
+    while True:
+        version = content_version(book)
+        path = bundle_path(book, version)
+        try:
+            return open(path, 'rb'), version
+        except FileNotFoundError:
+            _write_bundle(book, version, path)
+        try:
+            return open(path, 'rb'), version
+        except FileNotFoundError:
+            # Removed by a build of a newer version; serve that one instead.
+            continue
+
+
+def _iter_file(fh, start, length):
+    try:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fh.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
+
+
+def bundle_response(request, fh, version, filename):
+    """Serve an open bundle with ETag revalidation and single byte-range support."""
+    etag = f'"{version}"'
+    if request.headers.get('If-None-Match') == etag:
+        fh.close()
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+
+    size = os.fstat(fh.fileno()).st_size
+    match = RANGE_RE.match(request.headers.get('Range', '').strip())
+    if_range = request.headers.get('If-Range')
+    if match and (not if_range or if_range == etag):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            start = max(size - int(last), 0)
+            end = size - 1
+        else:
+            start, end = 0, size - 1
+        if start > end or start >= size:
+            fh.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        response = StreamingHttpResponse(
+            _iter_file(fh, start, end - start + 1),
+            status=206,
+            content_type='application/zip',
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        response = FileResponse(fh, as_attachment=True, filename=filename, content_type='application/zip')
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    return response
@@ -0,0 +1,53 @@
+"""
+Bulk book lookups for rows that only carry a ``book_id``.
+
+Reader, marketplace and review models store ``book_id`` as a plain integer,
+so showing titles next to them used to mean one ``Book`` query per row.
+``hydrate_books`` resolves any number of ids with one cache round trip and at
+most one ``id__in`` query.
+"""
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+from .models import Book
+
+CACHE_TIMEOUT = 60 * 15
+SUMMARY_FIELDS = [
+    'id', 'title', 'slug', 'subtitle', 'cover_image', 'format',
+    'language', 'pages', 'price', 'is_free', 'status',
+]
+
+
+def _cache_key(book_id):
+    return f"books:summary:{book_id}"
+
+
+def _summary(row):
+    cover = row['cover_image']
+    row['cover_image'] = default_storage.url(cover) if cover else None
+    row['price'] = str(row['price'])
+    return row
+
+
+def hydrate_books(book_ids):
+    """Return ``{book_id: summary_dict}`` for the ids that exist."""
+    book_ids = {book_id for book_id in book_ids if book_id is not None}
+    if not book_ids:
+        return {}
+
+    cached = cache.get_many([_cache_key(book_id) for book_id in book_ids])
+    books = {summary['id']: summary for summary in cached.values()}
+    missing = book_ids - books.keys()
+    if missing:
+        loaded = {
+            row['id']: _summary(row)
+            for row in Book.objects.filter(id__in=missing).values(*SUMMARY_FIELDS)
+        }
+        cache.set_many({_cache_key(book_id): summary for book_id, summary in loaded.items()}, CACHE_TIMEOUT)
+        books.update(loaded)
+    return books
+
+
+def invalidate_books(*book_ids):
+    cache.delete_many([_cache_key(book_id) for book_id in book_ids])
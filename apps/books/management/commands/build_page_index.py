@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from apps.books.models import Book
+from apps.books.page_index import build_book_index, rebuild_stale_indexes
+
+
+class Command(BaseCommand):
+    help = "Rebuild the character offset to page number index for books."
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help="Only rebuild these books.")
+        parser.add_argument('--stale', action='store_true', help="Only rebuild books whose chapters changed.")
+
+    def handle(self, *args, **options):
+        if options['stale']:
+            count = rebuild_stale_indexes()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt page index for {count} stale books."))
+            return
+        books = Book.objects.all()
+        if options['slugs']:
+            books = books.filter(slug__in=options['slugs'])
+        count = 0
+        for book_id in books.values_list('id', flat=True).iterator():
+            build_book_index(book_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt page index for {count} books."))
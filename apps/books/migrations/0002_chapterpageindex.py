@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChapterPageIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('format', models.CharField(choices=[('epub', 'EPUB'), ('mobi', 'MOBI'), ('pdf', 'PDF'), ('audiobook', 'Audiobook')], max_length=20)),
+                ('page_starts', models.BinaryField()),
+                ('page_count', models.PositiveIntegerField(default=0)),
+                ('first_page', models.PositiveIntegerField(default=1)),
+                ('char_count', models.PositiveIntegerField(default=0)),
+                ('book_char_offset', models.PositiveBigIntegerField(default=0)),
+                ('book_char_total', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('chapter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_indexes', to='books.chapter')),
+            ],
+            options={
+                'verbose_name': 'Chapter Page Index',
+                'verbose_name_plural': 'Chapter Page Indexes',
+                'unique_together': {('chapter', 'format')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_chapterpageindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageIndexState',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='page_index_state', serialize=False, to='books.book')),
+                ('dirtied_at', models.DateTimeField()),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Page Index State',
+                'verbose_name_plural': 'Page Index States',
+            },
+        ),
+    ]
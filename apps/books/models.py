@@ -1,6 +1,8 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
+from django.utils import timezone
+from decimal import Decimal
 
 
 class Category(models.Model):
@@ -55,6 +57,26 @@ class Author(models.Model):
         return self.name
 
 
+class BookQuerySet(models.QuerySet):
+    
+    def with_effective_price(self, now=None):
+        """Annotate ``current_price`` with the same rules as ``Book.effective_price``."""
+        now = now or timezone.now()
+        return self.annotate(
+            current_price=models.Case(
+                models.When(is_free=True, then=models.Value(Decimal('0.00'))),
+                models.When(
+                    discount_price__gt=0,
+                    discount_start__lte=now,
+                    discount_end__gte=now,
+                    then=models.F('discount_price'),
+                ),
+                default=models.F('price'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+        )
+
+
 class Book(models.Model):
     """Book model for ebooks."""
     
@@ -131,6 +153,8 @@ class Book(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = BookQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('Book')
         verbose_name_plural = _('Books')
@@ -176,10 +200,31 @@ class Chapter(models.Model):
     
     def __str__(self):
         return f"{self.book.title} - {self.title}"
+    
+    # Fields whose change moves page boundaries in the book.
+    PAGE_INDEX_FIELDS = ('book_id', 'content', 'order', 'is_published')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so metadata-only edits can skip the
+        # page index rebuild.
+        instance._loaded_index_values = {
+            field: instance.__dict__[field] for field in cls.PAGE_INDEX_FIELDS if field in instance.__dict__
+        }
+        return instance
+    
+    def page_index_changed(self):
+        """Whether the last save could have moved page boundaries."""
+        loaded = getattr(self, '_loaded_index_values', None)
+        if loaded is None:
+            return True
+        return any(
+            self.__dict__[field] != loaded[field] if field in loaded else field in self.__dict__
+            for field in self.PAGE_INDEX_FIELDS
+        )
 
 
-from django.utils import timezone
-
 class BookFile(models.Model):
     """Model for book file versions and formats."""
     book = models.ForeignKey(
@@ -205,3 +250,44 @@ class BookFile(models.Model):
     @property
     def size_mb(self):
         return round(self.size / (1024 * 1024), 2)
+
+
+class PageIndexState(models.Model):
+    """Tracks which books need their page index rebuilt."""
+    book = models.OneToOneField(
+        Book,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='page_index_state'
+    )
+    dirtied_at = models.DateTimeField()
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = _('Page Index State')
+        verbose_name_plural = _('Page Index States')
+
+
+class ChapterPageIndex(models.Model):
+    """Canonical page boundaries of a chapter for one format."""
+    chapter = models.ForeignKey(
+        Chapter,
+        on_delete=models.CASCADE,
+        related_name='page_indexes'
+    )
+    format = models.CharField(max_length=20, choices=Book.Format.choices)
+    page_starts = models.BinaryField()  # Packed array('I') of page start offsets
+    page_count = models.PositiveIntegerField(default=0)
+    first_page = models.PositiveIntegerField(default=1)
+    char_count = models.PositiveIntegerField(default=0)
+    book_char_offset = models.PositiveBigIntegerField(default=0)
+    book_char_total = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Chapter Page Index')
+        verbose_name_plural = _('Chapter Page Indexes')
+        unique_together = ['chapter', 'format']
+    
+    def __str__(self):
+        return f"Chapter {self.chapter_id} ({self.format}): {self.page_count} pages"
@@ -0,0 +1,223 @@
+"""
+Canonical page numbers for character offsets.
+
+For every chapter and format we store the character offsets where pages start
+as a packed ``array('I')``, plus where the chapter sits in the whole book.
+Converting a position is then a binary search over that array and never needs
+the chapter text.
+
+Chapter edits that can move page boundaries (content, order, publishing)
+only mark the book dirty in ``PageIndexState``. The chapter text is read
+later by ``build_page_index --stale``, off the request path. Until then,
+positions resolve against the previous index.
+"""
+
+from array import array
+from bisect import bisect_right
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Book, Chapter, ChapterPageIndex, PageIndexState
+
+# Characters per canonical page for each paginated format.
+PAGE_CHARS = {
+    Book.Format.EPUB: 1800,
+    Book.Format.MOBI: 1800,
+    Book.Format.PDF: 2400,
+}
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def page_chars():
+    return getattr(settings, 'BOOKS_PAGE_CHARS', PAGE_CHARS)
+
+
+def pack_offsets(offsets):
+    return array('I', offsets).tobytes()
+
+
+def unpack_offsets(data):
+    offsets = array('I')
+    offsets.frombytes(bytes(data))
+    return offsets
+
+
+def split_pages(content, chars_per_page):
+    """Return page start offsets, breaking at the last whitespace before each boundary."""
+    starts = [0]
+    length = len(content)
+    start = 0
+    while start + chars_per_page < length:
+        boundary = start + chars_per_page
+        space = content.rfind(' ', start + chars_per_page // 2, boundary)
+        start = space + 1 if space != -1 else boundary
+        starts.append(start)
+    return starts
+
+
+class PagePosition:
+    """Resolved page and book percentage for one chapter offset."""
+
+    def __init__(self, page_number, percent_complete):
+        self.page_number = page_number
+        self.percent_complete = percent_complete
+
+
+class PageIndex:
+    """In-memory form of a ``ChapterPageIndex`` row."""
+
+    def __init__(self, page_starts, first_page, book_char_offset, book_char_total, char_count):
+        self.page_starts = page_starts
+        self.first_page = first_page
+        self.book_char_offset = book_char_offset
+        self.book_char_total = book_char_total
+        self.char_count = char_count
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            unpack_offsets(row['page_starts']),
+            row['first_page'],
+            row['book_char_offset'],
+            row['book_char_total'],
+            row['char_count'],
+        )
+
+    def locate(self, offset):
+        offset = min(max(offset, 0), self.char_count)
+        page_number = self.first_page + bisect_right(self.page_starts, offset) - 1
+        if self.book_char_total:
+            percent = Decimal(self.book_char_offset + offset) * 100 / self.book_char_total
+        else:
+            percent = Decimal(0)
+        return PagePosition(page_number, percent.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+
+
+def _cache_key(chapter_id, fmt):
+    return f"books:page-index:{chapter_id}:{fmt}"
+
+
+def build_book_index(book):
+    """Rebuild the page index of every published chapter of ``book`` (or its id) for all formats."""
+    chapters = list(
+        Chapter.objects.filter(book=book, is_published=True)
+        .order_by('order', 'id')
+        .values_list('id', 'content')
+    )
+    total = sum(len(content) for _, content in chapters)
+
+    rows = []
+    for fmt, chars_per_page in page_chars().items():
+        char_offset = 0
+        next_page = 1
+        for chapter_id, content in chapters:
+            starts = split_pages(content, chars_per_page)
+            rows.append(ChapterPageIndex(
+                chapter_id=chapter_id,
+                format=fmt,
+                page_starts=pack_offsets(starts),
+                page_count=len(starts),
+                first_page=next_page,
+                char_count=len(content),
+                book_char_offset=char_offset,
+                book_char_total=total,
+            ))
+            char_offset += len(content)
+            next_page += len(starts)
+
+    with transaction.atomic():
+        stale = ChapterPageIndex.objects.filter(chapter__book=book)
+        chapter_ids = set(stale.values_list('chapter_id', flat=True))
+        chapter_ids.update(chapter_id for chapter_id, _ in chapters)
+        stale.delete()
+        ChapterPageIndex.objects.bulk_create(rows)
+    cache.delete_many([
+        _cache_key(chapter_id, fmt)
+        for chapter_id in chapter_ids
+        for fmt in [None, *Book.Format.values]
+    ])
+    return rows
+
+
+def mark_page_index_dirty(book_ids):
+    """Flag books for the next ``rebuild_stale_indexes`` with one upsert."""
+    now = timezone.now()
+    PageIndexState.objects.bulk_create(
+        [PageIndexState(book_id=book_id, dirtied_at=now) for book_id in set(book_ids)],
+        update_conflicts=True,
+        unique_fields=['book'],
+        update_fields=['dirtied_at'],
+    )
+
+
+def rebuild_stale_indexes():
+    """Rebuild the page index of every dirty book; return how many were rebuilt."""
+    dirty = list(
+        PageIndexState.objects.filter(
+            Q(refreshed_at__isnull=True) | Q(refreshed_at__lt=F('dirtied_at'))
+        ).values_list('book_id', flat=True)
+    )
+    for book_id in dirty:
+        started_at = timezone.now()
+        build_book_index(book_id)
+        # A book dirtied again while it was rebuilt stays dirty.
+        PageIndexState.objects.filter(book_id=book_id).update(refreshed_at=started_at)
+    return len(dirty)
+
+
+def get_page_indexes(chapter_formats):
+    """
+    Return ``{(chapter_id, format): PageIndex}`` for ``(chapter_id, format)``
+    pairs. A ``None`` format means the book's own format. Rows come from the
+    cache where possible and all misses are loaded with one query.
+    """
+    chapter_formats = set(chapter_formats)
+    found = {}
+    cached = cache.get_many([_cache_key(*pair) for pair in chapter_formats])
+    for pair in chapter_formats:
+        row = cached.get(_cache_key(*pair))
+        if row is not None:
+            found[pair] = row
+    missing = {pair for pair in chapter_formats - found.keys() if pair[1] is not None}
+    implicit = {chapter_id for chapter_id, fmt in chapter_formats - found.keys() if fmt is None}
+
+    if missing or implicit:
+        queryset = ChapterPageIndex.objects.none()
+        if missing:
+            queryset = ChapterPageIndex.objects.filter(
+                chapter_id__in={chapter_id for chapter_id, _ in missing}
+            )
+        if implicit:
+            queryset = queryset | ChapterPageIndex.objects.filter(
+                chapter_id__in=implicit, format=F('chapter__book__format')
+            )
+        fields = [
+            'chapter_id', 'format', 'page_starts', 'first_page',
+            'book_char_offset', 'book_char_total', 'char_count', 'chapter__book__format',
+        ]
+        loaded = {}
+        for row in queryset.values(*fields):
+            row['page_starts'] = bytes(row['page_starts'])
+            book_format = row.pop('chapter__book__format')
+            key = (row['chapter_id'], row['format'])
+            loaded[_cache_key(*key)] = row
+            if key in missing:
+                found[key] = row
+            if row['chapter_id'] in implicit and row['format'] == book_format:
+                found[(row['chapter_id'], None)] = row
+                loaded[_cache_key(row['chapter_id'], None)] = row
+        if loaded:
+            cache.set_many(loaded, CACHE_TIMEOUT)
+
+    return {key: PageIndex.from_row(row) for key, row in found.items()}
+
+
+def locate(chapter_id, offset, fmt=None):
+    """Return the ``PagePosition`` of ``offset`` in a chapter, or ``None`` if unindexed."""
+    index = get_page_indexes([(chapter_id, fmt)]).get((chapter_id, fmt))
+    return index.locate(offset) if index else None
@@ -1,5 +1,38 @@
+from django.db import models
 from rest_framework import serializers
 from .models import Category, Author, Book, Chapter, BookFile
+from apps.reviews.histograms import rating_histogram
+from .hydration import hydrate_books
+
+
+class BookSummaryField(serializers.ReadOnlyField):
+    """
+    Read-only book summary for models that store a bare ``book_id``.
+    
+    Pair it with ``BookHydratingListSerializer`` so a list resolves all of its
+    books in one lookup instead of one per row.
+    """
+    
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'book_id')
+        super().__init__(**kwargs)
+    
+    def to_representation(self, book_id):
+        books = self.context.get('hydrated_books')
+        if books is None or book_id not in books:
+            books = hydrate_books([book_id])
+        return books.get(book_id)
+
+
+class BookHydratingListSerializer(serializers.ListSerializer):
+    """List serializer that hydrates every ``book_id`` in the page at once."""
+    
+    def to_representation(self, data):
+        items = data.all() if isinstance(data, models.manager.BaseManager) else data
+        items = list(items)
+        hydrated = self.context.setdefault('hydrated_books', {})
+        hydrated.update(hydrate_books({item.book_id for item in items} - hydrated.keys()))
+        return super().to_representation(items)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -39,6 +72,18 @@ class ChapterSerializer(serializers.ModelSerializer):
             'is_free', 'is_published', 'published_at', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'word_count', 'created_at', 'updated_at']
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Readers who do not own the book only get the content of free chapters.
+        # Views pass either ``locked`` for a single book or a ``can_read``
+        # callable taking a book id when chapters may span books.
+        locked = self.context.get('locked')
+        if locked is None and 'can_read' in self.context:
+            locked = not self.context['can_read'](instance.book_id)
+        if locked and not instance.is_free:
+            data['content'] = None
+        return data
 
 
 class ChapterDetailSerializer(ChapterSerializer):
@@ -75,17 +120,27 @@ class BookListSerializer(serializers.ModelSerializer):
 
 class BookDetailSerializer(BookListSerializer):
     """Detailed serializer for Book."""
-    chapters = ChapterSerializer(many=True, read_only=True)
+    chapters = serializers.SerializerMethodField()
     files = BookFileSerializer(many=True, read_only=True)
+    rating_histogram = serializers.SerializerMethodField()
     
     class Meta(BookListSerializer.Meta):
         fields = BookListSerializer.Meta.fields + [
             'description', 'isbn', 'publisher', 'publication_date',
             'word_count', 'reading_time_hours', 'preview_chapter', 'sample_content',
             'status', 'is_explicit', 'requires_adult_verification',
-            'download_count', 'chapters', 'files', 'created_at', 'updated_at'
+            'download_count', 'chapters', 'files', 'rating_histogram', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'download_count', 'chapters', 'files', 'created_at', 'updated_at']
+    
+    def get_chapters(self, obj):
+        # Unless the view says otherwise, paid chapter content is withheld.
+        context = {**self.context, 'locked': self.context.get('locked', True)}
+        chapters = obj.chapters.filter(is_published=True).order_by('order')
+        return ChapterSerializer(chapters, many=True, context=context).data
+    
+    def get_rating_histogram(self, obj):
+        return rating_histogram(obj.id)
 
 
 class BookCreateUpdateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from .models import Category, Author, Book, Chapter
+from .slugs import RESOLVERS
+from .page_index import mark_page_index_dirty
+from .hydration import invalidate_books
+
+
+def _resolver_for(sender):
+    return RESOLVERS.get(sender._meta.label)
+
+
+PRICE_FIELDS = ['price', 'is_free', 'discount_price', 'discount_start', 'discount_end']
+
+
+@receiver(pre_save, sender=Book)
+@receiver(pre_save, sender=Author)
+@receiver(pre_save, sender=Category)
+def remember_previous_values(sender, instance, **kwargs):
+    """Record the stored slug (and book pricing) so changes can be detected after save."""
+    instance._previous_slug = None
+    instance._previous_pricing = None
+    if not instance.pk:
+        return
+    fields = ['slug'] + (PRICE_FIELDS if sender is Book else [])
+    previous = sender._default_manager.filter(pk=instance.pk).values(*fields).first()
+    if previous:
+        instance._previous_slug = previous.pop('slug')
+        if sender is Book:
+            instance._previous_pricing = previous
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Category)
+def invalidate_slug_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_slug', None)
+    if created or previous != instance.slug:
+        # After commit, so no process can cache the new slug as missing.
+        resolver, slug = _resolver_for(sender), instance.slug
+        transaction.on_commit(lambda: resolver.invalidate(previous, slug))
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Category)
+def invalidate_slug_on_delete(sender, instance, **kwargs):
+    resolver, slug = _resolver_for(sender), instance.slug
+    transaction.on_commit(lambda: resolver.invalidate(slug))
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_summary(sender, instance, **kwargs):
+    invalidate_books(instance.id)
+
+
+def pricing_changed(book):
+    """True if the last save of ``book`` changed any price field."""
+    previous = getattr(book, '_previous_pricing', None)
+    if previous is None:
+        return True
+    return any(previous[field] != getattr(book, field) for field in PRICE_FIELDS)
+
+
+@receiver(post_save, sender=Chapter)
+def chapter_saved(sender, instance, created, **kwargs):
+    """Content, order and visibility edits shift page numbers for the rest of the book."""
+    if kwargs.get('raw') or not (created or instance.page_index_changed()):
+        return
+    loaded = getattr(instance, '_loaded_index_values', {})
+    mark_page_index_dirty({instance.book_id, loaded.get('book_id', instance.book_id)})
+    instance._loaded_index_values = {
+        field: instance.__dict__[field] for field in Chapter.PAGE_INDEX_FIELDS if field in instance.__dict__
+    }
+
+
+@receiver(pre_delete, sender=Chapter)
+def chapter_deleted(sender, instance, origin=None, **kwargs):
+    # Deleting the book cascades to its chapters and their indexes. This runs
+    # before the delete so a deferred book_id can still be loaded.
+    if isinstance(origin, Book):
+        return
+    mark_page_index_dirty({instance.book_id})
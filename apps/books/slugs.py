@@ -0,0 +1,230 @@
+"""
+Slug to primary key resolution for slug-routed catalog models.
+
+Lookups go through three tiers: an in-process LRU, the shared Django cache
+and finally the database. A per-process Bloom filter of every known slug sits
+in front of all three so unknown slugs (crawler 404 storms) are rejected
+without touching the cache or the database.
+
+The filter is trusted, so it must learn about every new slug. Writers call
+``invalidate`` with the slugs they changed. Each slug is appended to a change
+log in the shared cache: a sequence counter plus one key per entry. On every
+lookup a process reads the counter, adds entries it has not seen to its
+filter and drops them from its LRU. Slugs are only ever added to a filter;
+renamed and deleted slugs stay in it as harmless false positives. A full
+table scan happens only when a process starts, or when it has fallen behind
+by more than ``LOG_CATCH_UP`` entries or the log entries it needs have
+expired.
+
+This requires a cache backend shared by every process (``CACHES`` points at
+Redis). With a per-process cache, a process would never learn about slugs
+created by another one.
+"""
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Stored in the LRU and the shared cache for slugs that slipped past the
+# Bloom filter but do not exist, so repeated misses stay cheap too.
+MISSING = -1
+# A process further behind the change log than this rebuilds its filter.
+LOG_CATCH_UP = 1000
+LOG_TIMEOUT = 24 * 60 * 60
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping used as the in-process tier."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class SlugResolver:
+    """
+    Resolve ``slug`` values of a model to primary keys.
+
+    The resolver works on the unfiltered table; callers still apply their own
+    queryset filters (status, is_active, ...) when fetching by primary key.
+    Writers call ``invalidate`` on slug changes, which publishes the slugs to
+    the shared change log.
+    """
+
+    def __init__(self, model_label, field='slug', maxsize=None, timeout=None):
+        self.model_label = model_label
+        self.field = field
+        self.maxsize = maxsize or getattr(settings, 'SLUG_RESOLVER_LRU_SIZE', 4096)
+        self.timeout = timeout or getattr(settings, 'SLUG_RESOLVER_CACHE_TIMEOUT', 60 * 60)
+        self.prefix = f"slug:{model_label.lower()}"
+        self._local = LRUCache(self.maxsize)
+        self._bloom = None
+        self._seen = 0
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        from django.apps import apps
+        return apps.get_model(self.model_label)
+
+    def _key(self, slug):
+        return f"{self.prefix}:{slug}"
+
+    @property
+    def _sequence_key(self):
+        return f"{self.prefix}:log"
+
+    def _log_key(self, number):
+        return f"{self.prefix}:log:{number}"
+
+    def _sequence(self):
+        return cache.get(self._sequence_key) or 0
+
+    def _rebuild(self, sequence):
+        # The sequence is read before the scan, so slugs logged during the
+        # scan are applied again on the next lookup; adding twice is harmless.
+        queryset = self.model._default_manager.values_list(self.field, flat=True)
+        bloom = BloomFilter(queryset.count() * 2 + 1024)
+        for slug in queryset.iterator(chunk_size=5000):
+            bloom.add(slug)
+        self._local.clear()
+        self._bloom = bloom
+        self._seen = sequence
+        return bloom
+
+    def _known_slugs(self):
+        """Return the Bloom filter, brought up to date with the change log."""
+        sequence = self._sequence()
+        bloom = self._bloom
+        if bloom is not None and self._seen >= sequence:
+            return bloom
+        with self._lock:
+            bloom = self._bloom
+            if bloom is None or sequence - self._seen > LOG_CATCH_UP:
+                return self._rebuild(sequence)
+            if self._seen >= sequence:
+                return bloom
+            keys = [self._log_key(number) for number in range(self._seen + 1, sequence + 1)]
+            logged = cache.get_many(keys)
+            if len(logged) < len(keys):
+                # Entries expired, or a writer has not stored its entry yet.
+                return self._rebuild(sequence)
+            for slug in logged.values():
+                bloom.add(slug)
+                self._local.delete(slug)
+            self._seen = sequence
+        return bloom
+
+    def resolve(self, slug, fresh=False):
+        """
+        Return the primary key for ``slug`` or ``None`` if it does not exist.
+        ``fresh=True`` skips the cache tiers, for callers that found a cached
+        answer to be stale.
+        """
+        if not slug or slug not in self._known_slugs():
+            return None
+
+        pk = None if fresh else self._local.get(slug)
+        if pk is None:
+            pk = None if fresh else cache.get(self._key(slug))
+            if pk is None:
+                pk = (
+                    self.model._default_manager
+                    .filter(**{self.field: slug})
+                    .values_list('pk', flat=True)
+                    .first()
+                )
+                if pk is None:
+                    pk = MISSING
+                cache.set(self._key(slug), pk, self.timeout)
+            self._local.set(slug, pk)
+        return None if pk == MISSING else pk
+
+    def resolve_many(self, slugs):
+        """Return a ``{slug: pk}`` dict for the slugs that exist."""
+        resolved = {}
+        for slug in slugs:
+            pk = self.resolve(slug)
+            if pk is not None:
+                resolved[slug] = pk
+        return resolved
+
+    def invalidate(self, *slugs):
+        """Forget cached entries for ``slugs`` and publish them to every process's filter."""
+        slugs = [slug for slug in slugs if slug]
+        cache.delete_many([self._key(slug) for slug in slugs])
+        for slug in slugs:
+            try:
+                number = cache.incr(self._sequence_key)
+            except ValueError:
+                cache.add(self._sequence_key, 0, None)
+                number = cache.incr(self._sequence_key)
+            cache.set(self._log_key(number), slug, LOG_TIMEOUT)
+        with self._lock:
+            if self._bloom is not None:
+                for slug in slugs:
+                    self._bloom.add(slug)
+            for slug in slugs:
+                self._local.delete(slug)
+
+
+book_slugs = SlugResolver('books.Book')
+author_slugs = SlugResolver('books.Author')
+category_slugs = SlugResolver('books.Category')
+
+RESOLVERS = {
+    'books.Book': book_slugs,
+    'books.Author': author_slugs,
+    'books.Category': category_slugs,
+}
@@ -1,9 +1,14 @@
 from rest_framework import viewsets, status, views
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from apps.marketplace.entitlements import can_read
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from django.db.models import F
 from .models import Category, Author, Book, Chapter, BookFile
+from .slugs import book_slugs, author_slugs, category_slugs
+from .bundles import open_bundle, bundle_response
 from .serializers import (
     CategorySerializer, AuthorSerializer,
     BookListSerializer, BookDetailSerializer, BookCreateUpdateSerializer,
@@ -11,11 +16,38 @@ from .serializers import (
 )
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class SlugResolverMixin:
+    """
+    Resolve the URL slug through a cached ``SlugResolver`` and fetch the
+    object by primary key, so unknown slugs 404 without a database query.
+    A cached primary key whose row no longer carries the slug is resolved
+    again from the database.
+    """
+    slug_resolver = None
+    
+    def get_object_pk(self, fresh=False):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        pk = self.slug_resolver.resolve(self.kwargs[lookup_url_kwarg], fresh=fresh)
+        if pk is None:
+            raise Http404
+        return pk
+    
+    def get_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        slug = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        obj = queryset.filter(pk=self.get_object_pk()).first()
+        if obj is None or getattr(obj, self.slug_resolver.field) != slug:
+            obj = get_object_or_404(queryset, pk=self.get_object_pk(fresh=True))
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class CategoryViewSet(SlugResolverMixin, viewsets.ModelViewSet):
     """ViewSet for Category CRUD operations."""
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
     lookup_field = 'slug'
+    slug_resolver = category_slugs
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -25,24 +57,26 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class AuthorViewSet(viewsets.ModelViewSet):
+class AuthorViewSet(SlugResolverMixin, viewsets.ModelViewSet):
     """ViewSet for Author CRUD operations."""
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     lookup_field = 'slug'
+    slug_resolver = author_slugs
     
     @action(detail=True, methods=['get'])
     def books(self, request, slug=None):
-        author = self.get_object()
-        books = author.books.filter(status=Book.Status.PUBLISHED)
+        # Authors are unfiltered, so the resolved id is enough to list books.
+        books = Book.objects.filter(authors=self.get_object_pk(), status=Book.Status.PUBLISHED)
         serializer = BookListSerializer(books, many=True)
         return Response(serializer.data)
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(SlugResolverMixin, viewsets.ModelViewSet):
     """ViewSet for Book CRUD operations."""
     queryset = Book.objects.all()
     lookup_field = 'slug'
+    slug_resolver = book_slugs
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -64,12 +98,18 @@ class BookViewSet(viewsets.ModelViewSet):
         # Filter by category
         category = self.request.query_params.get('category')
         if category:
-            queryset = queryset.filter(categories__slug=category)
+            category_id = category_slugs.resolve(category)
+            if category_id is None:
+                return queryset.none()
+            queryset = queryset.filter(categories=category_id)
         
         # Filter by author
         author = self.request.query_params.get('author')
         if author:
-            queryset = queryset.filter(authors__slug=author)
+            author_id = author_slugs.resolve(author)
+            if author_id is None:
+                return queryset.none()
+            queryset = queryset.filter(authors=author_id)
         
         # Filter by format
         format_filter = self.request.query_params.get('format')
@@ -100,23 +140,42 @@ class BookViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         # Increment view count
         Book.objects.filter(id=instance.id).update(view_count=F('view_count') + 1)
-        serializer = self.get_serializer(instance)
+        context = self.get_serializer_context()
+        context['locked'] = not can_read(request.user, instance.id)
+        serializer = self.get_serializer(instance, context=context)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def chapters(self, request, slug=None):
         book = self.get_object()
         chapters = book.chapters.filter(is_published=True).order_by('order')
-        serializer = ChapterSerializer(chapters, many=True)
+        serializer = ChapterSerializer(chapters, many=True, context={'locked': not can_read(request.user, book.id)})
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
     def chapter(self, request, slug=None, chapter_slug=None):
         book = self.get_object()
-        chapter = get_object_or_404(Chapter, book=book, slug=chapter_slug)
-        serializer = ChapterSerializer(chapter)
+        chapter = get_object_or_404(Chapter, book=book, slug=chapter_slug, is_published=True)
+        if not chapter.is_free and not can_read(request.user, book.id):
+            return Response(
+                {"error": "Purchase this book to read this chapter."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        serializer = ChapterSerializer(chapter, context={'locked': False})
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'], url_path='offline-bundle', permission_classes=[IsAuthenticated])
+    def offline_bundle(self, request, slug=None):
+        """Download all published chapters, TOC and cover as one zip."""
+        book = self.get_object()
+        if not can_read(request.user, book.id):
+            return Response(
+                {"error": "Purchase this book to download it."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        bundle, version = open_bundle(book)
+        return bundle_response(request, bundle, version, f"{book.slug}.zip")
+    
     @action(detail=True, methods=['post'])
     def submit_for_review(self, request, slug=None):
         book = self.get_object()
@@ -134,13 +193,30 @@ class ChapterViewSet(viewsets.ModelViewSet):
     """ViewSet for Chapter CRUD operations."""
     queryset = Chapter.objects.all()
     serializer_class = ChapterSerializer
+    lookup_field = 'slug'
+    lookup_url_kwarg = 'chapter_slug'
     
     def get_queryset(self):
         queryset = super().get_queryset()
         book_slug = self.kwargs.get('book_slug')
         if book_slug:
-            queryset = queryset.filter(book__slug=book_slug)
+            book_id = book_slugs.resolve(book_slug)
+            if book_id is None:
+                return queryset.none()
+            queryset = queryset.filter(book_id=book_id)
+        if self.request.method in SAFE_METHODS and not self.request.user.is_staff:
+            queryset = queryset.filter(is_published=True)
         return queryset
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        user = self.request.user
+        book_id = book_slugs.resolve(self.kwargs.get('book_slug', ''))
+        if book_id is not None:
+            context['locked'] = not can_read(user, book_id)
+        else:
+            context['can_read'] = lambda chapter_book_id: can_read(user, chapter_book_id)
+        return context
 
 
 class BookFileViewSet(viewsets.ModelViewSet):
@@ -0,0 +1,153 @@
+"""
+Follow graph.
+
+``Profile.followers_count`` and ``Profile.following_count`` are kept up to
+date with ``F()`` updates on every follow and unfollow, so profile views
+never count ``Follow`` rows. ``rebuild_follow_counts`` recounts them after
+writes that bypass signals.
+
+``compute_suggestions`` loads the whole follow graph once into CSR arrays
+(``indptr``/``indices`` as compact ``array`` buffers over dense user
+indices). For every user it scores the accounts followed by the people they
+follow (friends of friends). Each path is weighted by
+``1 / log2(2 + out-degree)`` of the intermediate user, so following someone
+who follows everybody says little. The top ``k`` candidates per user are
+stored as ``FollowSuggestion`` rows.
+"""
+
+import heapq
+import math
+from array import array
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from apps.accounts.models import Profile
+from .models import Follow, FollowSuggestion
+
+TOP_K = 20
+# Users following more accounts than this are skipped as intermediates; they
+# dominate the work and carry almost no signal.
+MAX_DEGREE = 2000
+CHUNK_SIZE = 1000
+
+
+def _bump(user_id, field, delta):
+    updated = Profile.objects.filter(user_id=user_id).update(**{field: Greatest(F(field) + delta, 0)})
+    # A missing profile is only created on a follow; it is counted from scratch.
+    if not updated and delta > 0:
+        Profile.objects.get_or_create(user_id=user_id, defaults={
+            'followers_count': Follow.objects.filter(following_id=user_id).count(),
+            'following_count': Follow.objects.filter(follower_id=user_id).count(),
+        })
+
+
+def follow_counted(follower_id, following_id, delta, skip_user_id=None):
+    """
+    Apply a follow (``delta=1``) or unfollow (``delta=-1``) to both profiles'
+    counters, except ``skip_user_id``'s (a user being deleted).
+    """
+    if follower_id != skip_user_id:
+        _bump(follower_id, 'following_count', delta)
+    if following_id != skip_user_id:
+        _bump(following_id, 'followers_count', delta)
+
+
+def follower_count(user_id):
+    count = Profile.objects.filter(user_id=user_id).values_list('followers_count', flat=True).first()
+    if count is None:
+        count = Follow.objects.filter(following_id=user_id).count()
+    return count
+
+
+def rebuild_follow_counts():
+    """Recount every profile's follow counters; return the number of profiles updated."""
+    def counts(field):
+        return Coalesce(Subquery(
+            Follow.objects.filter(**{field: OuterRef('user_id')})
+            .values(field)
+            .annotate(total=Count('id'))
+            .values('total')
+        ), 0)
+
+    return Profile.objects.update(
+        followers_count=counts('following_id'),
+        following_count=counts('follower_id'),
+    )
+
+
+class FollowGraph:
+    """
+    Follow edges in CSR form: the accounts followed by ``user_ids[i]`` are
+    ``indices[indptr[i]:indptr[i + 1]]``.
+    """
+
+    def __init__(self, user_ids, indptr, indices):
+        self.user_ids = user_ids
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def load(cls):
+        user_ids = array('q', get_user_model().objects.order_by('id').values_list('id', flat=True))
+        position = {user_id: index for index, user_id in enumerate(user_ids)}
+        indptr = array('q', [0]) * (len(user_ids) + 1)
+        indices = array('q')
+        edges = Follow.objects.order_by('follower_id', 'following_id').values_list('follower_id', 'following_id')
+        for follower_id, following_id in edges.iterator(chunk_size=10000):
+            if follower_id not in position or following_id not in position:
+                # The account was created after the user list was read.
+                continue
+            indptr[position[follower_id] + 1] += 1
+            indices.append(position[following_id])
+        for index in range(len(user_ids)):
+            indptr[index + 1] += indptr[index]
+        return cls(user_ids, indptr, indices)
+
+    def following(self, index):
+        return self.indices[self.indptr[index]:self.indptr[index + 1]]
+
+    def degree(self, index):
+        return self.indptr[index + 1] - self.indptr[index]
+
+    def suggestions(self, index, k=TOP_K, max_degree=MAX_DEGREE):
+        """Top ``k`` ``(score, mutual, candidate index)`` friends-of-friends for ``index``."""
+        followed = set(self.following(index))
+        scores = defaultdict(float)
+        mutual = defaultdict(int)
+        for via in followed:
+            degree = self.degree(via)
+            if degree > max_degree:
+                continue
+            weight = 1 / math.log2(2 + degree)
+            for candidate in self.following(via):
+                if candidate != index and candidate not in followed:
+                    scores[candidate] += weight
+                    mutual[candidate] += 1
+        return heapq.nlargest(k, ((score, mutual[candidate], candidate) for candidate, score in scores.items()))
+
+
+def compute_suggestions(k=TOP_K, max_degree=MAX_DEGREE, chunk_size=CHUNK_SIZE):
+    """Recompute stored suggestions for every user who follows someone; return users processed."""
+    graph = FollowGraph.load()
+    users = [index for index in range(len(graph.user_ids)) if graph.degree(index)]
+    for start in range(0, len(users), chunk_size):
+        chunk = users[start:start + chunk_size]
+        rows = []
+        for index in chunk:
+            for score, mutual, candidate in graph.suggestions(index, k, max_degree):
+                rows.append(FollowSuggestion(
+                    user_id=graph.user_ids[index],
+                    suggested_user_id=graph.user_ids[candidate],
+                    score=score,
+                    mutual_count=mutual,
+                ))
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=[graph.user_ids[index] for index in chunk]).delete()
+            FollowSuggestion.objects.bulk_create(rows, batch_size=1000)
+    # Users who no longer follow anyone keep no stale suggestions.
+    FollowSuggestion.objects.exclude(user_id__in=Follow.objects.values('follower_id')).delete()
+    return len(users)
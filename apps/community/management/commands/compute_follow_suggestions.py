@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apps.community.graph import MAX_DEGREE, TOP_K, compute_suggestions
+
+
+class Command(BaseCommand):
+    help = "Recompute friends-of-friends follow suggestions for every user."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=TOP_K, help="Suggestions kept per user.")
+        parser.add_argument('--max-degree', type=int, default=MAX_DEGREE)
+
+    def handle(self, *args, **options):
+        users = compute_suggestions(k=options['top'], max_degree=options['max_degree'])
+        self.stdout.write(self.style.SUCCESS(f"Computed suggestions for {users} users."))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.community.threads import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recount reply counts and last post times of discussions."
+
+    def handle(self, *args, **options):
+        updated = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f"Recounted {updated} discussions."))
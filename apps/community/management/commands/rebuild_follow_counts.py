@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.community.graph import rebuild_follow_counts
+
+
+class Command(BaseCommand):
+    help = "Recount follower and following counters on profiles."
+
+    def handle(self, *args, **options):
+        updated = rebuild_follow_counts()
+        self.stdout.write(self.style.SUCCESS(f"Recounted {updated} profiles."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.community.timelines import TIMELINE_LENGTH, trim_timelines
+
+
+class Command(BaseCommand):
+    help = "Trim timeline inboxes to their newest entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--length', type=int, default=TIMELINE_LENGTH)
+
+    def handle(self, *args, **options):
+        deleted = trim_timelines(length=options['length'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} timeline entries."))
@@ -16,6 +16,8 @@ class Discussion(models.Model):
     is_pinned = models.BooleanField(default=False)
     is_locked = models.BooleanField(default=False)
     views = models.PositiveIntegerField(default=0)
+    reply_count = models.PositiveIntegerField(default=0)
+    last_post_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -42,6 +44,7 @@ class Post(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [models.Index(fields=['discussion', 'created_at', 'id'])]
         verbose_name = _('Post')
         verbose_name_plural = _('Posts')
 
@@ -80,5 +83,55 @@ class Activity(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', 'created_at', 'id'])]
         verbose_name = _('Activity')
         verbose_name_plural = _('Activities')
+
+
+class TimelineEntry(models.Model):
+    """An activity delivered to a follower's timeline inbox."""
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    activity = models.ForeignKey(
+        Activity,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author_id = models.IntegerField()
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'activity'], name='unique_timeline_entry'),
+        ]
+        indexes = [models.Index(fields=['owner', 'created_at', 'activity'])]
+        verbose_name = _('Timeline Entry')
+        verbose_name_plural = _('Timeline Entries')
+
+
+class FollowSuggestion(models.Model):
+    """A precomputed "people you may know" suggestion."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions'
+    )
+    suggested_user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.FloatField()
+    mutual_count = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'suggested_user'], name='unique_follow_suggestion'),
+        ]
+        indexes = [models.Index(fields=['user', 'score'])]
+        verbose_name = _('Follow Suggestion')
+        verbose_name_plural = _('Follow Suggestions')
@@ -0,0 +1,48 @@
+from rest_framework import serializers
+from .models import Activity, Discussion, FollowSuggestion, Post
+
+
+class DiscussionSerializer(serializers.ModelSerializer):
+    """Serializer for Discussion model."""
+    user_email = serializers.EmailField(source='user.email', read_only=True)
+    
+    class Meta:
+        model = Discussion
+        fields = [
+            'id', 'user', 'user_email', 'book_id', 'title', 'content', 'is_pinned',
+            'is_locked', 'views', 'reply_count', 'last_post_at', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'user', 'is_pinned', 'is_locked', 'views', 'reply_count',
+            'last_post_at', 'created_at', 'updated_at'
+        ]
+
+
+class PostSerializer(serializers.ModelSerializer):
+    """Serializer for Post model."""
+    user_email = serializers.EmailField(source='user.email', read_only=True)
+    
+    class Meta:
+        model = Post
+        fields = ['id', 'discussion', 'user', 'user_email', 'content', 'created_at']
+        read_only_fields = ['id', 'discussion', 'user', 'created_at']
+
+
+class ActivitySerializer(serializers.ModelSerializer):
+    """Serializer for Activity model."""
+    user_email = serializers.EmailField(source='user.email', read_only=True)
+    
+    class Meta:
+        model = Activity
+        fields = ['id', 'user', 'user_email', 'activity_type', 'book_id', 'data', 'created_at']
+        read_only_fields = fields
+
+
+class FollowSuggestionSerializer(serializers.ModelSerializer):
+    """Serializer for FollowSuggestion model."""
+    email = serializers.EmailField(source='suggested_user.email', read_only=True)
+    
+    class Meta:
+        model = FollowSuggestion
+        fields = ['suggested_user', 'email', 'score', 'mutual_count', 'computed_at']
+        read_only_fields = fields
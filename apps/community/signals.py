@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .graph import follow_counted
+from .models import Activity, Follow, Post
+from .threads import post_added, post_removed
+from .timelines import follow_changed, schedule_fan_out
+
+
+@receiver(post_save, sender=Activity)
+def fan_out_activity(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        schedule_fan_out(instance.id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        follow_counted(instance.follower_id, instance.following_id, 1)
+        transaction.on_commit(lambda: follow_changed(instance.follower_id, instance.following_id, True))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, origin=None, **kwargs):
+    # When one of the two users is being deleted, only the other one's counter moves.
+    deleted_user_id = origin.pk if isinstance(origin, get_user_model()) else None
+    follow_counted(instance.follower_id, instance.following_id, -1, skip_user_id=deleted_user_id)
+    transaction.on_commit(lambda: follow_changed(instance.follower_id, instance.following_id, False))
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        post_added(instance.discussion_id, instance.created_at)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    post_removed(instance.discussion_id)
@@ -0,0 +1,39 @@
+"""
+Discussion reply counters.
+
+``Discussion.reply_count`` and ``Discussion.last_post_at`` are denormalized
+from ``Post`` so listings read them straight off the row. Creating a post
+bumps both with one conditional ``UPDATE``. Deleting one decrements the
+count and recomputes ``last_post_at`` from the ``(discussion, created_at,
+id)`` index. ``rebuild_counters`` recounts everything after writes that
+bypass signals.
+"""
+
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Discussion, Post
+
+
+def post_added(discussion_id, created_at):
+    Discussion.objects.filter(pk=discussion_id).update(
+        reply_count=F('reply_count') + 1,
+        last_post_at=Greatest(Coalesce(F('last_post_at'), created_at), created_at),
+    )
+
+
+def post_removed(discussion_id):
+    latest = Post.objects.filter(discussion_id=OuterRef('pk')).order_by('-created_at', '-id').values('created_at')
+    Discussion.objects.filter(pk=discussion_id).update(
+        reply_count=Greatest(F('reply_count') - 1, 0),
+        last_post_at=Subquery(latest[:1]),
+    )
+
+
+def rebuild_counters():
+    """Recount replies and last post times of every discussion; return rows updated."""
+    posts = Post.objects.filter(discussion_id=OuterRef('pk')).values('discussion_id')
+    return Discussion.objects.update(
+        reply_count=Coalesce(Subquery(posts.annotate(total=Count('id')).values('total')), 0),
+        last_post_at=Subquery(posts.annotate(latest=Max('created_at')).values('latest')),
+    )
@@ -0,0 +1,234 @@
+"""
+Activity timelines.
+
+A timeline is built with hybrid fan-out. When an ordinary user records an
+activity, it is written once per follower into ``TimelineEntry`` inboxes
+after the transaction commits. Reading such a timeline is then one index
+range scan on ``(owner, created_at, activity)``, however many people the
+reader follows.
+
+Authors with at least ``COMMUNITY_FANOUT_FOLLOWER_LIMIT`` followers are not
+fanned out, because that would write one row per follower on every post.
+Their recent activity ids are kept instead as a cached, bounded outbox list
+per author. These lists are merged into the inbox page at read time.
+
+Inboxes are capped at ``TIMELINE_LENGTH`` entries by ``trim_timelines``, and
+outboxes at ``OUTBOX_LENGTH``. Pages are keyset-paginated on
+``(created_at, activity id)``, so a page never shifts when new activity
+arrives.
+"""
+
+import base64
+import binascii
+import heapq
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from apps.accounts.models import Profile
+from .graph import follower_count
+from .models import Activity, Follow, TimelineEntry
+
+DEFAULT_FANOUT_FOLLOWER_LIMIT = 1000
+TIMELINE_LENGTH = 800
+OUTBOX_LENGTH = 200
+BACKFILL_LENGTH = 50
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+CHUNK_SIZE = 1000
+CACHE_TIMEOUT = 300
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def fanout_follower_limit():
+    return getattr(settings, 'COMMUNITY_FANOUT_FOLLOWER_LIMIT', DEFAULT_FANOUT_FOLLOWER_LIMIT)
+
+
+def _outbox_key(user_id):
+    return f"community:outbox:{user_id}"
+
+
+def _celebrities_key(user_id):
+    return f"community:followed-celebrities:{user_id}"
+
+
+def is_celebrity(user_id):
+    return follower_count(user_id) >= fanout_follower_limit()
+
+
+def followed_celebrity_ids(user_id):
+    """Ids of the accounts ``user_id`` follows that are read by merge, cached briefly."""
+    ids = cache.get(_celebrities_key(user_id))
+    if ids is None:
+        ids = list(
+            Profile.objects.filter(
+                user__followers__follower_id=user_id,
+                followers_count__gte=fanout_follower_limit(),
+            ).values_list('user_id', flat=True)
+        )
+        cache.set(_celebrities_key(user_id), ids, CACHE_TIMEOUT)
+    return ids
+
+
+def _outbox(author_ids):
+    """``{author_id: [(created_at, activity_id), ...]}`` newest first, from cache where possible."""
+    keys = {_outbox_key(author_id): author_id for author_id in author_ids}
+    cached = cache.get_many(keys.keys())
+    outboxes = {keys[key]: value for key, value in cached.items()}
+    for author_id in set(author_ids) - outboxes.keys():
+        outboxes[author_id] = list(
+            Activity.objects.filter(user_id=author_id)
+            .order_by('-created_at', '-id')
+            .values_list('created_at', 'id')[:OUTBOX_LENGTH]
+        )
+        cache.set(_outbox_key(author_id), outboxes[author_id], CACHE_TIMEOUT)
+    return outboxes
+
+
+def fan_out(activity_id):
+    """Deliver an activity to the inboxes of its author's followers. Returns rows written."""
+    activity = Activity.objects.filter(pk=activity_id).values('id', 'user_id', 'created_at').first()
+    if activity is None:
+        return 0
+    author_id = activity['user_id']
+    if is_celebrity(author_id):
+        cache.delete(_outbox_key(author_id))
+        return 0
+    owner_ids = Follow.objects.filter(following_id=author_id).values_list('follower_id', flat=True)
+    written = 0
+    batch = []
+    for owner_id in owner_ids.iterator(chunk_size=CHUNK_SIZE):
+        batch.append(owner_id)
+        if len(batch) >= CHUNK_SIZE:
+            written += _deliver(activity, batch)
+            batch = []
+    if batch:
+        written += _deliver(activity, batch)
+    return written
+
+
+def _deliver(activity, owner_ids):
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                owner_id=owner_id,
+                activity_id=activity['id'],
+                author_id=activity['user_id'],
+                created_at=activity['created_at'],
+            )
+            for owner_id in owner_ids
+        ],
+        ignore_conflicts=True,
+    )
+    return len(owner_ids)
+
+
+def schedule_fan_out(activity_id):
+    transaction.on_commit(lambda: fan_out(activity_id))
+
+
+def follow_changed(follower_id, following_id, followed):
+    """Bring a follower's inbox in line with a new or removed follow."""
+    cache.delete(_celebrities_key(follower_id))
+    if not followed:
+        TimelineEntry.objects.filter(owner_id=follower_id, author_id=following_id).delete()
+        return
+    if is_celebrity(following_id):
+        return
+    recent = (
+        Activity.objects.filter(user_id=following_id)
+        .order_by('-created_at', '-id')
+        .values('id', 'user_id', 'created_at')[:BACKFILL_LENGTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                owner_id=follower_id,
+                activity_id=activity['id'],
+                author_id=activity['user_id'],
+                created_at=activity['created_at'],
+            )
+            for activity in recent
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def encode_cursor(created_at, activity_id):
+    micros = (created_at - EPOCH) // MICROSECOND
+    return base64.urlsafe_b64encode(f"{micros}:{activity_id}".encode('ascii')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Return ``(created_at, activity_id)`` or raise ``ValueError``."""
+    try:
+        micros, activity_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').split(':')
+        return EPOCH + int(micros) * MICROSECOND, int(activity_id)
+    except (UnicodeError, binascii.Error) as exc:
+        raise ValueError("Invalid cursor.") from exc
+
+
+def timeline(user_id, before=None, limit=PAGE_SIZE):
+    """
+    One page of ``user_id``'s timeline, newest first, strictly older than the
+    ``(created_at, activity_id)`` position ``before``.
+
+    Returns ``(activities, next_position)``; ``next_position`` is ``None`` on
+    the last page.
+    """
+    inbox = TimelineEntry.objects.filter(owner_id=user_id)
+    if before is not None:
+        created_at, activity_id = before
+        inbox = inbox.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, activity_id__lt=activity_id))
+    inbox = inbox.order_by('-created_at', '-activity_id').values_list('created_at', 'activity_id')
+    sources = [list(inbox[:limit + 1])]
+    for entries in _outbox(followed_celebrity_ids(user_id)).values():
+        if before is not None:
+            entries = [entry for entry in entries if entry < before]
+        sources.append(entries[:limit + 1])
+
+    page = []
+    seen = set()
+    for entry in heapq.merge(*sources, reverse=True):
+        if entry[1] in seen:
+            continue
+        seen.add(entry[1])
+        page.append(entry)
+        if len(page) > limit:
+            break
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    activities = Activity.objects.select_related('user').in_bulk([activity_id for _, activity_id in page])
+    results = [activities[activity_id] for _, activity_id in page if activity_id in activities]
+    return results, (page[-1] if has_more else None)
+
+
+def trim_timelines(length=TIMELINE_LENGTH):
+    """Drop inbox entries beyond the newest ``length`` per owner. Returns rows deleted."""
+    deleted = 0
+    owners = (
+        TimelineEntry.objects.values('owner_id')
+        .annotate(total=Count('id'))
+        .filter(total__gt=length)
+        .values_list('owner_id', flat=True)
+    )
+    for owner_id in owners.iterator(chunk_size=CHUNK_SIZE):
+        entries = TimelineEntry.objects.filter(owner_id=owner_id)
+        oldest_kept = (
+            entries.order_by('-created_at', '-activity_id')
+            .values_list('created_at', 'activity_id')[length - 1:length]
+            .first()
+        )
+        if oldest_kept is None:
+            continue
+        created_at, activity_id = oldest_kept
+        count, _ = entries.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, activity_id__lt=activity_id)
+        ).delete()
+        deleted += count
+    return deleted
@@ -1 +1,12 @@
-urlpatterns = []
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import DiscussionViewSet, FollowSuggestionListView, TimelineView
+
+router = DefaultRouter()
+router.register(r'discussions', DiscussionViewSet, basename='discussion')
+
+urlpatterns = [
+    path('timeline/', TimelineView.as_view(), name='timeline'),
+    path('suggestions/', FollowSuggestionListView.as_view(), name='follow-suggestions'),
+    path('', include(router.urls)),
+]
@@ -1,3 +1,117 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .models import Discussion, FollowSuggestion, Post
+from .serializers import (
+    ActivitySerializer, DiscussionSerializer, FollowSuggestionSerializer, PostSerializer,
+)
+from .timelines import MAX_PAGE_SIZE, PAGE_SIZE, decode_cursor, encode_cursor, timeline
 
-# Create your views here.
+
+class ThreadPagination(CursorPagination):
+    """Cursor pagination over the (discussion, created_at, id) index."""
+    ordering = ('created_at', 'id')
+    page_size = 50
+
+
+class DiscussionViewSet(viewsets.ModelViewSet):
+    """ViewSet for forum discussions and their posts."""
+    serializer_class = DiscussionSerializer
+    
+    def get_queryset(self):
+        queryset = Discussion.objects.select_related('user')
+        book_id = self.request.query_params.get('book_id')
+        if book_id:
+            queryset = queryset.filter(book_id=book_id)
+        return queryset
+    
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+    
+    def perform_update(self, serializer):
+        if serializer.instance.user_id != self.request.user.id:
+            raise PermissionDenied("You can only edit your own discussions.")
+        serializer.save()
+    
+    def perform_destroy(self, instance):
+        if instance.user_id != self.request.user.id and not self.request.user.is_staff:
+            raise PermissionDenied("You can only delete your own discussions.")
+        instance.delete()
+    
+    @action(detail=True, methods=['get', 'post'], serializer_class=PostSerializer)
+    def posts(self, request, pk=None):
+        """Posts of this thread, oldest first (GET), or a new reply (POST)."""
+        discussion = get_object_or_404(Discussion.objects.only('id', 'is_locked'), pk=pk)
+        if request.method == 'POST':
+            if discussion.is_locked:
+                return Response(
+                    {"error": "This discussion is locked."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(discussion=discussion, user=request.user)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        paginator = ThreadPagination()
+        page = paginator.paginate_queryset(
+            Post.objects.filter(discussion=discussion).select_related('user'), request, view=self
+        )
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+    
+    @action(detail=True, methods=['delete'], url_path=r'posts/(?P<post_id>\d+)')
+    def delete_post(self, request, pk=None, post_id=None):
+        """Delete one of this thread's posts."""
+        post = get_object_or_404(Post, pk=post_id, discussion_id=pk)
+        if post.user_id != request.user.id and not request.user.is_staff:
+            raise PermissionDenied("You can only delete your own posts.")
+        post.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TimelineView(generics.GenericAPIView):
+    """The current user's activity timeline, newest first, cursor-paginated."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = ActivitySerializer
+    
+    def get(self, request):
+        before = None
+        cursor = request.query_params.get('cursor')
+        try:
+            if cursor:
+                before = decode_cursor(cursor)
+            page_size = min(int(request.query_params.get('page_size', PAGE_SIZE)), MAX_PAGE_SIZE)
+        except ValueError:
+            return Response(
+                {"error": "Invalid cursor or page_size."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        activities, next_position = timeline(request.user.id, before=before, limit=max(page_size, 1))
+        next_url = None
+        if next_position is not None:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor', encode_cursor(*next_position)
+            )
+        return Response({
+            "next": next_url,
+            "results": self.get_serializer(activities, many=True).data,
+        })
+
+
+class FollowSuggestionListView(generics.ListAPIView):
+    """Precomputed accounts the current user may want to follow, best first."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = FollowSuggestionSerializer
+    pagination_class = None
+    
+    def get_queryset(self):
+        return (
+            FollowSuggestion.objects.filter(user=self.request.user)
+            .exclude(suggested_user__followers__follower=self.request.user)
+            .select_related('suggested_user')
+            .order_by('-score')
+        )
@@ -0,0 +1,115 @@
+"""
+Checkout: turn a user's cart into an ``Order``.
+
+Checkout runs in one transaction that locks only the user's own cart row,
+prices the cart once, snapshots each book's title and effective price into
+``OrderItem`` rows created with a single ``bulk_create`` and empties the cart.
+Clients send an idempotency key; a retry with the same key returns the order
+created by the first attempt instead of placing a second one.
+"""
+
+import base64
+import secrets
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Cart, CartItem, Order, OrderItem, PromoCode
+from .pricing import price_cart
+from .promos import PromoUnavailable, reserve_promo
+
+
+class CheckoutError(Exception):
+    """The cart cannot be checked out as requested."""
+
+
+def make_order_number(now=None):
+    """
+    Return a new order number such as ``RS-20260101-K7Q2M4XZ9PLA``.
+
+    The suffix is 60 random bits, so numbers are generated without a shared
+    sequence or a lookup and a collision within one day is not a practical
+    concern.
+    """
+    now = now or timezone.now()
+    suffix = base64.b32encode(secrets.token_bytes(8)).decode('ascii')[:12]
+    return f"RS-{now:%Y%m%d}-{suffix}"
+
+
+def _existing_order(user, idempotency_key):
+    return Order.objects.filter(user=user, idempotency_key=idempotency_key).first()
+
+
+def checkout(user, idempotency_key, promo_code=None, billing_address=None, payment_method='', notes=''):
+    """
+    Create an order from ``user``'s cart.
+
+    Returns ``(order, created)``. ``created`` is ``False`` when an order for
+    ``idempotency_key`` already exists, in which case it is returned as is.
+    Raises ``CheckoutError`` if the cart is empty or mixes currencies, or if
+    the promo code does not apply or has been used up.
+    """
+    order = _existing_order(user, idempotency_key)
+    if order is not None:
+        return order, False
+
+    try:
+        with transaction.atomic():
+            cart = Cart.objects.select_for_update().filter(user=user).first()
+            # A concurrent attempt with the same key may have committed while
+            # we waited for the cart lock.
+            order = _existing_order(user, idempotency_key)
+            if order is not None:
+                return order, False
+            if cart is None:
+                raise CheckoutError("Cart is empty.")
+
+            pricing = price_cart(cart, promo_code=promo_code, use_cache=False)
+            if not pricing['lines']:
+                raise CheckoutError("Cart is empty.")
+            if pricing['currency_error']:
+                raise CheckoutError(pricing['currency_error'])
+            if pricing['promo_error']:
+                raise CheckoutError(pricing['promo_error'])
+
+            order = Order.objects.create(
+                user=user,
+                order_number=make_order_number(),
+                idempotency_key=idempotency_key,
+                subtotal=pricing['subtotal'],
+                discount=pricing['discount'],
+                total=pricing['total'],
+                currency=pricing['currency'],
+                promo_code=pricing['promo_code'] or '',
+                payment_method=payment_method,
+                billing_address=billing_address or {},
+                notes=notes,
+            )
+            # bulk_create skips OrderItem.save(); subtotals come from pricing.
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    book_id=line['book_id'],
+                    book_title=line['title'],
+                    book_price=line['unit_price'],
+                    quantity=line['quantity'],
+                    subtotal=line['line_total'],
+                )
+                for line in pricing['lines']
+            ])
+            CartItem.objects.filter(cart=cart).delete()
+            # Reserve the promo use last: the conditional update locks the
+            # code's row until commit, and popular codes are shared by many
+            # concurrent checkouts.
+            if pricing['promo_code']:
+                promo = PromoCode.objects.get(code__iexact=pricing['promo_code'])
+                try:
+                    reserve_promo(promo, user, order=order)
+                except PromoUnavailable as exc:
+                    raise CheckoutError(str(exc))
+    except IntegrityError:
+        order = _existing_order(user, idempotency_key)
+        if order is None:
+            raise
+        return order, False
+    return order, True
@@ -0,0 +1,167 @@
+"""
+Book ownership.
+
+``Entitlement`` materializes "user owns book" as one ``(user, book_id)`` row,
+written when an order completes and removed when it is refunded or
+cancelled, so access checks no longer join over orders. Each user's owned
+book ids are cached as a set, together with the ids of the books they wrote;
+a check is one cache read and a set lookup. The cached sets are dropped when
+an entitlement, a book's authors or an author's user changes.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.books.hydration import hydrate_books
+from apps.books.models import Book
+from .models import Entitlement, Order, OrderItem
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(user_id):
+    return f"marketplace:book-access:{user_id}"
+
+
+def invalidate_user(user_id):
+    transaction.on_commit(lambda: cache.delete(_cache_key(user_id)))
+
+
+def invalidate_users(user_ids):
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if user_ids:
+        transaction.on_commit(lambda: cache.delete_many([_cache_key(user_id) for user_id in user_ids]))
+
+
+def _book_access(user_id):
+    """Return ``(owned, authored)`` frozensets of book ids for ``user_id``."""
+    key = _cache_key(user_id)
+    access = cache.get(key)
+    if access is None:
+        access = (
+            frozenset(Entitlement.objects.filter(user_id=user_id).values_list('book_id', flat=True)),
+            frozenset(Book.objects.filter(authors__user_id=user_id).values_list('id', flat=True)),
+        )
+        cache.set(key, access, CACHE_TIMEOUT)
+    return access
+
+
+def owned_book_ids(user_id):
+    """Return the frozenset of book ids ``user_id`` owns."""
+    return _book_access(user_id)[0]
+
+
+def authored_book_ids(user_id):
+    """Return the frozenset of book ids ``user_id`` is an author of."""
+    return _book_access(user_id)[1]
+
+
+def owns(user, book_id):
+    if user is None or not user.is_authenticated:
+        return False
+    return book_id in owned_book_ids(user.id)
+
+
+def readable_book_ids(user, book_ids):
+    """
+    Return the subset of ``book_ids`` that ``user`` may read: free books,
+    owned books and, for staff and the book's authors, everything.
+    """
+    book_ids = set(book_ids)
+    if not book_ids:
+        return set()
+    if user.is_authenticated and user.is_staff:
+        return book_ids
+    readable = {book_id for book_id, book in hydrate_books(book_ids).items() if book['is_free']}
+    if user.is_authenticated:
+        owned, authored = _book_access(user.id)
+        readable |= book_ids & (owned | authored)
+    return readable
+
+
+def can_read(user, book_id):
+    return book_id in readable_book_ids(user, [book_id])
+
+
+def grant_for_order(order):
+    """Entitle the order's user to every book in a completed ``order``."""
+    granted_at = order.paid_at or timezone.now()
+    book_ids = set(OrderItem.objects.filter(order=order).values_list('book_id', flat=True))
+    Entitlement.objects.bulk_create(
+        [
+            Entitlement(user_id=order.user_id, book_id=book_id, order=order, granted_at=granted_at)
+            for book_id in book_ids
+        ],
+        ignore_conflicts=True,
+    )
+    invalidate_user(order.user_id)
+
+
+def revoke_for_order(order):
+    """
+    Remove entitlements granted by ``order`` unless another completed order
+    of the same user also contains the book.
+    """
+    with transaction.atomic():
+        book_ids = set(Entitlement.objects.filter(order=order).values_list('book_id', flat=True))
+        if not book_ids:
+            return
+        Entitlement.objects.filter(order=order).delete()
+        others = (
+            OrderItem.objects.filter(
+                order__user_id=order.user_id,
+                order__status=Order.Status.COMPLETED,
+                book_id__in=book_ids,
+            )
+            .exclude(order=order)
+            .values('book_id')
+            .annotate(first_order_id=Min('order_id'), granted_at=Min(Coalesce('order__paid_at', 'order__created_at')))
+            .order_by()
+        )
+        Entitlement.objects.bulk_create(
+            [
+                Entitlement(
+                    user_id=order.user_id,
+                    book_id=row['book_id'],
+                    order_id=row['first_order_id'],
+                    granted_at=row['granted_at'],
+                )
+                for row in others
+            ],
+            ignore_conflicts=True,
+        )
+    invalidate_user(order.user_id)
+
+
+def _write_batch(batch):
+    Entitlement.objects.bulk_create(batch, ignore_conflicts=True)
+    cache.delete_many([_cache_key(user_id) for user_id in {entitlement.user_id for entitlement in batch}])
+    return len(batch)
+
+
+def rebuild_entitlements(chunk_size=5000):
+    """Create any entitlements missing for completed orders; return rows checked."""
+    rows = (
+        OrderItem.objects.filter(order__status=Order.Status.COMPLETED)
+        .values('order__user_id', 'book_id')
+        .annotate(first_order_id=Min('order_id'), granted_at=Min(Coalesce('order__paid_at', 'order__created_at')))
+        .order_by()
+    )
+    written = 0
+    batch = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        batch.append(Entitlement(
+            user_id=row['order__user_id'],
+            book_id=row['book_id'],
+            order_id=row['first_order_id'],
+            granted_at=row['granted_at'],
+        ))
+        if len(batch) >= chunk_size:
+            written += _write_batch(batch)
+            batch = []
+    if batch:
+        written += _write_batch(batch)
+    return written
@@ -0,0 +1,77 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from apps.marketplace.models import PromoCode, PromoRedemption
+from apps.marketplace.promos import PromoUnavailable, reserve_promo
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive many parallel redemptions against one throwaway promo code and "
+        "report throughput and whether the code was oversold. Meant for a "
+        "PostgreSQL database; SQLite serializes all writers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--redemptions', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=32)
+        parser.add_argument('--max-uses', type=int, default=1000)
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark code and user.")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        suffix = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create_user(
+            email=f"promo-bench-{suffix}@example.invalid",
+            password=None,
+        )
+        promo = PromoCode.objects.create(
+            code=f"BENCH-{suffix}".upper(),
+            discount_type='fixed',
+            discount_value=1,
+            max_uses=options['max_uses'],
+            valid_from=now - timedelta(minutes=1),
+            valid_until=now + timedelta(hours=1),
+        )
+
+        def redeem(_):
+            try:
+                reserve_promo(promo, user)
+                return 'granted'
+            except PromoUnavailable:
+                return 'rejected'
+            except Exception:
+                return 'error'
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            outcomes = list(pool.map(redeem, range(options['redemptions'])))
+        elapsed = time.perf_counter() - started
+
+        granted = outcomes.count('granted')
+        promo.refresh_from_db()
+        redemptions = PromoRedemption.objects.filter(promo_code=promo).count()
+        self.stdout.write(
+            f"{len(outcomes)} attempts with {options['workers']} workers in {elapsed:.2f}s "
+            f"({len(outcomes) / elapsed:.0f}/s): {granted} granted, "
+            f"{outcomes.count('rejected')} rejected, {outcomes.count('error')} errors."
+        )
+        self.stdout.write(f"current_uses={promo.current_uses} redemptions={redemptions} max_uses={promo.max_uses}")
+
+        oversold = promo.current_uses > promo.max_uses or granted != promo.current_uses or redemptions != granted
+        if not options['keep']:
+            promo.delete()
+            user.delete()
+        if oversold:
+            self.stdout.write(self.style.ERROR("Promo code was oversold."))
+        else:
+            self.stdout.write(self.style.SUCCESS("No oversell."))
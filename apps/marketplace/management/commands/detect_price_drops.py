@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from apps.marketplace.price_drops import detect_price_drops, CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Notify users when books on their wishlist drop in price."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Changed books per batch.")
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Count notifications without creating them or updating snapshots.",
+        )
+
+    def handle(self, *args, **options):
+        changed, dropped, notified = detect_price_drops(
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{changed} books changed price, {dropped} dropped, {notified} notifications."
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.marketplace.entitlements import rebuild_entitlements
+
+
+class Command(BaseCommand):
+    help = "Backfill book entitlements from completed orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        checked = rebuild_entitlements(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} purchased books."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from apps.marketplace.promos import release_expired
+
+
+class Command(BaseCommand):
+    help = "Release promo code uses reserved by checkouts that were never paid."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-orders', action='store_true',
+            help="Do not cancel the abandoned pending orders.",
+        )
+
+    def handle(self, *args, **options):
+        released = release_expired(cancel_orders=not options['keep_orders'])
+        self.stdout.write(self.style.SUCCESS(f"Released {released} promo code reservations."))
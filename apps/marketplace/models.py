@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
 
@@ -21,13 +22,18 @@ class Cart(models.Model):
     def __str__(self):
         return f"Cart for {self.user.email}"
     
+    @cached_property
+    def pricing(self):
+        from .pricing import price_cart
+        return price_cart(self)
+    
     @property
     def total_items(self):
-        return self.items.count()
+        return self.pricing['total_items']
     
     @property
     def subtotal(self):
-        return sum(item.subtotal for item in self.items.all())
+        return self.pricing['subtotal']
 
 
 class CartItem(models.Model):
@@ -51,7 +57,12 @@ class CartItem(models.Model):
     
     @property
     def subtotal(self):
-        return Decimal('0.00')  # Would calculate based on book price
+        # Read from the cart's pricing, which prices every item in one query;
+        # items loaded through ``cart.items`` share that cart instance.
+        for line in self.cart.pricing['lines']:
+            if line['item_id'] == self.pk:
+                return line['line_total']
+        return Decimal('0.00')
 
 
 class Order(models.Model):
@@ -70,6 +81,7 @@ class Order(models.Model):
         related_name='orders'
     )
     order_number = models.CharField(max_length=50, unique=True)
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     
     # Pricing
@@ -78,6 +90,7 @@ class Order(models.Model):
     tax = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     total = models.DecimalField(max_digits=10, decimal_places=2)
     currency = models.CharField(max_length=3, default='USD')
+    promo_code = models.CharField(max_length=50, blank=True)
     
     # Payment
     payment_method = models.CharField(max_length=50, blank=True)
@@ -96,6 +109,12 @@ class Order(models.Model):
         ordering = ['-created_at']
         verbose_name = _('Order')
         verbose_name_plural = _('Orders')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'idempotency_key'],
+                name='unique_order_idempotency_key',
+            ),
+        ]
     
     def __str__(self):
         return f"Order {self.order_number} - {self.user.email}"
@@ -126,6 +145,32 @@ class OrderItem(models.Model):
         super().save(*args, **kwargs)
 
 
+class Entitlement(models.Model):
+    """A user's right to read a book, granted by a completed order."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='entitlements'
+    )
+    book_id = models.IntegerField()
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='entitlements'
+    )
+    granted_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['user', 'book_id']
+        verbose_name = _('Entitlement')
+        verbose_name_plural = _('Entitlements')
+    
+    def __str__(self):
+        return f"User {self.user_id} - Book {self.book_id}"
+
+
 class Wishlist(models.Model):
     """User wishlist."""
     user = models.OneToOneField(
@@ -147,6 +192,25 @@ class Wishlist(models.Model):
         return f"Wishlist for {self.user.email}"
 
 
+class BookPriceSnapshot(models.Model):
+    """Last effective price seen by the price-drop job for a book."""
+    book = models.OneToOneField(
+        'books.Book',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='price_snapshot'
+    )
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    captured_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = _('Book Price Snapshot')
+        verbose_name_plural = _('Book Price Snapshots')
+    
+    def __str__(self):
+        return f"Book {self.book_id} - {self.price}"
+
+
 class PromoCode(models.Model):
     """Promotional codes for discounts."""
     code = models.CharField(max_length=50, unique=True)
@@ -179,3 +243,42 @@ class PromoCode(models.Model):
             self.valid_from <= now <= self.valid_until and
             (self.max_uses == 0 or self.current_uses < self.max_uses)
         )
+
+
+class PromoRedemption(models.Model):
+    """A use of a promo code, reserved at checkout and confirmed once paid."""
+    
+    class Status(models.TextChoices):
+        RESERVED = 'reserved', _('Reserved')
+        REDEEMED = 'redeemed', _('Redeemed')
+        RELEASED = 'released', _('Released')
+    
+    promo_code = models.ForeignKey(
+        PromoCode,
+        on_delete=models.CASCADE,
+        related_name='redemptions'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='promo_redemptions'
+    )
+    order = models.OneToOneField(
+        Order,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='promo_redemption'
+    )
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.RESERVED)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [models.Index(fields=['status', 'expires_at'])]
+        verbose_name = _('Promo Redemption')
+        verbose_name_plural = _('Promo Redemptions')
+    
+    def __str__(self):
+        return f"{self.promo_code.code} - {self.status}"
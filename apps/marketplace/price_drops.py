@@ -0,0 +1,110 @@
+"""
+Wishlist price-drop notifications.
+
+``BookPriceSnapshot`` holds the effective price each book had when the job
+last ran. The job asks the database only for books whose current effective
+price differs from their snapshot, then, per chunk of books that got cheaper,
+finds every wishlist containing them with one query on the M2M through table
+and creates the notifications in bulk. Work is proportional to the books that
+changed and the wishlist entries that reference them, not to users × books.
+
+A chunk's notifications and its snapshot refresh commit together, so a job
+that dies part-way neither re-sends those notifications nor loses the drops.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.books.models import Book
+from apps.notifications.models import Notification
+from apps.notifications.services import create_notifications
+from .models import BookPriceSnapshot, Wishlist
+
+CHUNK_SIZE = 1000
+CENTS = Decimal('0.01')
+
+
+def changed_prices(now=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield lists of ``(book_id, title, old_price, new_price)`` for books whose
+    price moved, ``chunk_size`` at a time in id order.
+    """
+    rows = (
+        Book.objects.with_effective_price(now)
+        .filter(status=Book.Status.PUBLISHED)
+        .annotate(snapshot_price=F('price_snapshot__price'))
+        .filter(Q(snapshot_price__isnull=True) | ~Q(current_price=F('snapshot_price')))
+        .order_by('id')
+        .values_list('id', 'title', 'snapshot_price', 'current_price')
+    )
+    last_id = 0
+    while True:
+        chunk = list(rows.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield [
+            (book_id, title, old_price, Decimal(new_price).quantize(CENTS))
+            for book_id, title, old_price, new_price in chunk
+        ]
+        last_id = chunk[-1][0]
+
+
+def _notifications(drops):
+    """Build one notification per wishlist entry for the books in ``drops``."""
+    entries = (
+        Wishlist.books.through.objects.filter(book_id__in=drops.keys())
+        .values_list('wishlist__user_id', 'book_id')
+        .iterator(chunk_size=CHUNK_SIZE * 10)
+    )
+    for user_id, book_id in entries:
+        title, old_price, new_price = drops[book_id]
+        yield Notification(
+            user_id=user_id,
+            notification_type=Notification.Type.PRICE_DROP,
+            title=f"Price drop: {title}",
+            message=f"A book on your wishlist dropped from {old_price} to {new_price}.",
+            data={
+                'book_id': book_id,
+                'old_price': str(old_price),
+                'new_price': str(new_price),
+            },
+        )
+
+
+def _save_snapshots(rows, captured_at):
+    BookPriceSnapshot.objects.bulk_create(
+        [BookPriceSnapshot(book_id=book_id, price=price, captured_at=captured_at) for book_id, price in rows],
+        update_conflicts=True,
+        unique_fields=['book'],
+        update_fields=['price', 'captured_at'],
+    )
+
+
+def detect_price_drops(now=None, chunk_size=CHUNK_SIZE, dry_run=False):
+    """
+    Notify wishlisters of books that got cheaper and refresh the snapshots.
+
+    Books seen for the first time are only snapshotted. Returns
+    ``(changed_books, dropped_books, notifications)``.
+    """
+    now = now or timezone.now()
+    changed = dropped = notified = 0
+    for chunk in changed_prices(now, chunk_size):
+        drops = {
+            book_id: (title, old_price, new_price)
+            for book_id, title, old_price, new_price in chunk
+            if old_price is not None and new_price < old_price
+        }
+        changed += len(chunk)
+        dropped += len(drops)
+        if dry_run:
+            notified += sum(1 for _ in _notifications(drops)) if drops else 0
+            continue
+        with transaction.atomic():
+            if drops:
+                notified += create_notifications(_notifications(drops))
+            _save_snapshots([(book_id, new_price) for book_id, _, _, new_price in chunk], now)
+    return changed, dropped, notified
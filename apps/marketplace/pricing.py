@@ -0,0 +1,168 @@
+"""
+Cart pricing.
+
+``price_cart`` resolves the effective price of every book in a cart with one
+query (discount windows are evaluated in SQL), applies an optional promo code
+and returns line items and totals. Results are cached briefly per cart; the
+key includes a cart version bumped on any cart change and a global price
+generation bumped whenever a book's pricing changes.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from apps.books.models import Book
+from .models import CartItem, PromoCode
+
+CACHE_TIMEOUT = 60
+CENTS = Decimal('0.01')
+PRICE_GENERATION_KEY = 'marketplace:price-generation'
+
+
+def _cart_version_key(cart_id):
+    return f"marketplace:cart-version:{cart_id}"
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+
+def invalidate_cart(cart_id):
+    transaction.on_commit(lambda: _bump(_cart_version_key(cart_id)))
+
+
+def invalidate_prices():
+    transaction.on_commit(lambda: _bump(PRICE_GENERATION_KEY))
+
+
+def promo_discount(promo, subtotal):
+    """Return ``(discount, error)`` for applying ``promo`` to ``subtotal``."""
+    if promo is None:
+        return Decimal('0.00'), "Promo code not found."
+    if not promo.is_valid:
+        return Decimal('0.00'), "Promo code is not valid."
+    if subtotal < promo.min_order_amount:
+        return Decimal('0.00'), f"Minimum order amount is {promo.min_order_amount}."
+    if promo.discount_type == 'percentage':
+        discount = subtotal * promo.discount_value / 100
+    else:
+        discount = promo.discount_value
+    return min(discount, subtotal).quantize(CENTS, rounding=ROUND_HALF_UP), None
+
+
+def _next_price_change(rows, now):
+    """Seconds until the next discount window opens or closes for these books."""
+    boundaries = [
+        moment
+        for row in rows
+        for moment in (row['discount_start'], row['discount_end'])
+        if moment is not None and moment > now
+    ]
+    if not boundaries:
+        return None
+    return max(int((min(boundaries) - now).total_seconds()), 1)
+
+
+def load_cart_lines(cart_id, now=None):
+    """Return priced cart lines for ``cart_id`` from a single query."""
+    now = now or timezone.now()
+    items = CartItem.objects.filter(cart_id=cart_id, book_id=OuterRef('id'))
+    rows = (
+        Book.objects.with_effective_price(now)
+        .filter(id__in=CartItem.objects.filter(cart_id=cart_id).values('book_id'))
+        .annotate(
+            cart_item_id=Subquery(items.values('id')[:1]),
+            quantity=Subquery(items.values('quantity')[:1]),
+        )
+        .order_by('cart_item_id')
+        .values(
+            'id', 'title', 'price', 'current_price', 'currency', 'cart_item_id', 'quantity',
+            'discount_start', 'discount_end',
+        )
+    )
+    return list(rows)
+
+
+def price_cart(cart, promo_code=None, use_cache=True):
+    """
+    Price every item in ``cart`` and apply ``promo_code`` if given.
+
+    Returns a dict with ``lines``, ``total_items``, ``subtotal``, ``discount``,
+    ``total``, ``currency``, ``currency_error``, ``promo_code`` and
+    ``promo_error``. Books priced in different currencies cannot be added up,
+    so such a cart has no ``currency`` and carries a ``currency_error``.
+    """
+    cart_id = cart.pk if hasattr(cart, 'pk') else cart
+    promo_code = (promo_code or '').strip() or None
+    key = (
+        f"marketplace:cart-pricing:{cart_id}:{_version(_cart_version_key(cart_id))}:"
+        f"{_version(PRICE_GENERATION_KEY)}:{(promo_code or '').lower()}"
+    )
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    now = timezone.now()
+    rows = load_cart_lines(cart_id, now)
+    lines = []
+    subtotal = Decimal('0.00')
+    for row in rows:
+        unit_price = Decimal(row['current_price']).quantize(CENTS)
+        line_total = unit_price * row['quantity']
+        subtotal += line_total
+        lines.append({
+            'item_id': row['cart_item_id'],
+            'book_id': row['id'],
+            'title': row['title'],
+            'list_price': row['price'],
+            'unit_price': unit_price,
+            'on_sale': unit_price < row['price'],
+            'quantity': row['quantity'],
+            'line_total': line_total,
+        })
+
+    discount, promo_error = Decimal('0.00'), None
+    if promo_code:
+        promo = PromoCode.objects.filter(code__iexact=promo_code).first()
+        discount, promo_error = promo_discount(promo, subtotal)
+
+    currencies = {row['currency'] for row in rows}
+    currency_error = None
+    if len(currencies) > 1:
+        currency_error = "All books in the cart must be priced in the same currency."
+
+    pricing = {
+        'lines': lines,
+        'total_items': len(lines),
+        'subtotal': subtotal,
+        'discount': discount,
+        'total': subtotal - discount,
+        'currency': currencies.pop() if len(currencies) == 1 else (None if currencies else 'USD'),
+        'currency_error': currency_error,
+        'promo_code': promo_code if promo_code and promo_error is None else None,
+        'promo_error': promo_error,
+    }
+
+    timeout = CACHE_TIMEOUT
+    next_change = _next_price_change(rows, now)
+    if next_change is not None:
+        timeout = min(timeout, next_change)
+    if use_cache:
+        cache.set(key, pricing, timeout)
+    return pricing
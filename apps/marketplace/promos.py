@@ -0,0 +1,121 @@
+"""
+Promo code redemption.
+
+A use is reserved with a single conditional ``UPDATE ... SET current_uses =
+current_uses + 1 WHERE current_uses < max_uses``, so concurrent checkouts can
+never oversell a code and nothing is read and re-checked in Python. The row
+lock taken by that statement is held only until the surrounding transaction
+commits, so checkout issues it as late as possible.
+
+``current_uses`` counts reserved and redeemed uses. Reservations become
+redemptions when the order is paid and are handed back when the order is
+cancelled or the checkout is abandoned past ``expires_at``.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Order, PromoCode, PromoRedemption
+
+DEFAULT_RESERVATION_MINUTES = 30
+
+
+class PromoUnavailable(Exception):
+    """The promo code cannot be used (inactive, expired or used up)."""
+
+
+def reservation_ttl():
+    return timedelta(minutes=getattr(
+        settings, 'MARKETPLACE_PROMO_RESERVATION_MINUTES', DEFAULT_RESERVATION_MINUTES
+    ))
+
+
+def reserve_promo(promo, user, order=None, now=None):
+    """Reserve one use of ``promo`` for ``user`` and return the ``PromoRedemption``."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        reserved = (
+            PromoCode.objects.filter(
+                pk=promo.pk,
+                is_active=True,
+                valid_from__lte=now,
+                valid_until__gte=now,
+            )
+            .filter(Q(max_uses=0) | Q(current_uses__lt=F('max_uses')))
+            .update(current_uses=F('current_uses') + 1)
+        )
+        if not reserved:
+            raise PromoUnavailable("Promo code is no longer available.")
+        return PromoRedemption.objects.create(
+            promo_code=promo,
+            user=user,
+            order=order,
+            expires_at=now + reservation_ttl(),
+        )
+
+
+def confirm_redemption(order):
+    """Mark the reservation held by ``order`` as redeemed."""
+    return PromoRedemption.objects.filter(
+        order=order, status=PromoRedemption.Status.RESERVED
+    ).update(status=PromoRedemption.Status.REDEEMED, updated_at=timezone.now())
+
+
+def release_reservations(redemptions):
+    """
+    Release the reserved uses in the ``redemptions`` queryset.
+
+    Only rows still reserved are released, so concurrent callers never hand
+    the same use back twice. Returns the number released.
+    """
+    with transaction.atomic():
+        rows = list(
+            redemptions.filter(status=PromoRedemption.Status.RESERVED)
+            .select_for_update(skip_locked=True)
+            .values_list('id', 'promo_code_id')
+        )
+        if not rows:
+            return 0
+        PromoRedemption.objects.filter(id__in=[redemption_id for redemption_id, _ in rows]).update(
+            status=PromoRedemption.Status.RELEASED, updated_at=timezone.now()
+        )
+        for promo_id, count in Counter(promo_id for _, promo_id in rows).items():
+            PromoCode.objects.filter(pk=promo_id).update(
+                current_uses=Greatest(F('current_uses') - count, 0)
+            )
+    return len(rows)
+
+
+def release_order(order):
+    return release_reservations(PromoRedemption.objects.filter(order=order))
+
+
+def release_expired(now=None, cancel_orders=True):
+    """
+    Release reservations of abandoned checkouts.
+
+    A reservation is abandoned once ``expires_at`` has passed and its order
+    was never paid. With ``cancel_orders`` those still-pending orders are
+    cancelled too, so they cannot be paid later at the released discount.
+    Returns the number of uses released.
+    """
+    now = now or timezone.now()
+    expired = PromoRedemption.objects.filter(
+        status=PromoRedemption.Status.RESERVED, expires_at__lt=now
+    )
+    paid = expired.filter(order__status__in=[Order.Status.PROCESSING, Order.Status.COMPLETED])
+    paid.update(status=PromoRedemption.Status.REDEEMED, updated_at=now)
+
+    abandoned = expired.exclude(order__status__in=[Order.Status.PROCESSING, Order.Status.COMPLETED])
+    with transaction.atomic():
+        if cancel_orders:
+            Order.objects.filter(
+                promo_redemption__in=abandoned, status=Order.Status.PENDING
+            ).update(status=Order.Status.CANCELLED, updated_at=now)
+        return release_reservations(abandoned)
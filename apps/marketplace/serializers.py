@@ -1,14 +1,17 @@
 from rest_framework import serializers
+from apps.books.serializers import BookSummaryField, BookHydratingListSerializer
 from .models import Cart, CartItem, Order, OrderItem, Wishlist, PromoCode
 from decimal import Decimal
 
 
 class CartItemSerializer(serializers.ModelSerializer):
     """Serializer for CartItem model."""
+    book = BookSummaryField()
     
     class Meta:
         model = CartItem
-        fields = ['id', 'book_id', 'quantity', 'added_at']
+        fields = ['id', 'book_id', 'book', 'quantity', 'added_at']
+        list_serializer_class = BookHydratingListSerializer
         read_only_fields = ['id', 'added_at']
 
 
@@ -24,12 +27,45 @@ class CartSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class AddToCartSerializer(serializers.Serializer):
+    """Input for adding a book to the cart."""
+    book_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class CartLineSerializer(serializers.Serializer):
+    """A priced cart line."""
+    item_id = serializers.IntegerField()
+    book_id = serializers.IntegerField()
+    title = serializers.CharField()
+    list_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    on_sale = serializers.BooleanField()
+    quantity = serializers.IntegerField()
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class CartPricingSerializer(serializers.Serializer):
+    """Line items and totals from the cart pricing engine."""
+    lines = CartLineSerializer(many=True)
+    total_items = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    discount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    currency = serializers.CharField(allow_null=True)
+    currency_error = serializers.CharField(allow_null=True)
+    promo_code = serializers.CharField(allow_null=True)
+    promo_error = serializers.CharField(allow_null=True)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     """Serializer for OrderItem model."""
+    book = BookSummaryField()
     
     class Meta:
         model = OrderItem
-        fields = ['id', 'book_id', 'book_title', 'book_price', 'quantity', 'subtotal']
+        fields = ['id', 'book_id', 'book', 'book_title', 'book_price', 'quantity', 'subtotal']
+        list_serializer_class = BookHydratingListSerializer
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -39,13 +75,22 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = [
-            'id', 'order_number', 'status', 'subtotal', 'discount', 'tax',
-            'total', 'currency', 'payment_method', 'paid_at',
+            'id', 'order_number', 'status', 'items', 'subtotal', 'discount', 'tax',
+            'total', 'currency', 'promo_code', 'payment_method', 'paid_at',
             'billing_address', 'notes', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'order_number', 'created_at', 'updated_at']
 
 
+class CheckoutSerializer(serializers.Serializer):
+    """Input for checking out the current cart."""
+    idempotency_key = serializers.CharField(max_length=64, required=False)
+    promo_code = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    payment_method = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+    billing_address = serializers.JSONField(required=False, default=dict)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+
 class WishlistSerializer(serializers.ModelSerializer):
     """Serializer for Wishlist model."""
     books = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
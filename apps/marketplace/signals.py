@@ -0,0 +1,77 @@
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_save
+from django.dispatch import receiver
+from apps.books.models import Author, Book
+from apps.books.signals import pricing_changed
+from .models import Cart, CartItem, Order, PromoCode
+from .pricing import invalidate_cart, invalidate_prices
+from .promos import confirm_redemption, release_order
+from .entitlements import grant_for_order, invalidate_users, revoke_for_order
+
+
+@receiver(post_save, sender=CartItem)
+@receiver(post_delete, sender=CartItem)
+def cart_item_changed(sender, instance, **kwargs):
+    invalidate_cart(instance.cart_id)
+
+
+@receiver(post_save, sender=Cart)
+def cart_changed(sender, instance, **kwargs):
+    invalidate_cart(instance.pk)
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, created, **kwargs):
+    if not created and pricing_changed(instance):
+        invalidate_prices()
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=PromoCode)
+@receiver(post_delete, sender=PromoCode)
+def prices_changed(sender, **kwargs):
+    invalidate_prices()
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    if instance.status in (Order.Status.PROCESSING, Order.Status.COMPLETED):
+        confirm_redemption(instance)
+    elif instance.status == Order.Status.CANCELLED:
+        release_order(instance)
+    
+    if instance.status == Order.Status.COMPLETED:
+        grant_for_order(instance)
+    elif instance.status in (Order.Status.REFUNDED, Order.Status.CANCELLED):
+        revoke_for_order(instance)
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def book_authors_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Authors read their own books, so cached book access follows authorship."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        invalidate_users([instance.user_id])
+    elif action == 'pre_clear':
+        invalidate_users(instance.authors.values_list('user_id', flat=True))
+    else:
+        invalidate_users(Author.objects.filter(id__in=pk_set).values_list('user_id', flat=True))
+
+
+@receiver(pre_save, sender=Author)
+def remember_author_user(sender, instance, **kwargs):
+    instance._previous_user_id = (
+        Author.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def author_user_changed(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_user_id', None)
+    if kwargs.get('created') is False and previous == instance.user_id:
+        return
+    invalidate_users([previous, instance.user_id])
@@ -1 +1,12 @@
-urlpatterns = []
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import CartViewSet, CheckoutView, OrderViewSet
+
+router = DefaultRouter()
+router.register(r'cart', CartViewSet, basename='cart')
+router.register(r'orders', OrderViewSet, basename='order')
+
+urlpatterns = [
+    path('checkout/', CheckoutView.as_view(), name='checkout'),
+    path('', include(router.urls)),
+]
@@ -1,3 +1,89 @@
-from django.shortcuts import render
+from rest_framework import viewsets, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
+from django.shortcuts import get_object_or_404
+from apps.books.models import Book
+from .models import Cart, CartItem, Order
+from .serializers import AddToCartSerializer, CartPricingSerializer, CheckoutSerializer, OrderSerializer
+from .pricing import price_cart
+from .checkout import CheckoutError, checkout
 
-# Create your views here.
+
+class CartViewSet(viewsets.ViewSet):
+    """The current user's cart, priced by the cart pricing engine."""
+    permission_classes = [IsAuthenticated]
+    
+    def get_cart(self):
+        cart, _ = Cart.objects.get_or_create(user=self.request.user)
+        return cart
+    
+    def priced_response(self, cart, status_code=status.HTTP_200_OK):
+        pricing = price_cart(cart, promo_code=self.request.query_params.get('promo_code'))
+        return Response(CartPricingSerializer(pricing).data, status=status_code)
+    
+    def list(self, request):
+        return self.priced_response(self.get_cart())
+    
+    def create(self, request):
+        serializer = AddToCartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        book_id = serializer.validated_data['book_id']
+        if not Book.objects.filter(id=book_id, status=Book.Status.PUBLISHED).exists():
+            return Response(
+                {"error": "Book not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        cart = self.get_cart()
+        CartItem.objects.update_or_create(
+            cart=cart,
+            book_id=book_id,
+            defaults={'quantity': serializer.validated_data['quantity']},
+        )
+        return self.priced_response(cart, status.HTTP_201_CREATED)
+    
+    def destroy(self, request, pk=None):
+        cart = self.get_cart()
+        get_object_or_404(CartItem, cart=cart, pk=pk).delete()
+        return self.priced_response(cart)
+
+
+class CheckoutView(APIView):
+    """Place an order for the current cart."""
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = CheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        if not idempotency_key:
+            return Response(
+                {"error": "An Idempotency-Key header is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            order, created = checkout(
+                request.user,
+                idempotency_key[:64],
+                promo_code=data.get('promo_code'),
+                billing_address=data['billing_address'],
+                payment_method=data['payment_method'],
+                notes=data['notes'],
+            )
+        except CheckoutError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        order = Order.objects.prefetch_related('items').get(pk=order.pk)
+        return Response(
+            OrderSerializer(order, context={'request': request}).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+
+class OrderViewSet(viewsets.ReadOnlyModelViewSet):
+    """The current user's orders."""
+    serializer_class = OrderSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user).prefetch_related('items')
@@ -0,0 +1,201 @@
+"""
+Notification fan-out.
+
+A notification meant for a large audience (every follower of an author, or
+every user) is queued as a ``NotificationFanout`` row and sent by a worker
+(``run_notification_fanouts``), never inside the request that asked for it.
+
+The worker streams recipient ids in id order with a server-side cursor. The
+recipient query itself skips inactive users and users who turned
+``email_notifications`` off. Each chunk's ``Notification`` rows are written
+with ``bulk_create`` in the same transaction that advances the job's
+``sent`` and ``last_user_id``. A worker that dies mid-send therefore leaves
+a job that resumes after the last recipient it wrote, with no gaps or
+duplicates. ``sent``/``total`` on the row is the progress report.
+
+Every claim stamps a fresh ``claim_token``. A chunk is only committed if the
+job still carries the worker's token and the ``last_user_id`` it started
+from. A stalled worker whose job was reclaimed therefore finds that it has
+lost the claim (``FanoutClaimLost``) and stops, instead of writing the same
+recipients a second time.
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.community.models import Follow
+from .models import Notification, NotificationFanout
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000
+INSERT_BATCH_SIZE = 1000
+# A running job whose progress has not moved for this long is assumed to
+# belong to a dead worker and is claimed again.
+STALE_AFTER = timedelta(minutes=10)
+
+Audience = NotificationFanout.Audience
+Status = NotificationFanout.Status
+
+
+class FanoutClaimLost(Exception):
+    """Raised when another worker has reclaimed the fan-out being sent."""
+
+
+def queue_fanout(audience, notification_type, title, message, data=None, author=None, created_by=None):
+    """Queue a notification for ``audience``; the worker sends it."""
+    if audience == Audience.FOLLOWERS and author is None:
+        raise ValueError("A followers fan-out needs an author.")
+    return NotificationFanout.objects.create(
+        audience=audience,
+        author=author,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        data=data or {},
+        created_by=created_by,
+    )
+
+
+def recipients(fanout):
+    """Ids of the users still to notify, in id order, as one query."""
+    if fanout.audience == Audience.FOLLOWERS:
+        return (
+            Follow.objects.filter(
+                following_id=fanout.author_id,
+                follower__is_active=True,
+                follower__email_notifications=True,
+                follower_id__gt=fanout.last_user_id,
+            )
+            .order_by('follower_id')
+            .values_list('follower_id', flat=True)
+        )
+    return (
+        get_user_model().objects.filter(
+            is_active=True,
+            email_notifications=True,
+            id__gt=fanout.last_user_id,
+        )
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+
+
+def claim_fanout(now=None):
+    """Mark the oldest due fan-out as running and return it, or ``None``."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        fanout = (
+            NotificationFanout.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Status.PENDING) | Q(status=Status.RUNNING, updated_at__lt=now - STALE_AFTER))
+            .order_by('created_at', 'id')
+            .first()
+        )
+        if fanout is None:
+            return None
+        fanout.status = Status.RUNNING
+        fanout.claim_token = uuid.uuid4()
+        fanout.started_at = fanout.started_at or now
+        fanout.total = fanout.sent + recipients(fanout).count()
+        fanout.save(update_fields=['status', 'claim_token', 'started_at', 'total', 'updated_at'])
+    return fanout
+
+
+def _claimed(fanout):
+    return NotificationFanout.objects.filter(pk=fanout.pk, claim_token=fanout.claim_token)
+
+
+def _write_chunk(fanout, user_ids):
+    with transaction.atomic():
+        advanced = _claimed(fanout).filter(last_user_id=fanout.last_user_id).update(
+            sent=F('sent') + len(user_ids),
+            last_user_id=user_ids[-1],
+            updated_at=timezone.now(),
+        )
+        if not advanced:
+            raise FanoutClaimLost(f"Fan-out {fanout.pk} was claimed by another worker.")
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    user_id=user_id,
+                    notification_type=fanout.notification_type,
+                    title=fanout.title,
+                    message=fanout.message,
+                    data=fanout.data,
+                )
+                for user_id in user_ids
+            ],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+    fanout.sent += len(user_ids)
+    fanout.last_user_id = user_ids[-1]
+
+
+def run_fanout(fanout, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Send a claimed fan-out to its remaining recipients. ``progress`` is called
+    with the fan-out after every chunk. Returns the number of notifications
+    created by this run.
+    """
+    sent_before = fanout.sent
+    chunk = []
+    try:
+        for user_id in recipients(fanout).iterator(chunk_size=chunk_size):
+            chunk.append(user_id)
+            if len(chunk) >= chunk_size:
+                _write_chunk(fanout, chunk)
+                chunk = []
+                if progress:
+                    progress(fanout)
+        if chunk:
+            _write_chunk(fanout, chunk)
+            if progress:
+                progress(fanout)
+    except FanoutClaimLost:
+        raise
+    except Exception as exc:
+        _claimed(fanout).update(
+            status=Status.FAILED, error_message=repr(exc), updated_at=timezone.now()
+        )
+        raise
+    now = timezone.now()
+    if not _claimed(fanout).update(
+        status=Status.COMPLETED, finished_at=now, error_message='', updated_at=now
+    ):
+        raise FanoutClaimLost(f"Fan-out {fanout.pk} was claimed by another worker.")
+    fanout.status = Status.COMPLETED
+    return fanout.sent - sent_before
+
+
+def process_fanouts(chunk_size=CHUNK_SIZE, progress=None, max_jobs=None):
+    """Run due fan-outs one after another; return ``{status: count}``."""
+    outcomes = {}
+    runs = 0
+    while max_jobs is None or runs < max_jobs:
+        fanout = claim_fanout()
+        if fanout is None:
+            break
+        try:
+            run_fanout(fanout, chunk_size, progress)
+        except FanoutClaimLost:
+            # The job is still running, under the worker that reclaimed it.
+            logger.warning("Notification fan-out %s was reclaimed by another worker", fanout.pk)
+        except Exception:
+            logger.exception("Notification fan-out %s failed", fanout.pk)
+            fanout.status = Status.FAILED
+        outcomes[fanout.status] = outcomes.get(fanout.status, 0) + 1
+        runs += 1
+    return outcomes
+
+
+def retry_fanout(fanout):
+    """Queue a failed fan-out again; it resumes after its last recipient."""
+    return NotificationFanout.objects.filter(pk=fanout.pk, status=Status.FAILED).update(
+        status=Status.PENDING, error_message='', updated_at=timezone.now()
+    )
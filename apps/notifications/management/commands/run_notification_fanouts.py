@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.notifications.fanout import CHUNK_SIZE, process_fanouts
+
+
+class Command(BaseCommand):
+    help = "Send queued notification fan-outs in chunks, reporting progress."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new fan-outs.")
+        parser.add_argument('--sleep', type=float, default=5.0, help="Seconds between polls with --loop.")
+
+    def report(self, fanout):
+        self.stdout.write(f"Fan-out {fanout.pk}: {fanout.sent}/{fanout.total} notifications sent.")
+
+    def handle(self, *args, **options):
+        totals = {}
+        while True:
+            outcomes = process_fanouts(chunk_size=options['chunk_size'], progress=self.report)
+            for key, count in outcomes.items():
+                totals[key] = totals.get(key, 0) + count
+            if not options['loop']:
+                break
+            if not outcomes:
+                time.sleep(options['sleep'])
+        summary = ", ".join(f"{count} {key}" for key, count in sorted(totals.items())) or "nothing queued"
+        self.stdout.write(self.style.SUCCESS(f"Notification fan-outs: {summary}."))
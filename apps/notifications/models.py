@@ -14,6 +14,7 @@ class Notification(models.Model):
         FOLLOW = 'follow', _('New Follower')
         BOOK_PUBLISHED = 'book_published', _('Book Published')
         PROMOTION = 'promotion', _('Promotion')
+        PRICE_DROP = 'price_drop', _('Price Drop')
         SYSTEM = 'system', _('System')
     
     user = models.ForeignKey(
@@ -38,6 +39,60 @@ class Notification(models.Model):
         return f"{self.notification_type} - {self.user.email}"
 
 
+class NotificationFanout(models.Model):
+    """A queued notification to a large audience, sent in chunks by a worker."""
+    
+    class Audience(models.TextChoices):
+        FOLLOWERS = 'followers', _('Followers of an author')
+        ALL_USERS = 'all_users', _('All users')
+    
+    class Status(models.TextChoices):
+        PENDING = 'pending', _('Pending')
+        RUNNING = 'running', _('Running')
+        COMPLETED = 'completed', _('Completed')
+        FAILED = 'failed', _('Failed')
+    
+    audience = models.CharField(max_length=20, choices=Audience.choices)
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    notification_type = models.CharField(max_length=50, choices=Notification.Type.choices)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    data = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    total = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    last_user_id = models.IntegerField(default=0)
+    # Set on every claim; progress is only written by the current holder.
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
+    error_message = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+        verbose_name = _('Notification Fan-out')
+        verbose_name_plural = _('Notification Fan-outs')
+    
+    def __str__(self):
+        return f"{self.notification_type} to {self.audience} ({self.status})"
+
+
 class EmailTemplate(models.Model):
     """Email template model for notifications."""
     name = models.CharField(max_length=100)
@@ -0,0 +1,31 @@
+from rest_framework import serializers
+from apps.accounts.models import CustomUser
+from .models import NotificationFanout
+
+
+class NotificationFanoutSerializer(serializers.ModelSerializer):
+    """Serializer for NotificationFanout model, with send progress."""
+    author = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all(), required=False, allow_null=True)
+    progress = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = NotificationFanout
+        fields = [
+            'id', 'audience', 'author', 'notification_type', 'title', 'message', 'data',
+            'status', 'total', 'sent', 'progress', 'error_message', 'created_by',
+            'started_at', 'finished_at', 'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'total', 'sent', 'error_message', 'created_by',
+            'started_at', 'finished_at', 'created_at', 'updated_at'
+        ]
+    
+    def get_progress(self, obj):
+        if obj.status == NotificationFanout.Status.COMPLETED:
+            return 100.0
+        return round(100 * obj.sent / obj.total, 1) if obj.total else 0.0
+    
+    def validate(self, attrs):
+        if attrs.get('audience') == NotificationFanout.Audience.FOLLOWERS and not attrs.get('author'):
+            raise serializers.ValidationError({"author": "A followers fan-out needs an author."})
+        return attrs
@@ -0,0 +1,24 @@
+"""
+Bulk notification creation.
+
+Jobs that notify many users build unsaved ``Notification`` instances and hand
+them here rather than saving them one at a time.
+"""
+
+from .models import Notification
+
+BATCH_SIZE = 1000
+
+
+def create_notifications(notifications, batch_size=BATCH_SIZE):
+    """Insert an iterable of unsaved notifications in batches; return the count."""
+    created = 0
+    batch = []
+    for notification in notifications:
+        batch.append(notification)
+        if len(batch) >= batch_size:
+            created += len(Notification.objects.bulk_create(batch))
+            batch = []
+    if batch:
+        created += len(Notification.objects.bulk_create(batch))
+    return created
@@ -1 +1,10 @@
-urlpatterns = []
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import NotificationFanoutViewSet
+
+router = DefaultRouter()
+router.register(r'fanouts', NotificationFanoutViewSet, basename='notification-fanout')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -1,3 +1,34 @@
-from django.shortcuts import render
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from .fanout import queue_fanout, retry_fanout
+from .models import NotificationFanout
+from .serializers import NotificationFanoutSerializer
 
-# Create your views here.
+
+class NotificationFanoutViewSet(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Queue large notification sends and follow their progress (staff only)."""
+    queryset = NotificationFanout.objects.all()
+    serializer_class = NotificationFanoutSerializer
+    permission_classes = [IsAdminUser]
+    
+    def perform_create(self, serializer):
+        serializer.instance = queue_fanout(created_by=self.request.user, **serializer.validated_data)
+    
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        """Queue a failed fan-out again from where it stopped."""
+        fanout = self.get_object()
+        if not retry_fanout(fanout):
+            return Response(
+                {"error": "Only failed fan-outs can be retried."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        fanout.refresh_from_db()
+        return Response(self.get_serializer(fanout).data)
@@ -0,0 +1,135 @@
+"""
+Streaming CSV/JSONL exports of order, transaction and royalty history.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` (a
+server-side cursor on PostgreSQL), encoded one at a time and yielded in
+blocks of about ``FLUSH_BYTES``, optionally through a streaming gzip
+compressor. Nothing is materialized, so memory stays flat no matter how many
+rows an account has.
+"""
+
+import csv
+import io
+import zlib
+from datetime import datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from apps.marketplace.models import Order, OrderItem
+from .models import Royalty, Transaction
+
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def parse_moment(value):
+    """Parse an ISO date or datetime bound; dates mean midnight. Raises ``ValueError``."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class ExportDataset:
+    """A model, the columns exported from it and the field naming its owner."""
+
+    def __init__(self, model, columns, owner_field, date_field='created_at'):
+        self.model = model
+        self.columns = columns
+        self.owner_field = owner_field
+        self.date_field = date_field
+
+    def queryset(self, owner_id=None, since=None, until=None):
+        queryset = self.model.objects.all()
+        if owner_id is not None:
+            queryset = queryset.filter(**{self.owner_field: owner_id})
+        if since is not None:
+            queryset = queryset.filter(**{f"{self.date_field}__gte": since})
+        if until is not None:
+            queryset = queryset.filter(**{f"{self.date_field}__lt": until})
+        return queryset.order_by('id').values_list(*self.columns)
+
+
+DATASETS = {
+    'orders': ExportDataset(Order, [
+        'id', 'order_number', 'user_id', 'status', 'subtotal', 'discount', 'tax', 'total',
+        'currency', 'promo_code', 'payment_method', 'payment_id', 'paid_at', 'created_at',
+    ], owner_field='user_id'),
+    'order-items': ExportDataset(OrderItem, [
+        'id', 'order_id', 'order__order_number', 'order__user_id', 'order__status',
+        'book_id', 'book_title', 'book_price', 'quantity', 'subtotal', 'order__created_at',
+    ], owner_field='order__user_id', date_field='order__created_at'),
+    'transactions': ExportDataset(Transaction, [
+        'id', 'user_id', 'order_id', 'transaction_type', 'status', 'amount', 'currency',
+        'payment_method', 'stripe_payment_intent_id', 'stripe_charge_id', 'created_at', 'completed_at',
+    ], owner_field='user_id'),
+    'royalties': ExportDataset(Royalty, [
+        'id', 'author_id', 'book_id', 'book_title', 'order_id', 'order__order_number', 'quantity',
+        'list_price', 'royalty_rate', 'royalty_amount', 'currency', 'status', 'created_at',
+    ], owner_field='author_id'),
+}
+
+
+def _csv_lines(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(['' if value is None else value for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _jsonl_lines(columns, rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+def _blocks(lines):
+    block = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        block.append(data)
+        size += len(data)
+        if size >= FLUSH_BYTES:
+            yield b''.join(block)
+            block, size = [], 0
+    if block:
+        yield b''.join(block)
+
+
+def _gzipped(blocks):
+    compressor = zlib.compressobj(wbits=31)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(dataset, fmt='csv', compress=False, owner_id=None, since=None, until=None, chunk_size=CHUNK_SIZE):
+    """Yield the encoded (and optionally gzipped) bytes of an export."""
+    spec = DATASETS[dataset]
+    columns = [column.replace('__', '_') for column in spec.columns]
+    rows = spec.queryset(owner_id, since, until).iterator(chunk_size=chunk_size)
+    lines = _csv_lines(columns, rows) if fmt == 'csv' else _jsonl_lines(columns, rows)
+    blocks = _blocks(lines)
+    return _gzipped(blocks) if compress else blocks
@@ -0,0 +1,241 @@
+"""
+Wallet ledger.
+
+Money movements are appended as ``WalletEntry`` rows and never updated, so
+concurrent credits and payouts on one wallet do not contend for its row.
+Entries are batch-written from royalties, payouts and deposits by
+``sync_ledger``, which follows each source with a ``JobWatermark`` and relies
+on a unique ``(source_type, source_id, kind, bucket)`` constraint to make
+re-runs harmless.
+
+``snapshot_wallets`` periodically folds entries into ``WalletSnapshot`` rows
+(and mirrors the result onto ``Wallet.balance``/``pending_balance``). A
+balance is the latest snapshot plus the entries after it, at any point in
+time.
+
+A payout moves its amount from the available to the pending bucket when
+requested, leaves the pending bucket when completed and returns to available
+if it fails.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import JobWatermark, Payout, Royalty, Transaction, Wallet, WalletEntry, WalletSnapshot
+
+CHUNK_SIZE = 2000
+ZERO = Decimal('0.00')
+# Sources and entries younger than this are left for the next run, so rows
+# from transactions that commit late are never skipped.
+SETTLE_DELAY = timedelta(minutes=5)
+
+Bucket = WalletEntry.Bucket
+Kind = WalletEntry.Kind
+
+
+class Balance:
+    """Available and pending amounts of a wallet."""
+
+    def __init__(self, available=ZERO, pending=ZERO):
+        self.available = available
+        self.pending = pending
+
+    def __repr__(self):
+        return f"Balance(available={self.available}, pending={self.pending})"
+
+
+def _wallet_ids(user_ids):
+    """Return ``{user_id: wallet_id}``, creating missing wallets."""
+    user_ids = set(user_ids)
+    Wallet.objects.bulk_create([Wallet(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+    return dict(Wallet.objects.filter(user_id__in=user_ids).values_list('user_id', 'id'))
+
+
+def _royalty_entries(rows):
+    return [
+        (row['author_id'], Kind.ROYALTY, Bucket.AVAILABLE, row['royalty_amount'], 'royalty', row['id'])
+        for row in rows
+    ]
+
+
+def _payout_entries(rows):
+    entries = []
+    for row in rows:
+        user_id, amount, payout_id = row['user_id'], row['amount'], row['id']
+        entries += [
+            (user_id, Kind.PAYOUT_RESERVE, Bucket.AVAILABLE, -amount, 'payout', payout_id),
+            (user_id, Kind.PAYOUT_RESERVE, Bucket.PENDING, amount, 'payout', payout_id),
+        ]
+        if row['status'] == Payout.Status.COMPLETED:
+            entries.append((user_id, Kind.PAYOUT_SETTLE, Bucket.PENDING, -amount, 'payout', payout_id))
+        elif row['status'] == Payout.Status.FAILED:
+            entries += [
+                (user_id, Kind.PAYOUT_RELEASE, Bucket.PENDING, -amount, 'payout', payout_id),
+                (user_id, Kind.PAYOUT_RELEASE, Bucket.AVAILABLE, amount, 'payout', payout_id),
+            ]
+    return entries
+
+
+def _deposit_entries(rows):
+    return [
+        (row['user_id'], Kind.DEPOSIT, Bucket.AVAILABLE, row['amount'], 'transaction', row['id'])
+        for row in rows
+    ]
+
+
+# name: (queryset, timestamp field, fields, entry builder)
+SOURCES = {
+    'ledger:royalties': (
+        lambda: Royalty.objects.all(),
+        'created_at',
+        ['id', 'author_id', 'royalty_amount'],
+        _royalty_entries,
+    ),
+    'ledger:payouts': (
+        lambda: Payout.objects.all(),
+        'updated_at',
+        ['id', 'user_id', 'amount', 'status'],
+        _payout_entries,
+    ),
+    'ledger:deposits': (
+        lambda: Transaction.objects.filter(
+            transaction_type=Transaction.Type.DEPOSIT, status=Transaction.Status.COMPLETED
+        ),
+        'updated_at',
+        ['id', 'user_id', 'amount'],
+        _deposit_entries,
+    ),
+}
+
+
+def write_entries(entries):
+    """Append ``(user_id, kind, bucket, amount, source_type, source_id)`` tuples."""
+    wallets = _wallet_ids(entry[0] for entry in entries)
+    WalletEntry.objects.bulk_create(
+        [
+            WalletEntry(
+                wallet_id=wallets[user_id],
+                kind=kind,
+                bucket=bucket,
+                amount=amount,
+                source_type=source_type,
+                source_id=source_id,
+            )
+            for user_id, kind, bucket, amount, source_type, source_id in entries
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def sync_source(name, chunk_size=CHUNK_SIZE, now=None):
+    """Append entries for one source past its watermark; return rows read."""
+    source, time_field, fields, build = SOURCES[name]
+    cutoff = (now or timezone.now()) - SETTLE_DELAY
+    JobWatermark.objects.get_or_create(name=name)
+    processed = 0
+    while True:
+        with transaction.atomic():
+            watermark = JobWatermark.objects.select_for_update().get(name=name)
+            rows = source().filter(**{f"{time_field}__lte": cutoff})
+            if watermark.last_timestamp is not None:
+                rows = rows.filter(
+                    Q(**{f"{time_field}__gt": watermark.last_timestamp})
+                    | Q(**{time_field: watermark.last_timestamp, 'id__gt': watermark.last_id})
+                )
+            chunk = list(rows.order_by(time_field, 'id').values(*fields, time_field)[:chunk_size])
+            if not chunk:
+                return processed
+            entries = build(chunk)
+            if entries:
+                write_entries(entries)
+            watermark.last_id = chunk[-1]['id']
+            watermark.last_timestamp = chunk[-1][time_field]
+            watermark.save(update_fields=['last_id', 'last_timestamp', 'updated_at'])
+        processed += len(chunk)
+
+
+def sync_ledger(chunk_size=CHUNK_SIZE, now=None):
+    """Bring the ledger up to date with every source; return ``{source: rows}``."""
+    return {name: sync_source(name, chunk_size, now) for name in SOURCES}
+
+
+def _latest_snapshot(wallet_ref):
+    return WalletSnapshot.objects.filter(wallet=wallet_ref).order_by('-as_of', '-id')
+
+
+def wallet_balance(wallet, at=None):
+    """Return the ``Balance`` of ``wallet`` (or its id) now or at ``at``."""
+    snapshots = _latest_snapshot(wallet)
+    entries = WalletEntry.objects.filter(wallet=wallet)
+    if at is not None:
+        snapshots = snapshots.filter(as_of__lte=at)
+        entries = entries.filter(created_at__lte=at)
+    snapshot = snapshots.values('balance', 'pending_balance', 'last_entry_id').first()
+
+    balance = Balance()
+    if snapshot:
+        balance = Balance(snapshot['balance'], snapshot['pending_balance'])
+        entries = entries.filter(id__gt=snapshot['last_entry_id'])
+    for bucket, total in entries.values('bucket').annotate(total=Sum('amount')).values_list('bucket', 'total'):
+        if bucket == Bucket.AVAILABLE:
+            balance.available += total
+        else:
+            balance.pending += total
+    return balance
+
+
+def snapshot_wallets(now=None):
+    """
+    Snapshot every wallet with entries since its last snapshot and mirror the
+    balances onto ``Wallet``. Returns the number of snapshots written.
+    """
+    as_of = (now or timezone.now()) - SETTLE_DELAY
+    last_entry_id = WalletEntry.objects.filter(created_at__lte=as_of).aggregate(last=Max('id'))['last']
+    if last_entry_id is None:
+        return 0
+
+    latest = _latest_snapshot(OuterRef('wallet_id'))
+    deltas = defaultdict(lambda: [ZERO, ZERO])
+    rows = (
+        WalletEntry.objects.filter(id__lte=last_entry_id)
+        .annotate(snapshot_last=Coalesce(Subquery(latest.values('last_entry_id')[:1]), 0))
+        .filter(id__gt=F('snapshot_last'))
+        .values('wallet_id', 'bucket')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    for row in rows:
+        deltas[row['wallet_id']][0 if row['bucket'] == Bucket.AVAILABLE else 1] += row['total']
+    if not deltas:
+        return 0
+
+    latest = _latest_snapshot(OuterRef('id'))
+    wallets = list(
+        Wallet.objects.filter(id__in=deltas.keys()).annotate(
+            snapshot_balance=Coalesce(Subquery(latest.values('balance')[:1]), ZERO),
+            snapshot_pending=Coalesce(Subquery(latest.values('pending_balance')[:1]), ZERO),
+        )
+    )
+    snapshots = []
+    for wallet in wallets:
+        available, pending = deltas[wallet.id]
+        wallet.balance = wallet.snapshot_balance + available
+        wallet.pending_balance = wallet.snapshot_pending + pending
+        snapshots.append(WalletSnapshot(
+            wallet=wallet,
+            balance=wallet.balance,
+            pending_balance=wallet.pending_balance,
+            last_entry_id=last_entry_id,
+            as_of=as_of,
+        ))
+    with transaction.atomic():
+        WalletSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+        Wallet.objects.bulk_update(wallets, ['balance', 'pending_balance'], batch_size=1000)
+    return len(snapshots)
@@ -0,0 +1,53 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.payments.models import Payout, Wallet
+from apps.payments.payouts import BATCH_SIZE, MAX_WORKERS, FakeStripeGateway, run_payouts
+
+
+class Command(BaseCommand):
+    help = "Run the payout processor against the in-process fake Stripe gateway and report throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payouts', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+        parser.add_argument('--latency', type=float, default=0.05, help="Seconds per fake transfer.")
+        parser.add_argument('--transient-failure-rate', type=float, default=0.0)
+        parser.add_argument('--failure-rate', type=float, default=0.0)
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark payouts and user.")
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.create_user(
+            email=f"payout-bench-{uuid.uuid4().hex[:8]}@example.invalid",
+            password=None,
+        )
+        Wallet.objects.create(user=user, stripe_account_id='acct_fake')
+        Payout.objects.bulk_create(
+            [Payout(user=user, amount=Decimal('10.00')) for _ in range(options['payouts'])],
+            batch_size=1000,
+        )
+        gateway = FakeStripeGateway(
+            latency=options['latency'],
+            transient_failure_rate=options['transient_failure_rate'],
+            failure_rate=options['failure_rate'],
+        )
+
+        started = time.perf_counter()
+        outcomes = run_payouts(gateway, batch_size=options['batch_size'], max_workers=options['workers'])
+        elapsed = time.perf_counter() - started
+
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(outcomes.items()))
+        self.stdout.write(
+            f"{options['payouts']} payouts, {options['workers']} workers, batch {options['batch_size']}: "
+            f"{elapsed:.2f}s ({options['payouts'] / elapsed:.0f}/s). {summary}. "
+            f"{len(gateway.transfers)} transfers issued."
+        )
+        if not options['keep']:
+            Payout.objects.filter(user=user).delete()
+            user.delete()
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from apps.payments.models import JobWatermark
+from apps.payments.royalties import WATERMARK, CHUNK_SIZE, compute_royalties
+
+
+class Command(BaseCommand):
+    help = "Create author royalties for completed orders since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Orders per batch.")
+        parser.add_argument('--max-chunks', type=int, default=None)
+        parser.add_argument(
+            '--reset', action='store_true',
+            help="Start over from the first order; existing royalties are kept.",
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            JobWatermark.objects.filter(name=WATERMARK).update(last_timestamp=None, last_id=0)
+        orders, royalties = compute_royalties(
+            chunk_size=options['chunk_size'],
+            max_chunks=options['max_chunks'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Processed {orders} orders into {royalties} royalty rows (existing rows are skipped)."))
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.payments.exports import DATASETS, FORMATS, CHUNK_SIZE, parse_moment, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream order, order item, transaction or royalty history to a CSV or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', dest='fmt', choices=FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--output', '-o', help="File to write; defaults to stdout.")
+        parser.add_argument('--user', type=int, help="Only rows owned by this user id.")
+        parser.add_argument('--since', help="ISO date or datetime (inclusive).")
+        parser.add_argument('--until', help="ISO date or datetime (exclusive).")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_moment(options['since'])
+            until = parse_moment(options['until'])
+        except ValueError as exc:
+            raise CommandError(f"Invalid date: {exc}")
+
+        blocks = stream_export(
+            options['dataset'],
+            options['fmt'],
+            options['gzip'],
+            owner_id=options['user'],
+            since=since,
+            until=until,
+            chunk_size=options['chunk_size'],
+        )
+        written = 0
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for block in blocks:
+                output.write(block)
+                written += len(block)
+        finally:
+            if options['output']:
+                output.close()
+        if options['output']:
+            self.stderr.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}."))
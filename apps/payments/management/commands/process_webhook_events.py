@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.payments.models import WebhookEvent
+from apps.payments.webhooks import BATCH_SIZE, process_events
+
+
+class Command(BaseCommand):
+    help = "Apply stored payment webhook events, in order per payment intent."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new events.")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds between polls with --loop.")
+
+    def handle(self, *args, **options):
+        totals = {}
+        while True:
+            outcomes = process_events(options['batch_size'])
+            for key, count in outcomes.items():
+                totals[key] = totals.get(key, 0) + count
+            # Stop (or wait) once a batch makes no progress: nothing was due
+            # or every event claimed was put back to wait for a retry.
+            if set(outcomes) <= {WebhookEvent.Status.PENDING}:
+                if not options['loop']:
+                    break
+                time.sleep(options['sleep'])
+        summary = ", ".join(f"{count} {key}" for key, count in sorted(totals.items())) or "no events"
+        self.stdout.write(self.style.SUCCESS(f"Webhook events: {summary}."))
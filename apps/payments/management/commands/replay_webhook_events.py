@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.payments.exports import parse_moment
+from apps.payments.models import WebhookEvent
+from apps.payments.webhooks import ingest_events, replay_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-queue stored webhook events for processing, or import events "
+        "from a JSONL file (one provider event per line) for backfills."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help="JSONL file of events to import; duplicates are skipped.")
+        parser.add_argument('--status', action='append', choices=WebhookEvent.Status.values)
+        parser.add_argument('--type', dest='event_type')
+        parser.add_argument('--intent', help="Only events for this payment intent id.")
+        parser.add_argument('--since', help="ISO date or datetime of event creation (inclusive).")
+        parser.add_argument('--until', help="ISO date or datetime of event creation (exclusive).")
+
+    def handle(self, *args, **options):
+        if options['file']:
+            imported = 0
+            batch = []
+            with open(options['file'], encoding='utf-8') as fh:
+                for line in fh:
+                    if line.strip():
+                        batch.append(json.loads(line))
+                    if len(batch) >= 1000:
+                        imported += ingest_events(batch)
+                        batch = []
+            if batch:
+                imported += ingest_events(batch)
+            self.stdout.write(self.style.SUCCESS(f"Imported {imported} new events."))
+            return
+
+        try:
+            since = parse_moment(options['since'])
+            until = parse_moment(options['until'])
+        except ValueError as exc:
+            raise CommandError(f"Invalid date: {exc}")
+        events = WebhookEvent.objects.filter(
+            status__in=options['status'] or [WebhookEvent.Status.FAILED]
+        )
+        if options['event_type']:
+            events = events.filter(event_type=options['event_type'])
+        if options['intent']:
+            events = events.filter(payment_intent_id=options['intent'])
+        if since:
+            events = events.filter(event_created__gte=since)
+        if until:
+            events = events.filter(event_created__lt=until)
+        self.stdout.write(self.style.SUCCESS(f"Re-queued {replay_events(events)} events."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from apps.payments.payouts import BATCH_SIZE, MAX_WORKERS, run_payouts
+
+
+class Command(BaseCommand):
+    help = "Send due pending payouts through the configured payout gateway."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+        parser.add_argument('--max-batches', type=int, default=None)
+
+    def handle(self, *args, **options):
+        outcomes = run_payouts(
+            batch_size=options['batch_size'],
+            max_workers=options['workers'],
+            max_batches=options['max_batches'],
+        )
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(outcomes.items())) or "nothing due"
+        self.stdout.write(self.style.SUCCESS(f"Payouts: {summary}."))
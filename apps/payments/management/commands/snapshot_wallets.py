@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from apps.payments.ledger import snapshot_wallets
+
+
+class Command(BaseCommand):
+    help = "Fold new wallet ledger entries into balance snapshots."
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Snapshotted {snapshot_wallets()} wallets."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from apps.payments.ledger import CHUNK_SIZE, snapshot_wallets, sync_ledger
+
+
+class Command(BaseCommand):
+    help = "Append wallet ledger entries for new royalties, payouts and deposits."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--snapshot', action='store_true', help="Snapshot wallet balances afterwards.")
+
+    def handle(self, *args, **options):
+        for name, rows in sync_ledger(chunk_size=options['chunk_size']).items():
+            self.stdout.write(f"{name}: {rows} source rows")
+        if options['snapshot']:
+            self.stdout.write(f"Snapshotted {snapshot_wallets()} wallets.")
+        self.stdout.write(self.style.SUCCESS("Ledger is up to date."))
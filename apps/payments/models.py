@@ -48,6 +48,7 @@ class Transaction(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['stripe_payment_intent_id'])]
         verbose_name = _('Transaction')
         verbose_name_plural = _('Transactions')
     
@@ -78,6 +79,68 @@ class Wallet(models.Model):
         return f"Wallet for {self.user.email} - {self.balance} {self.currency}"
 
 
+class WalletEntry(models.Model):
+    """Append-only wallet ledger entry; amounts are signed."""
+    
+    class Bucket(models.TextChoices):
+        AVAILABLE = 'available', _('Available')
+        PENDING = 'pending', _('Pending')
+    
+    class Kind(models.TextChoices):
+        ROYALTY = 'royalty', _('Royalty Credit')
+        DEPOSIT = 'deposit', _('Deposit')
+        PAYOUT_RESERVE = 'payout_reserve', _('Payout Reserved')
+        PAYOUT_SETTLE = 'payout_settle', _('Payout Settled')
+        PAYOUT_RELEASE = 'payout_release', _('Payout Released')
+    
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.PROTECT,
+        related_name='entries'
+    )
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    bucket = models.CharField(max_length=20, choices=Bucket.choices)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    source_type = models.CharField(max_length=20)
+    source_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [models.Index(fields=['wallet', 'id'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source_type', 'source_id', 'kind', 'bucket'],
+                name='unique_wallet_entry_per_source_event',
+            ),
+        ]
+        verbose_name = _('Wallet Entry')
+        verbose_name_plural = _('Wallet Entries')
+    
+    def __str__(self):
+        return f"{self.kind} {self.amount} ({self.bucket}) - wallet {self.wallet_id}"
+
+
+class WalletSnapshot(models.Model):
+    """Wallet balances folded up to and including ``last_entry_id``."""
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name='snapshots'
+    )
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    pending_balance = models.DecimalField(max_digits=12, decimal_places=2)
+    last_entry_id = models.BigIntegerField()
+    as_of = models.DateTimeField()
+    
+    class Meta:
+        indexes = [models.Index(fields=['wallet', '-as_of'])]
+        verbose_name = _('Wallet Snapshot')
+        verbose_name_plural = _('Wallet Snapshots')
+    
+    def __str__(self):
+        return f"Wallet {self.wallet_id} @ {self.as_of}"
+
+
 class Payout(models.Model):
     """Model for author payouts."""
     
@@ -86,6 +149,7 @@ class Payout(models.Model):
         PROCESSING = 'processing', _('Processing')
         COMPLETED = 'completed', _('Completed')
         FAILED = 'failed', _('Failed')
+        NEEDS_REVIEW = 'needs_review', _('Needs Review')
     
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -98,12 +162,16 @@ class Payout(models.Model):
     payout_method = models.CharField(max_length=50, blank=True)
     stripe_transfer_id = models.CharField(max_length=128, blank=True)
     notes = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     processed_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
         verbose_name = _('Payout')
         verbose_name_plural = _('Payouts')
     
@@ -138,6 +206,57 @@ class Royalty(models.Model):
         ordering = ['-created_at']
         verbose_name = _('Royalty')
         verbose_name_plural = _('Royalties')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['order', 'book_id', 'author'],
+                name='unique_royalty_per_order_book_author',
+            ),
+        ]
     
     def __str__(self):
         return f"Royalty for {self.author.email} - {self.book_title}"
+
+
+class JobWatermark(models.Model):
+    """Position up to which a batch job has processed its source rows."""
+    name = models.CharField(max_length=100, unique=True)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Job Watermark')
+        verbose_name_plural = _('Job Watermarks')
+    
+    def __str__(self):
+        return f"{self.name} @ {self.last_timestamp} #{self.last_id}"
+
+
+class WebhookEvent(models.Model):
+    """Raw payment provider webhook, stored on receipt and applied by a worker."""
+    
+    class Status(models.TextChoices):
+        PENDING = 'pending', _('Pending')
+        PROCESSED = 'processed', _('Processed')
+        IGNORED = 'ignored', _('Ignored')
+        FAILED = 'failed', _('Failed')
+    
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    payment_intent_id = models.CharField(max_length=128, blank=True)
+    event_created = models.DateTimeField()
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    error_message = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [models.Index(fields=['status', 'event_created', 'id'])]
+        verbose_name = _('Webhook Event')
+        verbose_name_plural = _('Webhook Events')
+    
+    def __str__(self):
+        return f"{self.event_type} {self.event_id} ({self.status})"
@@ -0,0 +1,259 @@
+"""
+Payout processing.
+
+``run_payouts`` claims due pending payouts in batches with
+``SELECT ... FOR UPDATE SKIP LOCKED`` (so several runners never pick the same
+rows), marks them processing and commits before talking to the gateway.
+Transfers are issued concurrently on a bounded thread pool and the outcomes
+are written back with one bulk update per batch. Transient gateway errors
+are retried with exponential backoff and jitter until ``MAX_ATTEMPTS``.
+
+Only an explicit ``GatewayError`` fails a payout. Any other error (a timeout,
+a dropped connection, a bug after the request went out) may hide a transfer
+that did happen, so it is retried as transient under the same idempotency
+key. If the attempts run out, the payout is parked as ``needs_review`` with
+its funds still reserved, rather than failed and released.
+
+The gateway is pluggable through ``PAYMENTS_PAYOUT_GATEWAY``.
+``FakeStripeGateway`` is an in-process stand-in with configurable latency
+and failure rates, used to benchmark the runner without network access.
+Every transfer carries the idempotency key ``payout-<id>``, so a payout
+reclaimed after a crash is never paid twice.
+"""
+
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Payout
+
+BATCH_SIZE = 100
+MAX_WORKERS = 8
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=6)
+# Payouts left in processing this long (a crashed runner) are claimed again.
+CLAIM_TIMEOUT = timedelta(minutes=15)
+
+
+class GatewayError(Exception):
+    """A transfer failed and should not be retried."""
+
+
+class TransientGatewayError(GatewayError):
+    """A transfer failed in a way that may succeed on retry."""
+
+
+# Currencies Stripe amounts are expressed in whole units of.
+ZERO_DECIMAL_CURRENCIES = {
+    'BIF', 'CLP', 'DJF', 'GNF', 'JPY', 'KMF', 'KRW', 'MGA',
+    'PYG', 'RWF', 'UGX', 'VND', 'VUV', 'XAF', 'XOF', 'XPF',
+}
+
+
+def minor_units(amount, currency):
+    """``amount`` in the currency's smallest unit, as Stripe expects it."""
+    if currency.upper() in ZERO_DECIMAL_CURRENCIES:
+        if amount != amount.to_integral_value():
+            raise GatewayError(f"{currency} amounts must be whole units.")
+        return int(amount)
+    return int((amount * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+class PayoutRequest:
+    """What a gateway needs to send one payout."""
+
+    def __init__(self, payout_id, amount, currency, destination):
+        self.payout_id = payout_id
+        self.amount = amount
+        self.currency = currency
+        self.destination = destination
+
+    @property
+    def idempotency_key(self):
+        return f"payout-{self.payout_id}"
+
+
+class PayoutGateway:
+    """Interface for payout providers."""
+
+    def transfer(self, request):
+        """Send ``request`` and return the provider's transfer id."""
+        raise NotImplementedError
+
+
+class StripeGateway(PayoutGateway):
+    """Stripe Connect transfers to the author's connected account."""
+
+    def __init__(self):
+        import stripe
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+        self.stripe = stripe
+
+    def transfer(self, request):
+        if not request.destination:
+            raise GatewayError("No connected Stripe account.")
+        errors = self.stripe.error
+        try:
+            transfer = self.stripe.Transfer.create(
+                amount=minor_units(request.amount, request.currency),
+                currency=request.currency.lower(),
+                destination=request.destination,
+                metadata={'payout_id': request.payout_id},
+                idempotency_key=request.idempotency_key,
+            )
+        except (errors.RateLimitError, errors.APIConnectionError) as exc:
+            raise TransientGatewayError(str(exc))
+        except errors.APIError as exc:
+            raise TransientGatewayError(str(exc))
+        except errors.StripeError as exc:
+            raise GatewayError(str(exc))
+        return transfer.id
+
+
+class FakeStripeGateway(PayoutGateway):
+    """
+    In-process Stripe stand-in. Sleeps ``latency`` seconds per call and fails
+    at the given rates; repeated idempotency keys return the first transfer.
+    """
+
+    def __init__(self, latency=0.05, transient_failure_rate=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.transient_failure_rate = transient_failure_rate
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.transfers = {}
+        self.lock = threading.Lock()
+
+    def transfer(self, request):
+        time.sleep(self.latency)
+        with self.lock:
+            if request.idempotency_key in self.transfers:
+                return self.transfers[request.idempotency_key]
+            roll = self.random.random()
+            if roll < self.failure_rate:
+                raise GatewayError("Fake permanent failure.")
+            if roll < self.failure_rate + self.transient_failure_rate:
+                raise TransientGatewayError("Fake rate limit.")
+            transfer_id = f"tr_fake_{uuid.uuid4().hex[:16]}"
+            self.transfers[request.idempotency_key] = transfer_id
+            return transfer_id
+
+
+def get_gateway():
+    return import_string(getattr(settings, 'PAYMENTS_PAYOUT_GATEWAY', 'apps.payments.payouts.StripeGateway'))()
+
+
+def backoff(attempts):
+    """Delay before retry number ``attempts``: exponential, capped and jittered."""
+    delay = min(BACKOFF_BASE * (2 ** (attempts - 1)), BACKOFF_MAX)
+    return timedelta(seconds=random.uniform(delay.total_seconds() / 2, delay.total_seconds()))
+
+
+def claim_payouts(batch_size=BATCH_SIZE, now=None):
+    """Mark up to ``batch_size`` due payouts as processing and return them as requests."""
+    now = now or timezone.now()
+    due = Payout.objects.filter(
+        Q(status=Payout.Status.PENDING, next_attempt_at__isnull=True)
+        | Q(status=Payout.Status.PENDING, next_attempt_at__lte=now)
+        | Q(status=Payout.Status.PROCESSING, updated_at__lt=now - CLAIM_TIMEOUT)
+    )
+    with transaction.atomic():
+        ids = list(
+            due.select_for_update(skip_locked=True)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        Payout.objects.filter(id__in=ids).update(status=Payout.Status.PROCESSING, updated_at=now)
+        rows = (
+            Payout.objects.filter(id__in=ids)
+            .order_by('id')
+            .values_list('id', 'amount', 'currency', 'attempts', 'user__wallet__stripe_account_id')
+        )
+        return [
+            (PayoutRequest(payout_id, amount, currency, destination), attempts)
+            for payout_id, amount, currency, attempts, destination in rows
+        ]
+
+
+def _send(gateway, request):
+    try:
+        return request, gateway.transfer(request), None
+    except GatewayError as exc:
+        return request, None, exc
+    except Exception as exc:
+        # The transfer may have gone through; retrying with the same
+        # idempotency key lets the gateway return it instead of paying twice.
+        return request, None, TransientGatewayError(repr(exc))
+
+
+def record_results(results, attempts, now=None):
+    """Write gateway outcomes back with a single bulk update."""
+    now = now or timezone.now()
+    payouts = []
+    for request, transfer_id, error in results:
+        payout = Payout(id=request.payout_id, attempts=attempts[request.payout_id] + 1, updated_at=now)
+        if error is None:
+            payout.status = Payout.Status.COMPLETED
+            payout.stripe_transfer_id = transfer_id
+            payout.processed_at = now
+            payout.next_attempt_at = None
+            payout.last_error = ''
+        elif isinstance(error, TransientGatewayError) and payout.attempts < MAX_ATTEMPTS:
+            payout.status = Payout.Status.PENDING
+            payout.stripe_transfer_id = ''
+            payout.processed_at = None
+            payout.next_attempt_at = now + backoff(payout.attempts)
+            payout.last_error = str(error)
+        elif isinstance(error, TransientGatewayError):
+            # The outcome is unknown; keep the funds reserved for a person to check.
+            payout.status = Payout.Status.NEEDS_REVIEW
+            payout.stripe_transfer_id = ''
+            payout.processed_at = None
+            payout.next_attempt_at = None
+            payout.last_error = str(error)
+        else:
+            payout.status = Payout.Status.FAILED
+            payout.stripe_transfer_id = ''
+            payout.processed_at = now
+            payout.next_attempt_at = None
+            payout.last_error = str(error)
+        payouts.append(payout)
+    Payout.objects.bulk_update(payouts, [
+        'status', 'attempts', 'stripe_transfer_id', 'processed_at',
+        'next_attempt_at', 'last_error', 'updated_at',
+    ])
+    return payouts
+
+
+def run_payouts(gateway=None, batch_size=BATCH_SIZE, max_workers=MAX_WORKERS, max_batches=None):
+    """
+    Process due payouts until none are left (or ``max_batches`` is reached).
+    Returns ``{status: count}`` of the outcomes.
+    """
+    gateway = gateway or get_gateway()
+    outcomes = {}
+    batches = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while max_batches is None or batches < max_batches:
+            claimed = claim_payouts(batch_size)
+            if not claimed:
+                break
+            attempts = {request.payout_id: count for request, count in claimed}
+            results = list(pool.map(lambda request: _send(gateway, request), [request for request, _ in claimed]))
+            for payout in record_results(results, attempts):
+                outcomes[payout.status] = outcomes.get(payout.status, 0) + 1
+            batches += 1
+    return outcomes
@@ -0,0 +1,126 @@
+"""
+Royalty computation.
+
+Completed orders are read in ``(updated_at, id)`` order from a stored
+watermark, a chunk at a time. For each chunk the order items and the authors
+of their books are loaded with one query each, every item is expanded into
+one ``Royalty`` per author and the rows are inserted with ``bulk_create``.
+The watermark moves in the same transaction, and a unique constraint on
+``(order, book_id, author)`` makes re-running any range harmless.
+
+Amounts are exact: the royalty for an item is ``subtotal * rate / 100``
+rounded half-up to cents, then split between co-authors so the shares add
+up to that amount to the cent.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.books.models import Book
+from apps.marketplace.models import Order, OrderItem
+from .models import JobWatermark, Royalty
+
+WATERMARK = 'royalties'
+CHUNK_SIZE = 1000
+CENTS = Decimal('0.01')
+DEFAULT_ROYALTY_RATE = Decimal('70.00')
+# Orders updated within this window are left for the next run, so a
+# transaction that commits late cannot slip behind the watermark.
+SETTLE_DELAY = timedelta(minutes=5)
+
+
+def royalty_rate():
+    return Decimal(str(getattr(settings, 'PAYMENTS_ROYALTY_RATE', DEFAULT_ROYALTY_RATE)))
+
+
+def split_amount(total, parts):
+    """
+    Split ``total`` into ``parts`` cent amounts that sum exactly to ``total``.
+    Leftover cents go to the first shares.
+    """
+    if parts <= 0:
+        return []
+    share = (total / parts).quantize(CENTS, rounding=ROUND_DOWN)
+    remainder = int((total - share * parts) / CENTS)
+    return [share + CENTS if index < remainder else share for index in range(parts)]
+
+
+def _authors_by_book(book_ids):
+    """``{book_id: [author user id, ...]}`` for authors linked to a user account."""
+    authors = defaultdict(list)
+    rows = (
+        Book.authors.through.objects.filter(book_id__in=book_ids, author__user_id__isnull=False)
+        .order_by('book_id', 'author_id')
+        .values_list('book_id', 'author__user_id')
+    )
+    for book_id, user_id in rows:
+        authors[book_id].append(user_id)
+    return authors
+
+
+def royalties_for_orders(order_ids, rate=None):
+    """Build the unsaved ``Royalty`` rows for the items of ``order_ids``."""
+    rate = royalty_rate() if rate is None else rate
+    items = list(
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .order_by('order_id', 'id')
+        .values('order_id', 'book_id', 'book_title', 'book_price', 'quantity', 'subtotal', 'order__currency')
+    )
+    authors = _authors_by_book({item['book_id'] for item in items})
+    royalties = []
+    for item in items:
+        author_ids = authors.get(item['book_id'])
+        if not author_ids:
+            continue
+        amount = (item['subtotal'] * rate / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+        for author_id, share in zip(author_ids, split_amount(amount, len(author_ids))):
+            royalties.append(Royalty(
+                author_id=author_id,
+                book_id=item['book_id'],
+                book_title=item['book_title'],
+                order_id=item['order_id'],
+                quantity=item['quantity'],
+                list_price=item['book_price'],
+                royalty_rate=rate,
+                royalty_amount=share,
+                currency=item['order__currency'],
+            ))
+    return royalties
+
+
+def compute_royalties(chunk_size=CHUNK_SIZE, now=None, rate=None, max_chunks=None):
+    """
+    Create royalties for completed orders past the watermark.
+
+    Returns ``(orders, royalties)`` processed. Stops when caught up or after
+    ``max_chunks`` chunks.
+    """
+    cutoff = (now or timezone.now()) - SETTLE_DELAY
+    JobWatermark.objects.get_or_create(name=WATERMARK)
+    orders_done = royalties_done = chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        with transaction.atomic():
+            watermark = JobWatermark.objects.select_for_update().get(name=WATERMARK)
+            pending = Order.objects.filter(status=Order.Status.COMPLETED, updated_at__lte=cutoff)
+            if watermark.last_timestamp is not None:
+                pending = pending.filter(
+                    Q(updated_at__gt=watermark.last_timestamp)
+                    | Q(updated_at=watermark.last_timestamp, id__gt=watermark.last_id)
+                )
+            chunk = list(pending.order_by('updated_at', 'id').values_list('id', 'updated_at')[:chunk_size])
+            if not chunk:
+                break
+            royalties = royalties_for_orders([order_id for order_id, _ in chunk], rate)
+            Royalty.objects.bulk_create(royalties, batch_size=1000, ignore_conflicts=True)
+            watermark.last_id, watermark.last_timestamp = chunk[-1]
+            watermark.save(update_fields=['last_id', 'last_timestamp', 'updated_at'])
+        orders_done += len(chunk)
+        royalties_done += len(royalties)
+        chunks += 1
+    return orders_done, royalties_done
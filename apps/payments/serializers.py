@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Transaction, Wallet, Payout, Royalty
+from .models import Transaction, Wallet, WalletEntry, Payout, Royalty
 
 
 class TransactionSerializer(serializers.ModelSerializer):
@@ -27,6 +27,15 @@ class WalletSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
+class WalletEntrySerializer(serializers.ModelSerializer):
+    """Serializer for WalletEntry model."""
+    
+    class Meta:
+        model = WalletEntry
+        fields = ['id', 'kind', 'bucket', 'amount', 'source_type', 'source_id', 'created_at']
+        read_only_fields = fields
+
+
 class PayoutSerializer(serializers.ModelSerializer):
     """Serializer for Payout model."""
     
@@ -1 +1,8 @@
-urlpatterns = []
+from django.urls import path
+from .views import ExportView, WalletView, StripeWebhookView
+
+urlpatterns = [
+    path('wallet/', WalletView.as_view(), name='wallet'),
+    path('webhooks/stripe/', StripeWebhookView.as_view(), name='stripe-webhook'),
+    path('exports/<slug:dataset>.<slug:fmt>', ExportView.as_view(), name='export'),
+]
@@ -1,3 +1,105 @@
-from django.shortcuts import render
+from rest_framework import generics, status
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .exports import DATASETS, FORMATS, CONTENT_TYPES, parse_moment, stream_export
+from .ledger import wallet_balance
+from .models import Wallet, WalletEntry
+from .serializers import WalletEntrySerializer
+from .webhooks import InvalidSignature, WebhookNotConfigured, receive
 
-# Create your views here.
+
+class ExportView(APIView):
+    """
+    Stream order, order item, transaction or royalty history as CSV or JSONL.
+    
+    Users export their own rows (royalties they earned); staff export
+    everyone's, optionally narrowed with ``user_id``. ``since``/``until``
+    bound the creation date and ``gzip=1`` compresses the stream.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, dataset, fmt):
+        if dataset not in DATASETS or fmt not in FORMATS:
+            return Response(
+                {"error": f"Unknown export {dataset}.{fmt}."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            since = parse_moment(request.query_params.get('since'))
+            until = parse_moment(request.query_params.get('until'))
+        except ValueError:
+            return Response(
+                {"error": "since and until must be ISO dates or datetimes."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        owner_id = request.user.id
+        if request.user.is_staff:
+            owner_id = request.query_params.get('user_id') or None
+        
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        filename = f"{dataset}-{timezone.now():%Y%m%d%H%M%S}.{fmt}"
+        response = StreamingHttpResponse(
+            stream_export(dataset, fmt, compress, owner_id=owner_id, since=since, until=until),
+            content_type='application/gzip' if compress else CONTENT_TYPES[fmt],
+        )
+        if compress:
+            filename += '.gz'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class WalletView(generics.GenericAPIView):
+    """
+    The current user's wallet balance (optionally as of ``at``) and its
+    ledger entries, newest first.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = WalletEntrySerializer
+    
+    def get(self, request):
+        try:
+            at = parse_moment(request.query_params.get('at'))
+        except ValueError:
+            return Response(
+                {"error": "at must be an ISO date or datetime."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        wallet, _ = Wallet.objects.get_or_create(user=request.user)
+        balance = wallet_balance(wallet, at=at)
+        entries = WalletEntry.objects.filter(wallet=wallet).order_by('-id')
+        if at is not None:
+            entries = entries.filter(created_at__lte=at)
+        page = self.paginate_queryset(entries)
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        response.data['balance'] = str(balance.available)
+        response.data['pending_balance'] = str(balance.pending)
+        response.data['currency'] = wallet.currency
+        return response
+
+
+class StripeWebhookView(APIView):
+    """
+    Receive Stripe webhooks. Events are only verified and stored here; a
+    worker applies them (see ``process_webhook_events``).
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    
+    def post(self, request):
+        try:
+            receive(request.body, request.headers.get('Stripe-Signature'))
+        except WebhookNotConfigured:
+            # Refuse rather than accept unverifiable events; Stripe retries.
+            return Response(
+                {"error": "Webhooks are not configured."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        except InvalidSignature as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({"error": "Invalid event payload."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"received": True})
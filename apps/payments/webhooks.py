@@ -0,0 +1,307 @@
+"""
+Payment webhook inbox.
+
+The webhook endpoint only verifies the signature and inserts the raw event
+into ``WebhookEvent``; the unique ``event_id`` turns provider retries into
+no-ops, and the provider gets its 200 right away. ``process_events`` later
+claims pending events in batches with ``SKIP LOCKED`` and applies them to
+``Transaction`` and ``Order`` in ``event_created`` order per payment intent.
+An intent whose earlier events are still held by another worker is skipped
+until those are done, and each transaction remembers the creation time of
+the last event applied to it, so a late, older event cannot undo a newer
+state. Events from the same second are ordered by ``STATUS_RANK``. Completed,
+cancelled and refunded payments are terminal: the only move out of one is an
+explicit refund of a completed payment. A cancelled order is never completed
+or reopened by a late payment event. The payment is flagged ``needs_refund``
+on its transaction instead.
+
+Events that fail, or arrive before their transaction exists, are retried up
+to ``MAX_ATTEMPTS`` times. Retries wait ``next_attempt_at`` out, with an
+exponential, jittered backoff. A payment whose transaction is recorded late
+therefore gets minutes rather than seconds to show up.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from apps.marketplace.models import Order
+from .models import Transaction, WebhookEvent
+
+BATCH_SIZE = 200
+MAX_ATTEMPTS = 5
+SIGNATURE_TOLERANCE = 300
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=1)
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidSignature(Exception):
+    """The webhook signature is missing, malformed, stale or wrong."""
+
+
+class WebhookNotConfigured(Exception):
+    """No webhook signing secret is configured, so no event can be trusted."""
+
+
+def verify_signature(payload, header, secret, tolerance=SIGNATURE_TOLERANCE, now=None):
+    """Check a Stripe ``Stripe-Signature`` header (``t=...,v1=...``) against ``payload`` bytes."""
+    parts = defaultdict(list)
+    for item in (header or '').split(','):
+        key, _, value = item.strip().partition('=')
+        parts[key].append(value)
+    try:
+        timestamp = int(parts['t'][0])
+    except (IndexError, ValueError):
+        raise InvalidSignature("Missing timestamp.")
+    if abs((now or time.time()) - timestamp) > tolerance:
+        raise InvalidSignature("Timestamp outside the tolerance window.")
+    signed = f"{timestamp}.".encode('utf-8') + payload
+    expected = hmac.new(secret.encode('utf-8'), signed, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, candidate) for candidate in parts['v1']):
+        raise InvalidSignature("No matching signature.")
+
+
+def _payment_intent_id(event):
+    obj = event.get('data', {}).get('object', {})
+    if obj.get('object') == 'payment_intent':
+        return obj.get('id', '')
+    return obj.get('payment_intent') or ''
+
+
+def _event_row(event):
+    return WebhookEvent(
+        event_id=event['id'],
+        event_type=event.get('type', ''),
+        payment_intent_id=_payment_intent_id(event),
+        event_created=datetime.fromtimestamp(event.get('created', time.time()), tz=dt_timezone.utc),
+        payload=event,
+    )
+
+
+def ingest_events(events):
+    """Store raw events, ignoring ids already received. Returns how many were new."""
+    rows = {}
+    for event in events:
+        row = _event_row(event)
+        rows.setdefault(row.event_id, row)
+    known = set(WebhookEvent.objects.filter(event_id__in=rows.keys()).values_list('event_id', flat=True))
+    created = 0
+    for event_id, row in rows.items():
+        if event_id in known:
+            continue
+        # One insert per event, so a concurrent delivery of the same id is
+        # counted by whichever insert wins.
+        try:
+            with transaction.atomic():
+                row.save(force_insert=True)
+        except IntegrityError:
+            continue
+        created += 1
+    return created
+
+
+def receive(payload, signature_header):
+    """
+    Verify and store one webhook body. Raises ``WebhookNotConfigured``,
+    ``InvalidSignature`` or ``ValueError``.
+    """
+    secret = getattr(settings, 'STRIPE_WEBHOOK_SECRET', '')
+    if not secret:
+        raise WebhookNotConfigured("STRIPE_WEBHOOK_SECRET is not set.")
+    verify_signature(payload, signature_header, secret)
+    event = json.loads(payload)
+    if not isinstance(event, dict) or 'id' not in event:
+        raise ValueError("Not an event.")
+    return ingest_events([event])
+
+
+# Event type -> (transaction status, order status or None)
+TRANSITIONS = {
+    'payment_intent.processing': (Transaction.Status.PROCESSING, Order.Status.PROCESSING),
+    'payment_intent.succeeded': (Transaction.Status.COMPLETED, Order.Status.COMPLETED),
+    'payment_intent.payment_failed': (Transaction.Status.FAILED, None),
+    'payment_intent.canceled': (Transaction.Status.CANCELLED, Order.Status.CANCELLED),
+    'charge.refunded': (Transaction.Status.REFUNDED, Order.Status.REFUNDED),
+}
+
+
+# How far along the payment lifecycle a status is. Stripe timestamps have
+# one-second resolution, so events from the same second are ordered by rank.
+STATUS_RANK = {
+    Transaction.Status.PENDING: 0,
+    Transaction.Status.PROCESSING: 1,
+    Transaction.Status.FAILED: 2,
+    Transaction.Status.COMPLETED: 3,
+    Transaction.Status.CANCELLED: 3,
+    Transaction.Status.REFUNDED: 4,
+}
+# Terminal statuses are never moved back, and only leave by these moves.
+TERMINAL = {
+    Transaction.Status.COMPLETED: {Transaction.Status.REFUNDED},
+    Transaction.Status.CANCELLED: set(),
+    Transaction.Status.REFUNDED: set(),
+}
+
+
+def _supersedes(record, transaction_status, created):
+    """Whether an event creating ``transaction_status`` at ``created`` may overwrite ``record``."""
+    if record.status in TERMINAL:
+        return transaction_status in TERMINAL[record.status]
+    last_created = record.metadata.get('last_event_created', 0)
+    if created < last_created:
+        return False
+    if created == last_created:
+        return STATUS_RANK[transaction_status] >= STATUS_RANK.get(record.status, 0)
+    return True
+
+
+def _apply(event, transactions):
+    """Apply one event to the transactions of its payment intent."""
+    transaction_status, order_status = TRANSITIONS[event.event_type]
+    obj = event.payload.get('data', {}).get('object', {})
+    created = event.event_created.timestamp()
+    for record in transactions:
+        if not _supersedes(record, transaction_status, created):
+            continue
+        record.status = transaction_status
+        record.metadata['last_event_created'] = created
+        if transaction_status == Transaction.Status.COMPLETED:
+            record.completed_at = event.event_created
+            record.stripe_charge_id = obj.get('latest_charge') or record.stripe_charge_id
+        elif transaction_status == Transaction.Status.FAILED:
+            record.error_message = (obj.get('last_payment_error') or {}).get('message', '')
+        record.save(update_fields=[
+            'status', 'metadata', 'completed_at', 'stripe_charge_id', 'error_message', 'updated_at',
+        ])
+        order = record.order
+        if order is not None and order.status == Order.Status.CANCELLED and order_status != Order.Status.REFUNDED:
+            # The order expired and its promo reservation was released, so it
+            # cannot be completed (or revived) now. Money that arrived anyway
+            # has to be returned.
+            if transaction_status == Transaction.Status.COMPLETED:
+                record.metadata['needs_refund'] = True
+                record.error_message = f"Payment succeeded after order {order.order_number} was cancelled."
+                record.save(update_fields=['metadata', 'error_message', 'updated_at'])
+                logger.warning("Payment %s succeeded for cancelled order %s; refund needed",
+                               event.payment_intent_id, order.order_number)
+            continue
+        if order_status and order is not None and order.status != order_status:
+            order.status = order_status
+            if order_status == Order.Status.COMPLETED:
+                order.paid_at = order.paid_at or event.event_created
+                order.payment_id = event.payment_intent_id
+            # save() rather than update() so order signals (entitlements,
+            # promo redemptions) run.
+            order.save(update_fields=['status', 'paid_at', 'payment_id', 'updated_at'])
+
+
+def backoff(attempts):
+    """Delay before retry number ``attempts``: exponential, capped and jittered."""
+    delay = min(BACKOFF_BASE * (2 ** (attempts - 1)), BACKOFF_MAX)
+    return timedelta(seconds=random.uniform(delay.total_seconds() / 2, delay.total_seconds()))
+
+
+def _retry_or_fail(event, error_message, now):
+    event.error_message = error_message
+    if event.attempts >= MAX_ATTEMPTS:
+        event.status = WebhookEvent.Status.FAILED
+        event.next_attempt_at = None
+    else:
+        event.status = WebhookEvent.Status.PENDING
+        event.next_attempt_at = now + backoff(event.attempts)
+
+
+def _claim(batch_size, now):
+    """
+    Lock a batch of due pending events, dropping intents with earlier events
+    held elsewhere or still waiting for a retry.
+    """
+    events = list(
+        WebhookEvent.objects.select_for_update(skip_locked=True)
+        .filter(status=WebhookEvent.Status.PENDING)
+        .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+        .order_by('event_created', 'id')[:batch_size]
+    )
+    intents = {event.payment_intent_id for event in events if event.payment_intent_id}
+    blocked = set()
+    if intents:
+        earliest = defaultdict(lambda: None)
+        for event in events:
+            if earliest[event.payment_intent_id] is None:
+                earliest[event.payment_intent_id] = event.event_created
+        others = (
+            WebhookEvent.objects.filter(status=WebhookEvent.Status.PENDING, payment_intent_id__in=intents)
+            .exclude(id__in=[event.id for event in events])
+            .values('payment_intent_id')
+            .annotate(first=Min('event_created'))
+            .order_by()
+        )
+        blocked = {
+            row['payment_intent_id'] for row in others
+            if row['first'] < earliest[row['payment_intent_id']]
+        }
+    return [event for event in events if event.payment_intent_id not in blocked]
+
+
+def process_events(batch_size=BATCH_SIZE):
+    """Apply one batch of pending events. Returns ``{status: count}``."""
+    outcomes = defaultdict(int)
+    now = timezone.now()
+    with transaction.atomic():
+        events = _claim(batch_size, now)
+        by_intent = defaultdict(list)
+        for event in events:
+            by_intent[event.payment_intent_id].append(event)
+        transactions = defaultdict(list)
+        for record in (
+            Transaction.objects.select_related('order')
+            .filter(stripe_payment_intent_id__in=[intent for intent in by_intent if intent])
+            .order_by('id')
+        ):
+            transactions[record.stripe_payment_intent_id].append(record)
+
+        for intent, intent_events in by_intent.items():
+            for event in intent_events:
+                event.attempts += 1
+                event.processed_at = now
+                if event.event_type not in TRANSITIONS or not intent:
+                    event.status = WebhookEvent.Status.IGNORED
+                elif not transactions[intent]:
+                    # The transaction may not be recorded yet; retry later.
+                    _retry_or_fail(event, f"No transaction for payment intent {intent}.", now)
+                else:
+                    try:
+                        with transaction.atomic():
+                            _apply(event, transactions[intent])
+                        event.status = WebhookEvent.Status.PROCESSED
+                        event.next_attempt_at = None
+                        event.error_message = ''
+                    except Exception as exc:
+                        # The savepoint rolled back; drop the in-memory changes too.
+                        for record in transactions[intent]:
+                            record.refresh_from_db()
+                        _retry_or_fail(event, repr(exc), now)
+                outcomes[event.status] += 1
+        WebhookEvent.objects.bulk_update(
+            events, ['status', 'attempts', 'next_attempt_at', 'processed_at', 'error_message']
+        )
+    return dict(outcomes)
+
+
+def replay_events(queryset):
+    """Queue the events in ``queryset`` to be applied again. Returns the count."""
+    return queryset.update(
+        status=WebhookEvent.Status.PENDING, attempts=0, next_attempt_at=None, error_message='', processed_at=None
+    )
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ReaderConfig(AppConfig):
     name = 'apps.reader'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,55 @@
+"""
+The "my library" view: books a user owns or has started reading.
+
+Entitlements and progress are read with one query each and merged in
+Python; book details are attached per page with ``hydrate_books``.
+"""
+
+from apps.books.hydration import hydrate_books
+from apps.marketplace.models import Entitlement
+from .models import ReadingProgress
+
+PROGRESS_FIELDS = [
+    'book_id', 'current_page', 'current_chapter_id', 'percent_complete',
+    'last_read_at', 'finished_at',
+]
+
+
+def library_entries(user):
+    """Return library entries for ``user``, most recently active first."""
+    purchases = Entitlement.objects.filter(user=user).values_list('book_id', 'granted_at')
+    entries = {
+        book_id: {
+            'book_id': book_id,
+            'purchased': True,
+            'purchased_at': granted_at,
+            'progress': None,
+        }
+        for book_id, granted_at in purchases
+    }
+    for row in ReadingProgress.objects.filter(user=user).values(*PROGRESS_FIELDS):
+        entry = entries.setdefault(row['book_id'], {
+            'book_id': row['book_id'],
+            'purchased': False,
+            'purchased_at': None,
+        })
+        entry['progress'] = row
+
+    def last_activity(entry):
+        moments = [entry['purchased_at']]
+        if entry['progress']:
+            moments.append(entry['progress']['last_read_at'])
+        return max(moment for moment in moments if moment is not None)
+
+    return sorted(entries.values(), key=last_activity, reverse=True)
+
+
+def hydrate_entries(entries):
+    """Attach book summaries to ``entries``, dropping books that no longer exist."""
+    books = hydrate_books(entry['book_id'] for entry in entries)
+    hydrated = []
+    for entry in entries:
+        book = books.get(entry['book_id'])
+        if book is not None:
+            hydrated.append({**entry, 'book': book})
+    return hydrated
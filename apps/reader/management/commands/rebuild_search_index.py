@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from apps.reader.models import Highlight, Note, SearchToken
+from apps.reader.search import index_items
+
+
+class Command(BaseCommand):
+    help = "Rebuild the note and highlight search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Only rebuild this user id.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        for model in (Note, Highlight):
+            queryset = model.objects.order_by('id')
+            if options['user']:
+                queryset = queryset.filter(user_id=options['user'])
+            batch = []
+            for instance in queryset.iterator(chunk_size=batch_size):
+                batch.append(instance)
+                if len(batch) >= batch_size:
+                    index_items(batch)
+                    total += len(batch)
+                    batch = []
+            index_items(batch)
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} items ({SearchToken.objects.count()} tokens)."
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from apps.reader.models import Highlight
+from apps.reader.passages import dirty_chapter_ids, refresh_chapters, DEFAULT_MIN_COUNT
+
+
+class Command(BaseCommand):
+    help = "Recompute the most highlighted passages for chapters with new public highlights."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Rebuild every chapter with public highlights.")
+        parser.add_argument('--top', type=int, default=None, help="Passages to keep per chapter.")
+        parser.add_argument('--min-count', type=int, default=DEFAULT_MIN_COUNT)
+        parser.add_argument('--chunk-size', type=int, default=500, help="Chapters per batch.")
+
+    def handle(self, *args, **options):
+        if options['all']:
+            chapter_ids = (
+                Highlight.objects.filter(is_public=True, chapter__isnull=False)
+                .values_list('chapter_id', flat=True).distinct()
+            )
+        else:
+            chapter_ids = dirty_chapter_ids()
+        chapter_ids = sorted(set(chapter_ids))
+
+        chunk_size = options['chunk_size']
+        stored = 0
+        for i in range(0, len(chapter_ids), chunk_size):
+            stored += refresh_chapters(
+                chapter_ids[i:i + chunk_size],
+                top_n=options['top'],
+                min_count=options['min_count'],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {len(chapter_ids)} chapters, stored {stored} popular passages."
+        ))
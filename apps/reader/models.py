@@ -21,6 +21,7 @@ class ReadingProgress(models.Model):
     )
     percent_complete = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     last_position = models.TextField(blank=True)  # JSON for detailed position
+    client_updated_at = models.DateTimeField(null=True, blank=True)  # Device clock, used for last-writer-wins
     last_read_at = models.DateTimeField(auto_now=True)
     started_at = models.DateTimeField(auto_now_add=True)
     finished_at = models.DateTimeField(null=True, blank=True)
@@ -61,11 +62,21 @@ class Highlight(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', 'updated_at', 'id'])]
         verbose_name = _('Highlight')
         verbose_name_plural = _('Highlights')
     
     def __str__(self):
         return f"{self.user.email} - {self.text[:50]}..."
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored visibility and chapter so un-publishing or
+        # moving a highlight can still refresh the old chapter's passages.
+        instance._loaded_is_public = instance.__dict__.get('is_public')
+        instance._loaded_chapter_id = instance.__dict__.get('chapter_id')
+        return instance
 
 
 class Note(models.Model):
@@ -100,6 +111,7 @@ class Note(models.Model):
     
     class Meta:
         ordering = ['-updated_at']
+        indexes = [models.Index(fields=['user', 'updated_at', 'id'])]
         verbose_name = _('Note')
         verbose_name_plural = _('Notes')
     
@@ -126,11 +138,111 @@ class Bookmark(models.Model):
     position = models.PositiveIntegerField()
     note = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ['user', 'book_id', 'chapter']
+        indexes = [models.Index(fields=['user', 'updated_at', 'id'])]
         verbose_name = _('Bookmark')
         verbose_name_plural = _('Bookmarks')
     
     def __str__(self):
         return f"{self.user.email} - Book {self.book_id} at {self.page_number}"
+
+
+class PopularPassage(models.Model):
+    """Precomputed most-highlighted passage of a chapter."""
+    chapter = models.ForeignKey(
+        'books.Chapter',
+        on_delete=models.CASCADE,
+        related_name='popular_passages'
+    )
+    book_id = models.IntegerField()
+    rank = models.PositiveIntegerField()
+    position_start = models.PositiveIntegerField()
+    position_end = models.PositiveIntegerField()
+    highlight_count = models.PositiveIntegerField()
+    text = models.TextField(blank=True)
+    computed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['chapter', 'rank']
+        unique_together = ['chapter', 'rank']
+        verbose_name = _('Popular Passage')
+        verbose_name_plural = _('Popular Passages')
+    
+    def __str__(self):
+        return f"Chapter {self.chapter_id} #{self.rank} ({self.highlight_count} highlights)"
+
+
+class PassageRefreshState(models.Model):
+    """Tracks which chapters need their popular passages recomputed."""
+    chapter = models.OneToOneField(
+        'books.Chapter',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='passage_refresh_state'
+    )
+    dirtied_at = models.DateTimeField()
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = _('Passage Refresh State')
+        verbose_name_plural = _('Passage Refresh States')
+
+
+class SyncTombstone(models.Model):
+    """Record of a deleted highlight, note or bookmark for delta sync."""
+    
+    class ItemType(models.TextChoices):
+        HIGHLIGHT = 'highlight', _('Highlight')
+        NOTE = 'note', _('Note')
+        BOOKMARK = 'bookmark', _('Bookmark')
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='sync_tombstones'
+    )
+    item_type = models.CharField(max_length=20, choices=ItemType.choices)
+    item_id = models.BigIntegerField()
+    book_id = models.IntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [models.Index(fields=['user', 'deleted_at', 'id'])]
+        verbose_name = _('Sync Tombstone')
+        verbose_name_plural = _('Sync Tombstones')
+    
+    def __str__(self):
+        return f"{self.item_type} {self.item_id} deleted by user {self.user_id}"
+
+
+class SearchToken(models.Model):
+    """Inverted index entry for searching a user's notes and highlights."""
+    
+    class ItemType(models.TextChoices):
+        HIGHLIGHT = 'highlight', _('Highlight')
+        NOTE = 'note', _('Note')
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='search_tokens'
+    )
+    token = models.CharField(max_length=64)
+    item_type = models.CharField(max_length=20, choices=ItemType.choices)
+    item_id = models.BigIntegerField()
+    book_id = models.IntegerField()
+    weight = models.PositiveIntegerField(default=1)  # Field-boosted term frequency
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'token']),
+            models.Index(fields=['item_type', 'item_id']),
+        ]
+        verbose_name = _('Search Token')
+        verbose_name_plural = _('Search Tokens')
+    
+    def __str__(self):
+        return f"{self.token} -> {self.item_type} {self.item_id}"
@@ -0,0 +1,142 @@
+"""
+Popular highlighted passages.
+
+Public highlights of a chapter are merged with a sweep line over their
+``position_start``/``position_end`` ranges, which finds how many highlights
+cover each stretch of text in O(n log n) instead of comparing every pair.
+Stretches covered at least ``min_count`` times are then joined into maximal
+passages ranked by their peak coverage. The top N are therefore distinct
+passages, not slivers of the same one.
+"""
+
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Highlight, PopularPassage, PassageRefreshState
+
+DEFAULT_TOP_N = 5
+DEFAULT_MIN_COUNT = 2
+SNIPPET_LENGTH = 500
+
+
+def sweep_passages(ranges, min_count=DEFAULT_MIN_COUNT):
+    """
+    Turn ``(start, end)`` ranges into ``(start, end, count)`` passages.
+
+    Ends are exclusive. Adjacent stretches with the same coverage are merged,
+    and stretches covered by fewer than ``min_count`` ranges are dropped.
+    """
+    events = []
+    for start, end in ranges:
+        if end > start:
+            events.append((start, 1))
+            events.append((end, -1))
+    events.sort()
+
+    passages = []
+    depth = 0
+    previous = None
+    for position, group in groupby(events, key=lambda event: event[0]):
+        if previous is not None and depth >= min_count and position > previous:
+            if passages and passages[-1][1] == previous and passages[-1][2] == depth:
+                passages[-1] = (passages[-1][0], position, depth)
+            else:
+                passages.append((previous, position, depth))
+        depth += sum(delta for _, delta in group)
+        previous = position
+    return passages
+
+
+def merge_passages(segments):
+    """
+    Join touching or overlapping ``(start, end, count)`` segments into maximal
+    passages, each keeping its peak count.
+    """
+    passages = []
+    for start, end, count in sorted(segments):
+        if passages and start <= passages[-1][1]:
+            first, last, peak = passages[-1]
+            passages[-1] = (first, max(last, end), max(peak, count))
+        else:
+            passages.append((start, end, count))
+    return passages
+
+
+def top_passages(ranges, top_n=DEFAULT_TOP_N, min_count=DEFAULT_MIN_COUNT):
+    """Return the ``top_n`` hottest distinct passages, most highlighted and longest first."""
+    passages = merge_passages(sweep_passages(ranges, min_count=min_count))
+    passages.sort(key=lambda passage: (-passage[2], passage[0] - passage[1], passage[0]))
+    return passages[:top_n]
+
+
+def mark_chapters_dirty(chapter_ids):
+    """Flag chapters for the next incremental refresh with one upsert."""
+    now = timezone.now()
+    PassageRefreshState.objects.bulk_create(
+        [PassageRefreshState(chapter_id=chapter_id, dirtied_at=now) for chapter_id in set(chapter_ids)],
+        update_conflicts=True,
+        unique_fields=['chapter'],
+        update_fields=['dirtied_at'],
+    )
+
+
+def dirty_chapter_ids():
+    return PassageRefreshState.objects.filter(
+        Q(refreshed_at__isnull=True) | Q(refreshed_at__lt=F('dirtied_at'))
+    ).values_list('chapter_id', flat=True)
+
+
+def refresh_chapters(chapter_ids, top_n=None, min_count=DEFAULT_MIN_COUNT):
+    """
+    Recompute and store the top passages of ``chapter_ids``.
+
+    Public highlights for all given chapters are read in one query ordered by
+    chapter. Chapters dirtied again while this runs stay dirty.
+    """
+    from apps.books.models import Chapter
+
+    top_n = top_n or getattr(settings, 'READER_POPULAR_PASSAGES_TOP_N', DEFAULT_TOP_N)
+    chapter_ids = list(chapter_ids)
+    started_at = timezone.now()
+
+    highlights = (
+        Highlight.objects
+        .filter(chapter_id__in=chapter_ids, is_public=True)
+        .order_by('chapter_id')
+        .values_list('chapter_id', 'book_id', 'position_start', 'position_end')
+    )
+    computed = {}
+    for chapter_id, rows in groupby(highlights.iterator(chunk_size=5000), key=lambda row: row[0]):
+        rows = list(rows)
+        computed[chapter_id] = (
+            rows[0][1],
+            top_passages([(row[2], row[3]) for row in rows], top_n=top_n, min_count=min_count),
+        )
+
+    contents = dict(
+        Chapter.objects.filter(id__in=computed.keys()).values_list('id', 'content')
+    ) if computed else {}
+
+    passages = []
+    for chapter_id, (book_id, hottest) in computed.items():
+        content = contents.get(chapter_id, '')
+        for rank, (start, end, count) in enumerate(hottest, start=1):
+            passages.append(PopularPassage(
+                chapter_id=chapter_id,
+                book_id=book_id,
+                rank=rank,
+                position_start=start,
+                position_end=end,
+                highlight_count=count,
+                text=content[start:min(end, start + SNIPPET_LENGTH)],
+            ))
+
+    with transaction.atomic():
+        PopularPassage.objects.filter(chapter_id__in=chapter_ids).delete()
+        PopularPassage.objects.bulk_create(passages)
+        PassageRefreshState.objects.filter(chapter_id__in=chapter_ids).update(refreshed_at=started_at)
+    return len(passages)
@@ -0,0 +1,171 @@
+"""
+Per-user search over notes and highlights.
+
+Each note and highlight is tokenized on save into ``SearchToken`` rows
+(user, token, item). A query looks up its terms on the ``(user, token)``
+index, ranks items by TF-IDF and loads only the top matches.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.books.hydration import hydrate_books
+from .models import Highlight, Note, SearchToken
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TOKEN_LENGTH = 64
+SNIPPET_RADIUS = 60
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have he her his i in is it its '
+    'of on or she that the their them they this to was were will with you'.split()
+)
+
+# Searchable fields and their weight per model.
+FIELDS = {
+    Note: [('title', 2), ('content', 1)],
+    Highlight: [('text', 1), ('note', 1)],
+}
+ITEM_TYPES = {
+    Note: SearchToken.ItemType.NOTE,
+    Highlight: SearchToken.ItemType.HIGHLIGHT,
+}
+
+
+def tokenize(text):
+    return [
+        token for token in TOKEN_RE.findall((text or '').lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def _tokens_for(instance):
+    weights = Counter()
+    for field, boost in FIELDS[type(instance)]:
+        for token in tokenize(getattr(instance, field)):
+            weights[token[:MAX_TOKEN_LENGTH]] += boost
+    item_type = ITEM_TYPES[type(instance)]
+    return [
+        SearchToken(
+            user_id=instance.user_id,
+            token=token,
+            item_type=item_type,
+            item_id=instance.pk,
+            book_id=instance.book_id,
+            weight=weight,
+        )
+        for token, weight in weights.items()
+    ]
+
+
+def index_items(instances):
+    """Replace the index entries of ``instances`` (notes and/or highlights)."""
+    instances = list(instances)
+    if not instances:
+        return
+    condition = Q()
+    for model, item_type in ITEM_TYPES.items():
+        ids = [instance.pk for instance in instances if isinstance(instance, model)]
+        if ids:
+            condition |= Q(item_type=item_type, item_id__in=ids)
+    with transaction.atomic():
+        SearchToken.objects.filter(condition).delete()
+        SearchToken.objects.bulk_create(
+            [token for instance in instances for token in _tokens_for(instance)],
+            batch_size=1000,
+        )
+
+
+def unindex_item(instance):
+    SearchToken.objects.filter(item_type=ITEM_TYPES[type(instance)], item_id=instance.pk).delete()
+
+
+def _snippet(text, terms):
+    lowered = text.lower()
+    hits = [lowered.find(term) for term in terms]
+    hits = [hit for hit in hits if hit != -1]
+    if not hits:
+        return text[:SNIPPET_RADIUS * 2]
+    start = max(min(hits) - SNIPPET_RADIUS, 0)
+    end = min(min(hits) + SNIPPET_RADIUS, len(text))
+    return ('…' if start else '') + text[start:end] + ('…' if end < len(text) else '')
+
+
+def _snippet_hit(text, terms):
+    lowered = (text or '').lower()
+    return any(term in lowered for term in terms)
+
+
+def search(user, query, book_id=None, limit=20):
+    """
+    Return ranked matches for ``query`` in ``user``'s notes and highlights.
+
+    Every result carries a snippet, the book summary and chapter context.
+    The last query term also matches as a prefix for search-as-you-type.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+
+    condition = Q(token__in=terms[:-1]) | Q(token__startswith=terms[-1])
+    postings = SearchToken.objects.filter(condition, user=user)
+    if book_id is not None:
+        postings = postings.filter(book_id=book_id)
+
+    document_frequency = Counter()
+    scores = defaultdict(float)
+    rows = list(postings.values_list('token', 'item_type', 'item_id', 'weight'))
+    for token, _item_type, _item_id, _weight in rows:
+        document_frequency[token] += 1
+    total = max(
+        Note.objects.filter(user=user).count() + Highlight.objects.filter(user=user).count(),
+        1,
+    )
+    for token, item_type, item_id, weight in rows:
+        idf = math.log(1 + total / document_frequency[token])
+        scores[(item_type, item_id)] += (1 + math.log(weight)) * idf
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+    wanted = defaultdict(list)
+    for (item_type, item_id), _score in ranked:
+        wanted[item_type].append(item_id)
+
+    chapter_fields = ['chapter__id', 'chapter__title', 'chapter__slug', 'chapter__order']
+    items = {}
+    for model, item_type in ITEM_TYPES.items():
+        if not wanted[item_type]:
+            continue
+        fields = [field for field, _ in FIELDS[model]]
+        queryset = (
+            model.objects.filter(user=user, id__in=wanted[item_type])
+            .values('id', 'book_id', 'page_number', 'created_at', *fields, *chapter_fields)
+        )
+        for row in queryset:
+            items[(item_type, row['id'])] = (fields, row)
+
+    books = hydrate_books(row['book_id'] for _, row in items.values())
+    results = []
+    for key, score in ranked:
+        if key not in items:
+            continue
+        fields, row = items[key]
+        text = next((row[field] for field in fields if _snippet_hit(row[field], terms)), row[fields[0]])
+        results.append({
+            'type': key[0],
+            'id': row['id'],
+            'score': round(score, 4),
+            'snippet': _snippet(text or '', terms),
+            'page_number': row['page_number'],
+            'created_at': row['created_at'],
+            'book': books.get(row['book_id']),
+            'chapter': {
+                'id': row['chapter__id'],
+                'title': row['chapter__title'],
+                'slug': row['chapter__slug'],
+                'order': row['chapter__order'],
+            } if row['chapter__id'] else None,
+        })
+    return results
@@ -1,53 +1,168 @@
 from rest_framework import serializers
-from .models import ReadingProgress, Highlight, Note, Bookmark
+from apps.books.serializers import BookSummaryField, BookHydratingListSerializer
+from apps.books.models import Chapter
+from apps.books.page_index import locate
+from .models import ReadingProgress, Highlight, Note, Bookmark, SyncTombstone, PopularPassage
 
 
 class ReadingProgressSerializer(serializers.ModelSerializer):
     """Serializer for ReadingProgress model."""
+    book = BookSummaryField()
+    position = serializers.IntegerField(min_value=0, write_only=True, required=False)
     
     class Meta:
         model = ReadingProgress
         fields = [
-            'id', 'book_id', 'current_page', 'current_chapter',
-            'percent_complete', 'last_position', 'last_read_at',
-            'started_at', 'finished_at'
+            'id', 'book_id', 'book', 'current_page', 'current_chapter',
+            'percent_complete', 'last_position', 'position', 'client_updated_at',
+            'last_read_at', 'started_at', 'finished_at'
         ]
-        read_only_fields = ['id', 'last_read_at', 'started_at']
+        list_serializer_class = BookHydratingListSerializer
+        # client_updated_at is only set by the batch sync, where it drives
+        # last-writer-wins; a client must not be able to pin it.
+        read_only_fields = ['id', 'client_updated_at', 'last_read_at', 'started_at']
+    
+    def validate(self, attrs):
+        # A character offset in the current chapter overrides client page maths.
+        position = attrs.pop('position', None)
+        chapter = attrs.get('current_chapter')
+        if position is not None and chapter is not None:
+            located = locate(chapter.id, position)
+            if located is not None:
+                attrs['current_page'] = located.page_number
+                attrs['percent_complete'] = located.percent_complete
+        return attrs
 
 
 class HighlightSerializer(serializers.ModelSerializer):
     """Serializer for Highlight model."""
+    book = BookSummaryField()
     
     class Meta:
         model = Highlight
         fields = [
-            'id', 'book_id', 'chapter', 'text', 'position_start',
+            'id', 'book_id', 'book', 'chapter', 'text', 'position_start',
             'position_end', 'color', 'note', 'page_number',
             'is_public', 'created_at', 'updated_at'
         ]
+        list_serializer_class = BookHydratingListSerializer
         read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate(self, attrs):
+        chapter = attrs.get('chapter')
+        if chapter is not None and 'position_start' in attrs:
+            located = locate(chapter.id, attrs['position_start'])
+            if located is not None:
+                attrs['page_number'] = located.page_number
+        return attrs
 
 
 class NoteSerializer(serializers.ModelSerializer):
     """Serializer for Note model."""
+    book = BookSummaryField()
     
     class Meta:
         model = Note
         fields = [
-            'id', 'book_id', 'chapter', 'title', 'content',
+            'id', 'book_id', 'book', 'chapter', 'title', 'content',
             'page_number', 'highlight', 'is_public', 'is_spoiler',
             'created_at', 'updated_at'
         ]
+        list_serializer_class = BookHydratingListSerializer
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
 class BookmarkSerializer(serializers.ModelSerializer):
     """Serializer for Bookmark model."""
+    book = BookSummaryField()
     
     class Meta:
         model = Bookmark
         fields = [
-            'id', 'book_id', 'chapter', 'page_number', 'position',
-            'note', 'created_at'
+            'id', 'book_id', 'book', 'chapter', 'page_number', 'position',
+            'note', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at']
+        list_serializer_class = BookHydratingListSerializer
+        read_only_fields = ['id', 'created_at', 'updated_at']
+        extra_kwargs = {'page_number': {'required': False}}
+    
+    def validate(self, attrs):
+        chapter = attrs.get('chapter')
+        if chapter is not None and 'position' in attrs:
+            located = locate(chapter.id, attrs['position'])
+            if located is not None:
+                attrs['page_number'] = located.page_number
+        if self.instance is None and 'page_number' not in attrs:
+            raise serializers.ValidationError(
+                {"page_number": "This field is required when the chapter has no page index."}
+            )
+        return attrs
+
+
+class SyncTombstoneSerializer(serializers.ModelSerializer):
+    """Serializer for SyncTombstone model."""
+    
+    class Meta:
+        model = SyncTombstone
+        fields = ['item_type', 'item_id', 'book_id', 'deleted_at']
+        read_only_fields = fields
+
+
+class PopularPassageSerializer(serializers.ModelSerializer):
+    """Serializer for PopularPassage model."""
+    
+    class Meta:
+        model = PopularPassage
+        fields = [
+            'chapter', 'book_id', 'rank', 'position_start', 'position_end',
+            'highlight_count', 'text', 'computed_at'
+        ]
+        read_only_fields = fields
+
+
+class ProgressUpdateSerializer(serializers.Serializer):
+    """A single progress update reported by a device."""
+    book_id = serializers.IntegerField()
+    current_page = serializers.IntegerField(min_value=0, required=False)
+    current_chapter_id = serializers.IntegerField(required=False, allow_null=True)
+    position = serializers.IntegerField(min_value=0, required=False, help_text="Character offset in the current chapter.")
+    percent_complete = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, max_value=100, required=False)
+    last_position = serializers.CharField(required=False, allow_blank=True)
+    finished_at = serializers.DateTimeField(required=False, allow_null=True)
+    client_timestamp = serializers.DateTimeField()
+
+
+class ProgressSyncSerializer(serializers.Serializer):
+    """Batch of progress updates from one device."""
+    updates = ProgressUpdateSerializer(many=True, allow_empty=False, max_length=1000)
+    
+    def validate_updates(self, updates):
+        chapter_ids = {update['current_chapter_id'] for update in updates if update.get('current_chapter_id')}
+        chapter_books = dict(
+            Chapter.objects.filter(id__in=chapter_ids).values_list('id', 'book_id')
+        )
+        for update in updates:
+            chapter_id = update.get('current_chapter_id')
+            if chapter_id and chapter_books.get(chapter_id) != update['book_id']:
+                raise serializers.ValidationError(
+                    f"Chapter {chapter_id} does not belong to book {update['book_id']}."
+                )
+        return updates
+
+
+class LibraryProgressSerializer(serializers.Serializer):
+    """Reading progress embedded in a library entry."""
+    current_page = serializers.IntegerField()
+    current_chapter_id = serializers.IntegerField(allow_null=True)
+    percent_complete = serializers.DecimalField(max_digits=5, decimal_places=2)
+    last_read_at = serializers.DateTimeField()
+    finished_at = serializers.DateTimeField(allow_null=True)
+
+
+class LibraryEntrySerializer(serializers.Serializer):
+    """A book in the user's library."""
+    book_id = serializers.IntegerField()
+    book = serializers.DictField()
+    purchased = serializers.BooleanField()
+    purchased_at = serializers.DateTimeField(allow_null=True)
+    progress = LibraryProgressSerializer(allow_null=True)
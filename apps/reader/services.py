@@ -0,0 +1,185 @@
+"""
+Reading progress sync.
+
+Devices send progress in batches; updates are coalesced per book with
+last-writer-wins on the client timestamp. Each batch locks the user's rows
+for those books, compares timestamps under the lock and writes with one
+bulk update, so concurrent batches cannot overwrite a newer position.
+An optional in-process write-behind buffer absorbs page-turn bursts.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.books.page_index import get_page_indexes
+from .models import ReadingProgress
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FIELDS = [
+    'current_page', 'current_chapter_id', 'percent_complete',
+    'last_position', 'finished_at',
+]
+
+
+def coalesce_progress_updates(updates):
+    """Keep only the newest update per book, keyed by ``client_timestamp``."""
+    latest = {}
+    for update in updates:
+        current = latest.get(update['book_id'])
+        if current is None or update['client_timestamp'] >= current['client_timestamp']:
+            latest[update['book_id']] = update
+    return latest
+
+
+def resolve_positions(updates):
+    """
+    Fill ``current_page`` and ``percent_complete`` from ``position`` offsets.
+
+    Page indexes for every chapter in the batch are fetched at once; updates
+    whose chapter has no index keep the values the device sent.
+    """
+    located = [
+        update for update in updates
+        if update.get('position') is not None and update.get('current_chapter_id')
+    ]
+    if not located:
+        return updates
+    indexes = get_page_indexes((update['current_chapter_id'], None) for update in located)
+    for update in located:
+        index = indexes.get((update['current_chapter_id'], None))
+        if index is not None:
+            position = index.locate(update['position'])
+            update['current_page'] = position.page_number
+            update['percent_complete'] = position.percent_complete
+    return updates
+
+
+def apply_progress_updates(user_id, updates):
+    """
+    Write coalesced progress for one user.
+
+    Missing rows are inserted first (``ON CONFLICT DO NOTHING``), then every
+    row in the batch is locked with ``SELECT ... FOR UPDATE``. Under the lock,
+    updates older than the stored timestamp are dropped, and fields missing
+    from an update keep their stored value. The rest are written with one
+    bulk update. Returns the list of book ids that were written.
+    """
+    latest = coalesce_progress_updates(updates)
+    if not latest:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        ReadingProgress.objects.bulk_create(
+            [ReadingProgress(user_id=user_id, book_id=book_id) for book_id in latest],
+            ignore_conflicts=True,
+        )
+        stored = (
+            ReadingProgress.objects.select_for_update()
+            .filter(user_id=user_id, book_id__in=latest.keys())
+            .order_by('book_id')
+        )
+        rows = []
+        for row in stored:
+            update = latest[row.book_id]
+            if row.client_updated_at is not None and row.client_updated_at > update['client_timestamp']:
+                continue
+            # Fields the device did not send keep their stored value.
+            for field in PROGRESS_FIELDS:
+                if field in update:
+                    setattr(row, field, update[field])
+            row.client_updated_at = update['client_timestamp']
+            row.last_read_at = now
+            rows.append(row)
+        ReadingProgress.objects.bulk_update(rows, PROGRESS_FIELDS + ['client_updated_at', 'last_read_at'])
+    return [row.book_id for row in rows]
+
+
+class ProgressWriteBehindBuffer:
+    """
+    Per-process buffer of pending progress updates.
+
+    Updates are coalesced in memory and flushed in one upsert per user when the
+    buffer grows past ``max_pending`` entries or ``flush_interval`` seconds pass.
+    Anything still buffered when the process dies is lost, which is acceptable
+    for intermediate page turns since the device resends its latest position.
+    """
+
+    def __init__(self, flush_interval=2.0, max_pending=500):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._worker = None
+
+    def add(self, user_id, updates):
+        with self._lock:
+            for update in updates:
+                key = (user_id, update['book_id'])
+                current = self._pending.get(key)
+                if current is None or update['client_timestamp'] >= current['client_timestamp']:
+                    self._pending[key] = update
+            should_flush = (
+                len(self._pending) >= self.max_pending or
+                time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        self._ensure_worker()
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        by_user = {}
+        for (user_id, _book_id), update in pending.items():
+            by_user.setdefault(user_id, []).append(update)
+        for user_id, updates in by_user.items():
+            apply_progress_updates(user_id, updates)
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='progress-write-behind', daemon=True)
+                self._worker.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush buffered reading progress")
+
+
+progress_buffer = ProgressWriteBehindBuffer(
+    flush_interval=getattr(settings, 'READER_PROGRESS_FLUSH_INTERVAL', 2.0),
+    max_pending=getattr(settings, 'READER_PROGRESS_MAX_PENDING', 500),
+)
+
+
+def sync_progress(user_id, updates, write_behind=None):
+    """
+    Entry point for the sync endpoint.
+
+    Returns ``(written_book_ids, buffered)``. With write-behind enabled
+    (``READER_PROGRESS_WRITE_BEHIND``) updates are only buffered here.
+    """
+    if write_behind is None:
+        write_behind = getattr(settings, 'READER_PROGRESS_WRITE_BEHIND', False)
+    updates = resolve_positions(updates)
+    if write_behind:
+        progress_buffer.add(user_id, updates)
+        return [], True
+    return apply_progress_updates(user_id, updates), False
@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Highlight, Note, Bookmark, SyncTombstone
+from .passages import mark_chapters_dirty
+from .search import index_items, unindex_item
+
+ITEM_TYPES = {
+    Highlight: SyncTombstone.ItemType.HIGHLIGHT,
+    Note: SyncTombstone.ItemType.NOTE,
+    Bookmark: SyncTombstone.ItemType.BOOKMARK,
+}
+
+
+@receiver(post_delete, sender=Highlight)
+@receiver(post_delete, sender=Note)
+@receiver(post_delete, sender=Bookmark)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    """Leave a tombstone so offline devices learn about the deletion."""
+    # Nothing to sync when the whole account is being removed.
+    if isinstance(origin, get_user_model()):
+        return
+    SyncTombstone.objects.create(
+        user_id=instance.user_id,
+        item_type=ITEM_TYPES[sender],
+        item_id=instance.pk,
+        book_id=instance.book_id,
+    )
+
+
+@receiver(post_save, sender=Highlight)
+def highlight_saved(sender, instance, **kwargs):
+    """Queue the chapter, and the one it was moved from, for a popular passages refresh."""
+    was_public = getattr(instance, '_loaded_is_public', False)
+    previous_chapter_id = getattr(instance, '_loaded_chapter_id', None)
+    chapter_ids = []
+    if instance.chapter_id and (instance.is_public or was_public):
+        chapter_ids.append(instance.chapter_id)
+    if previous_chapter_id and previous_chapter_id != instance.chapter_id and was_public:
+        chapter_ids.append(previous_chapter_id)
+    if chapter_ids:
+        mark_chapters_dirty(chapter_ids)
+    instance._loaded_is_public = instance.is_public
+    instance._loaded_chapter_id = instance.chapter_id
+
+
+@receiver(post_delete, sender=Highlight)
+def highlight_deleted(sender, instance, **kwargs):
+    if instance.chapter_id and instance.is_public:
+        mark_chapters_dirty([instance.chapter_id])
+
+
+@receiver(post_save, sender=Highlight)
+@receiver(post_save, sender=Note)
+def update_search_index(sender, instance, **kwargs):
+    index_items([instance])
+
+
+@receiver(post_delete, sender=Highlight)
+@receiver(post_delete, sender=Note)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_item(instance)
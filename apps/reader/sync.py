@@ -0,0 +1,129 @@
+"""
+Delta sync for highlights, notes and bookmarks.
+
+The sync token is a signed set of ``(updated_at, id)`` cursors, one per
+stream. Each request walks the ``(user, updated_at, id)`` indexes forward from
+those cursors, so a sync costs O(changes) regardless of library size.
+Deletions are read from ``SyncTombstone`` rows written on delete.
+
+``updated_at`` is stamped when a row is saved, not when its transaction
+commits. A slow transaction can therefore commit a row behind a cursor that
+has already moved past it. To avoid that, a sync only returns rows older than
+a safety lag (``READER_SYNC_LAG_SECONDS``), and cursors never move past
+``now - lag``. A change reaches other devices after that delay. It is never
+skipped unless its transaction stays open longer than the lag.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Highlight, Note, Bookmark, SyncTombstone
+
+TOKEN_SALT = 'reader.sync'
+DEFAULT_LIMIT = 500
+
+STREAMS = {
+    'highlights': (Highlight, 'updated_at'),
+    'notes': (Note, 'updated_at'),
+    'bookmarks': (Bookmark, 'updated_at'),
+    'deleted': (SyncTombstone, 'deleted_at'),
+}
+
+
+class InvalidSyncToken(Exception):
+    """Raised when a sync token is malformed, tampered with or expired."""
+
+
+def sync_lag():
+    return timedelta(seconds=getattr(settings, 'READER_SYNC_LAG_SECONDS', 10))
+
+
+def tombstone_retention():
+    return timedelta(days=getattr(settings, 'READER_SYNC_TOMBSTONE_DAYS', 90))
+
+
+def encode_token(cursors, book_id=None):
+    return signing.dumps(
+        {
+            'issued': timezone.now().isoformat(),
+            'book_id': book_id,
+            'cursors': {
+                name: [moment.isoformat(), pk] if moment else None
+                for name, (moment, pk) in cursors.items()
+            },
+        },
+        salt=TOKEN_SALT,
+    )
+
+
+def decode_token(token, book_id=None):
+    """
+    Return ``{stream: (datetime, id)}`` cursors for ``token``. The token must
+    have been issued for the same ``book_id`` filter; its cursors say nothing
+    about other books.
+    """
+    if not token:
+        return {name: (None, 0) for name in STREAMS}
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        raise InvalidSyncToken("Invalid sync token.")
+
+    # Tombstones older than the retention window may have been purged, so a
+    # client that has been away longer must do a full resync.
+    issued = parse_datetime(payload.get('issued', ''))
+    if issued is None or issued < timezone.now() - tombstone_retention():
+        raise InvalidSyncToken("Sync token has expired.")
+    if payload.get('book_id') != book_id:
+        raise InvalidSyncToken("Sync token was issued for a different book_id filter.")
+
+    cursors = {}
+    for name in STREAMS:
+        cursor = payload.get('cursors', {}).get(name)
+        cursors[name] = (parse_datetime(cursor[0]), cursor[1]) if cursor else (None, 0)
+    return cursors
+
+
+def _changes_since(model, time_field, user, cursor, limit, horizon, book_id=None):
+    moment, pk = cursor
+    queryset = model.objects.filter(user=user, **{f'{time_field}__lte': horizon})
+    if book_id is not None:
+        queryset = queryset.filter(book_id=book_id)
+    if moment is not None:
+        queryset = queryset.filter(
+            Q(**{f'{time_field}__gt': moment}) |
+            Q(**{time_field: moment, 'id__gt': pk})
+        )
+    rows = list(queryset.order_by(time_field, 'id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = (getattr(rows[-1], time_field), rows[-1].id) if rows else cursor
+    return rows, next_cursor, has_more
+
+
+def changes_since(user, token=None, limit=DEFAULT_LIMIT, book_id=None):
+    """
+    Collect changes for ``user`` since ``token``.
+
+    Returns ``(changes, next_token, has_more)`` where ``changes`` maps each
+    stream name to its rows in ``(updated_at, id)`` order. Clients keep
+    calling with ``next_token`` while ``has_more`` is true. Tokens are bound to
+    their ``book_id`` filter; using one with another filter raises
+    ``InvalidSyncToken``.
+    """
+    cursors = decode_token(token, book_id)
+    horizon = timezone.now() - sync_lag()
+    changes = {}
+    has_more = False
+    for name, (model, time_field) in STREAMS.items():
+        rows, cursors[name], more = _changes_since(
+            model, time_field, user, cursors[name], limit, horizon, book_id=book_id
+        )
+        changes[name] = rows
+        has_more = has_more or more
+    return changes, encode_token(cursors, book_id), has_more
@@ -1 +1,20 @@
-urlpatterns = []
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import (
+    ReadingProgressViewSet, HighlightViewSet, NoteViewSet, BookmarkViewSet, DeltaSyncView,
+    PopularPassageViewSet, LibraryView, SearchView
+)
+
+router = DefaultRouter()
+router.register(r'progress', ReadingProgressViewSet, basename='reading-progress')
+router.register(r'highlights', HighlightViewSet, basename='highlight')
+router.register(r'notes', NoteViewSet, basename='note')
+router.register(r'bookmarks', BookmarkViewSet, basename='bookmark')
+router.register(r'popular-passages', PopularPassageViewSet, basename='popular-passage')
+
+urlpatterns = [
+    path('sync/', DeltaSyncView.as_view(), name='reader-sync'),
+    path('library/', LibraryView.as_view(), name='reader-library'),
+    path('search/', SearchView.as_view(), name='reader-search'),
+    path('', include(router.urls)),
+]
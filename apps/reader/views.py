@@ -1,3 +1,197 @@
-from django.shortcuts import render
+from rest_framework import viewsets, views, generics, status
+from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.exceptions import PermissionDenied
+from django.db.models import Q
+from apps.marketplace.entitlements import can_read, readable_book_ids
+from .models import ReadingProgress, Highlight, Note, Bookmark, PopularPassage
+from .serializers import (
+    ReadingProgressSerializer, ProgressSyncSerializer,
+    HighlightSerializer, NoteSerializer, BookmarkSerializer, SyncTombstoneSerializer,
+    PopularPassageSerializer, LibraryEntrySerializer
+)
+from .services import sync_progress
+from .sync import changes_since, InvalidSyncToken, DEFAULT_LIMIT
+from .library import library_entries, hydrate_entries
+from .search import search
 
-# Create your views here.
+
+class UserOwnedViewSet(viewsets.ModelViewSet):
+    """Base ViewSet for reader models scoped to the current user."""
+    permission_classes = [IsAuthenticated]
+    model = None
+    
+    def get_queryset(self):
+        queryset = self.model.objects.filter(user=self.request.user)
+        book_id = self.request.query_params.get('book_id')
+        if book_id:
+            queryset = queryset.filter(book_id=book_id)
+        return queryset
+    
+    def perform_create(self, serializer):
+        if not can_read(self.request.user, serializer.validated_data['book_id']):
+            raise PermissionDenied("You do not have access to this book.")
+        serializer.save(user=self.request.user)
+
+
+class ReadingProgressViewSet(UserOwnedViewSet):
+    """ViewSet for the current user's reading progress."""
+    model = ReadingProgress
+    serializer_class = ReadingProgressSerializer
+    
+    def get_queryset(self):
+        return super().get_queryset().order_by('-last_read_at')
+    
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Apply a batch of progress updates from one device.
+        
+        Updates are coalesced per book with last-writer-wins on
+        ``client_timestamp`` and written with one bulk upsert.
+        """
+        serializer = ProgressSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updates = serializer.validated_data['updates']
+        book_ids = {update['book_id'] for update in updates}
+        if book_ids - readable_book_ids(request.user, book_ids):
+            raise PermissionDenied("You do not have access to every book in this batch.")
+        
+        written, buffered = sync_progress(request.user.id, updates)
+        if buffered:
+            return Response({"buffered": True}, status=status.HTTP_202_ACCEPTED)
+        
+        progress = ReadingProgress.objects.filter(user=request.user, book_id__in=book_ids)
+        return Response({
+            "written": written,
+            "progress": ReadingProgressSerializer(progress, many=True).data,
+        })
+
+
+class HighlightViewSet(UserOwnedViewSet):
+    """ViewSet for the current user's highlights."""
+    model = Highlight
+    serializer_class = HighlightSerializer
+
+
+class NoteViewSet(UserOwnedViewSet):
+    """ViewSet for the current user's notes."""
+    model = Note
+    serializer_class = NoteSerializer
+
+
+class BookmarkViewSet(UserOwnedViewSet):
+    """ViewSet for the current user's bookmarks."""
+    model = Bookmark
+    serializer_class = BookmarkSerializer
+
+
+class PopularPassageViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Most highlighted passages, filtered by ``chapter`` or ``book_id``.
+    
+    Passages quote chapter text, so they are only served from published
+    chapters that are free or belong to a book the reader may read.
+    """
+    serializer_class = PopularPassageSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+    
+    def get_queryset(self):
+        chapter = self.request.query_params.get('chapter')
+        book_id = self.request.query_params.get('book_id')
+        if chapter:
+            queryset = PopularPassage.objects.filter(chapter_id=chapter)
+        elif book_id:
+            queryset = PopularPassage.objects.filter(book_id=book_id)
+        else:
+            return PopularPassage.objects.none()
+        queryset = queryset.filter(chapter__is_published=True)
+        readable = readable_book_ids(self.request.user, queryset.values_list('book_id', flat=True).distinct())
+        return queryset.filter(Q(book_id__in=readable) | Q(chapter__is_free=True))
+
+
+class DeltaSyncView(views.APIView):
+    """
+    Return highlights, notes and bookmarks changed since a sync token,
+    plus tombstones for deleted ones.
+    
+    Call without ``token`` for a full sync, then pass back ``token`` from each
+    response. Keep paging while ``has_more`` is true.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', DEFAULT_LIMIT)), DEFAULT_LIMIT)
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        book_id = request.query_params.get('book_id')
+        try:
+            book_id = int(book_id) if book_id else None
+        except ValueError:
+            return Response(
+                {"error": "book_id must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            changes, token, has_more = changes_since(
+                request.user,
+                token=request.query_params.get('token'),
+                limit=max(limit, 1),
+                book_id=book_id,
+            )
+        except (InvalidSyncToken, ValueError) as exc:
+            return Response(
+                {"error": str(exc), "resync": True},
+                status=status.HTTP_410_GONE
+            )
+        
+        return Response({
+            "highlights": HighlightSerializer(changes['highlights'], many=True).data,
+            "notes": NoteSerializer(changes['notes'], many=True).data,
+            "bookmarks": BookmarkSerializer(changes['bookmarks'], many=True).data,
+            "deleted": SyncTombstoneSerializer(changes['deleted'], many=True).data,
+            "token": token,
+            "has_more": has_more,
+        })
+
+
+class LibraryView(generics.GenericAPIView):
+    """
+    The current user's library: purchased books and books in progress,
+    with reading progress and cover data, most recently active first.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = LibraryEntrySerializer
+    
+    def get(self, request):
+        entries = library_entries(request.user)
+        page = self.paginate_queryset(entries)
+        serializer = self.get_serializer(hydrate_entries(page), many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class SearchView(views.APIView):
+    """Search the current user's notes and highlights."""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {"error": "Query parameter 'q' is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            book_id = int(request.query_params['book_id']) if request.query_params.get('book_id') else None
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response(
+                {"error": "book_id and limit must be integers."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        results = search(request.user, query, book_id=book_id, limit=max(limit, 1))
+        return Response({"query": query, "results": results})
@@ -0,0 +1,97 @@
+"""
+Per-book rating histograms.
+
+``BookRatingHistogram`` holds the number of 1-5 star reviews and ratings of
+each book plus the sum of their stars. Signals move a single rating between
+buckets with ``F()`` increments as reviews and ratings are created, edited
+and deleted, so reads never aggregate the review tables. Writes that bypass
+signals (``bulk_create``, ``update()``, raw SQL) are reconciled by
+``rebuild_histograms``.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import BookRatingHistogram, Rating, Review
+
+STARS = range(1, 6)
+BATCH_SIZE = 1000
+
+
+def _bucket(stars):
+    return f"stars_{stars}"
+
+
+def adjust_histogram(book_id, old_rating=None, new_rating=None):
+    """Move one rating of ``book_id`` from ``old_rating`` to ``new_rating`` (either may be None)."""
+    if old_rating == new_rating:
+        return
+    changes = defaultdict(int)
+    if old_rating in STARS:
+        changes[old_rating] -= 1
+    if new_rating in STARS:
+        changes[new_rating] += 1
+    if not changes:
+        return
+    # Clamped so a row that missed an earlier increment never goes negative.
+    updates = {_bucket(stars): Greatest(F(_bucket(stars)) + delta, 0) for stars, delta in changes.items()}
+    updates['rating_sum'] = Greatest(F('rating_sum') + sum(stars * delta for stars, delta in changes.items()), 0)
+    BookRatingHistogram.objects.bulk_create([BookRatingHistogram(book_id=book_id)], ignore_conflicts=True)
+    BookRatingHistogram.objects.filter(book_id=book_id).update(**updates)
+
+
+def histogram_data(histogram):
+    """Serializable form of a histogram (or of an empty one for ``None``)."""
+    counts = {str(stars): getattr(histogram, _bucket(stars), 0) for stars in STARS}
+    total = sum(counts.values())
+    rating_sum = histogram.rating_sum if histogram else 0
+    return {
+        'counts': counts,
+        'total': total,
+        'sum': rating_sum,
+        'average': round(rating_sum / total, 2) if total else 0,
+    }
+
+
+def rating_histogram(book_id):
+    """Histogram data for one book, with a single primary-key lookup."""
+    return histogram_data(BookRatingHistogram.objects.filter(book_id=book_id).first())
+
+
+def rebuild_histograms(book_ids=None):
+    """
+    Recount histograms from the review and rating tables, for ``book_ids`` or
+    every book. Returns the number of histograms written.
+    """
+    totals = defaultdict(lambda: defaultdict(int))
+    for model in (Review, Rating):
+        rows = model.objects.filter(rating__in=STARS)
+        if book_ids is not None:
+            rows = rows.filter(book_id__in=book_ids)
+        for row in rows.values('book_id', 'rating').annotate(count=Count('id')).order_by():
+            totals[row['book_id']][row['rating']] += row['count']
+
+    histograms = [
+        BookRatingHistogram(
+            book_id=book_id,
+            rating_sum=sum(stars * count for stars, count in counts.items()),
+            **{_bucket(stars): counts[stars] for stars in STARS},
+        )
+        for book_id, counts in totals.items()
+    ]
+    stale = BookRatingHistogram.objects.all()
+    if book_ids is not None:
+        stale = stale.filter(book_id__in=book_ids)
+    with transaction.atomic():
+        stale.exclude(book_id__in=totals.keys()).delete()
+        BookRatingHistogram.objects.bulk_create(
+            histograms,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['book_id'],
+            update_fields=[_bucket(stars) for stars in STARS] + ['rating_sum', 'updated_at'],
+        )
+    return len(histograms)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.reviews.histograms import rebuild_histograms
+
+
+class Command(BaseCommand):
+    help = "Recount per-book rating histograms from reviews and ratings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--book', type=int, action='append', dest='book_ids', help="Only rebuild these books.")
+
+    def handle(self, *args, **options):
+        written = rebuild_histograms(book_ids=options['book_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} rating histograms."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.reviews.ranking import refresh_scores
+
+
+class Command(BaseCommand):
+    help = "Recompute review helpfulness scores that have drifted from their votes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        updated = refresh_scores(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} review scores."))
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:34
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 2000
+
+
+def _flush(ReviewVote, User, votes):
+    existing = set(User.objects.filter(id__in={user_id for _, user_id in votes}).values_list('id', flat=True))
+    ReviewVote.objects.bulk_create(
+        [ReviewVote(review_id=review_id, user_id=user_id) for review_id, user_id in votes if user_id in existing],
+        ignore_conflicts=True,
+    )
+
+
+def backfill_votes(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    ReviewVote = apps.get_model('reviews', 'ReviewVote')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    votes = set()
+    reviews = Review.objects.values_list('id', 'helpful_votes')
+    for review_id, user_ids in reviews.iterator(chunk_size=BATCH_SIZE):
+        for user_id in user_ids if isinstance(user_ids, list) else []:
+            if isinstance(user_id, int) or (isinstance(user_id, str) and user_id.isdigit()):
+                votes.add((review_id, int(user_id)))
+        if len(votes) >= BATCH_SIZE:
+            _flush(ReviewVote, User, votes)
+            votes = set()
+    if votes:
+        _flush(ReviewVote, User, votes)
+
+    # The counter now reflects the deduplicated votes of users that still exist.
+    counts = (
+        ReviewVote.objects.filter(review=OuterRef('pk'))
+        .values('review')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Review.objects.update(helpful_count=Coalesce(Subquery(counts), 0))
+
+
+def restore_votes(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    ReviewVote = apps.get_model('reviews', 'ReviewVote')
+
+    by_review = {}
+    for review_id, user_id in ReviewVote.objects.order_by('review_id', 'id').values_list('review_id', 'user_id'):
+        by_review.setdefault(review_id, []).append(user_id)
+    reviews = []
+    for review in Review.objects.filter(id__in=by_review.keys()).only('id'):
+        review.helpful_votes = by_review[review.id]
+        reviews.append(review)
+    Review.objects.bulk_update(reviews, ['helpful_votes'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_reviewvote'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_votes, restore_votes),
+    ]
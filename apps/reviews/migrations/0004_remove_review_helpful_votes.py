@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:34
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_backfill_review_votes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='review',
+            name='helpful_votes',
+        ),
+    ]
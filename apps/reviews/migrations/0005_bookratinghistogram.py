@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:37
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def backfill_histograms(apps, schema_editor):
+    BookRatingHistogram = apps.get_model('reviews', 'BookRatingHistogram')
+    totals = defaultdict(lambda: defaultdict(int))
+    for model_name in ('Review', 'Rating'):
+        model = apps.get_model('reviews', model_name)
+        rows = (
+            model.objects.filter(rating__in=range(1, 6))
+            .values('book_id', 'rating')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            totals[row['book_id']][row['rating']] += row['count']
+    BookRatingHistogram.objects.bulk_create(
+        [
+            BookRatingHistogram(
+                book_id=book_id,
+                rating_sum=sum(stars * count for stars, count in counts.items()),
+                **{f'stars_{stars}': counts[stars] for stars in range(1, 6)},
+            )
+            for book_id, counts in totals.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_remove_review_helpful_votes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookRatingHistogram',
+            fields=[
+                ('book_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Book Rating Histogram',
+                'verbose_name_plural': 'Book Rating Histograms',
+            },
+        ),
+        migrations.RunPython(backfill_histograms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:38
+
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+# Frozen copy of apps.reviews.ranking.helpfulness_score as of this migration;
+# later formula changes are applied with refresh_scores.
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+Z = 1.96
+UNHELPFUL_PRIOR = 2
+VOTE_WEIGHT = 100
+
+
+def _score(helpful_count, created_at, half_life):
+    total = helpful_count + UNHELPFUL_PRIOR
+    phat = helpful_count / total
+    spread = Z * math.sqrt((phat * (1 - phat) + Z * Z / (4 * total)) / total)
+    quality = (phat + Z * Z / (2 * total) - spread) / (1 + Z * Z / total)
+    return round(math.log2(1 + VOTE_WEIGHT * quality) + (created_at - EPOCH) / half_life, 9)
+
+
+def backfill_scores(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    half_life = timedelta(days=getattr(settings, 'REVIEWS_SCORE_HALF_LIFE_DAYS', 30))
+    reviews = []
+    for review in Review.objects.only('id', 'helpful_count', 'created_at').iterator(chunk_size=BATCH_SIZE):
+        review.helpfulness_score = _score(review.helpful_count, review.created_at, half_life)
+        reviews.append(review)
+        if len(reviews) >= BATCH_SIZE:
+            Review.objects.bulk_update(reviews, ['helpfulness_score'])
+            reviews = []
+    Review.objects.bulk_update(reviews, ['helpfulness_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_bookratinghistogram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='helpfulness_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['book_id', 'helpfulness_score', 'id'], name='reviews_rev_book_id_87ca3e_idx'),
+        ),
+    ]
@@ -17,18 +17,58 @@ class Review(models.Model):
     is_spoiler = models.BooleanField(default=False)
     is_verified_purchase = models.BooleanField(default=False)
     helpful_count = models.PositiveIntegerField(default=0)
-    helpful_votes = models.JSONField(default=list)  # List of user IDs
+    helpfulness_score = models.FloatField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ['user', 'book_id']
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['book_id', 'helpfulness_score', 'id'])]
         verbose_name = _('Review')
         verbose_name_plural = _('Reviews')
     
     def __str__(self):
         return f"Review by {self.user.email} - Book {self.book_id}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored rating so edits can move it between histogram buckets.
+        if 'book_id' in field_names and 'rating' in field_names:
+            instance._loaded_rating = (instance.book_id, instance.rating)
+        return instance
+    
+    def save(self, *args, **kwargs):
+        from .ranking import helpfulness_score
+        self.helpfulness_score = helpfulness_score(self.helpful_count, self.created_at)
+        super().save(*args, **kwargs)
+
+
+class ReviewVote(models.Model):
+    """A user's "helpful" vote on a review."""
+    review = models.ForeignKey(
+        Review,
+        on_delete=models.CASCADE,
+        related_name='votes'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='review_votes'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['review', 'user'], name='unique_review_vote'),
+        ]
+        indexes = [models.Index(fields=['user', 'review'])]
+        verbose_name = _('Review Vote')
+        verbose_name_plural = _('Review Votes')
+    
+    def __str__(self):
+        return f"Vote by user {self.user_id} on Review {self.review_id}"
 
 
 class Comment(models.Model):
@@ -70,3 +110,30 @@ class Rating(models.Model):
         unique_together = ['user', 'book_id']
         verbose_name = _('Rating')
         verbose_name_plural = _('Ratings')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored rating so edits can move it between histogram buckets.
+        if 'book_id' in field_names and 'rating' in field_names:
+            instance._loaded_rating = (instance.book_id, instance.rating)
+        return instance
+
+
+class BookRatingHistogram(models.Model):
+    """Star distribution of a book's reviews and ratings, maintained incrementally."""
+    book_id = models.IntegerField(primary_key=True)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Book Rating Histogram')
+        verbose_name_plural = _('Book Rating Histograms')
+    
+    def __str__(self):
+        return f"Rating histogram for Book {self.book_id}"
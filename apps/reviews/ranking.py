@@ -0,0 +1,74 @@
+"""
+"Most helpful" ranking for reviews.
+
+``Review.helpfulness_score`` combines the Wilson lower bound of a review's
+helpful votes with its age. Reviews only collect up-votes, so each review is
+treated as having ``UNHELPFUL_PRIOR`` implicit non-votes; one vote then no
+longer counts as a 100% helpful ratio and the bound grows with evidence.
+
+Decay is anchored to a fixed ``EPOCH`` rather than to the current time: every
+half-life a review is younger is worth the same as doubling
+``1 + VOTE_WEIGHT * wilson``. Relative order then never changes as time
+passes, so the stored score stays valid and only needs to be written when
+votes change. ``refresh_scores`` recomputes scores that have drifted, after
+bulk writes or a change to ``REVIEWS_SCORE_HALF_LIFE_DAYS``.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Review
+
+EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+Z = 1.96
+UNHELPFUL_PRIOR = 2
+VOTE_WEIGHT = 100
+DEFAULT_HALF_LIFE_DAYS = 30
+CHUNK_SIZE = 2000
+# Scores of new reviews are computed a moment before ``created_at`` is set.
+TOLERANCE = 1e-6
+
+
+def wilson_lower_bound(positive, total, z=Z):
+    """Lower bound of the Wilson score interval for ``positive`` out of ``total``."""
+    if total <= 0:
+        return 0.0
+    phat = positive / total
+    spread = z * math.sqrt((phat * (1 - phat) + z * z / (4 * total)) / total)
+    return (phat + z * z / (2 * total) - spread) / (1 + z * z / total)
+
+
+def half_life():
+    return timedelta(days=getattr(settings, 'REVIEWS_SCORE_HALF_LIFE_DAYS', DEFAULT_HALF_LIFE_DAYS))
+
+
+def helpfulness_score(helpful_count, created_at=None):
+    quality = wilson_lower_bound(helpful_count, helpful_count + UNHELPFUL_PRIOR)
+    age = ((created_at or timezone.now()) - EPOCH) / half_life()
+    return round(math.log2(1 + VOTE_WEIGHT * quality) + age, 9)
+
+
+def refresh_scores(chunk_size=CHUNK_SIZE):
+    """Rewrite every stored score that differs from its recomputed value; return how many."""
+    updated = 0
+    last_id = 0
+    while True:
+        chunk = list(
+            Review.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'helpful_count', 'created_at', 'helpfulness_score')[:chunk_size]
+        )
+        if not chunk:
+            return updated
+        stale = []
+        for review in chunk:
+            score = helpfulness_score(review.helpful_count, review.created_at)
+            if abs(review.helpfulness_score - score) > TOLERANCE:
+                review.helpfulness_score = score
+                stale.append(review)
+        Review.objects.bulk_update(stale, ['helpfulness_score'])
+        updated += len(stale)
+        last_id = chunk[-1].id
@@ -1,19 +1,24 @@
 from rest_framework import serializers
+from apps.books.serializers import BookSummaryField, BookHydratingListSerializer
 from .models import Review, Comment, Rating
 
 
 class ReviewSerializer(serializers.ModelSerializer):
     """Serializer for Review model."""
+    book = BookSummaryField()
     user_email = serializers.EmailField(source='user.email', read_only=True)
     
     class Meta:
         model = Review
         fields = [
-            'id', 'user', 'user_email', 'book_id', 'rating', 'title',
+            'id', 'user', 'user_email', 'book_id', 'book', 'rating', 'title',
             'content', 'is_spoiler', 'is_verified_purchase', 'helpful_count',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'user', 'helpful_count', 'created_at', 'updated_at']
+        list_serializer_class = BookHydratingListSerializer
+        read_only_fields = [
+            'id', 'user', 'is_verified_purchase', 'helpful_count', 'created_at', 'updated_at'
+        ]
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -28,8 +33,10 @@ class CommentSerializer(serializers.ModelSerializer):
 
 class RatingSerializer(serializers.ModelSerializer):
     """Serializer for Rating model."""
+    book = BookSummaryField()
     
     class Meta:
         model = Rating
-        fields = ['id', 'user', 'book_id', 'rating', 'created_at']
+        fields = ['id', 'user', 'book_id', 'book', 'rating', 'created_at']
+        list_serializer_class = BookHydratingListSerializer
         read_only_fields = ['id', 'user', 'created_at']
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .histograms import adjust_histogram
+from .models import Rating, Review
+
+
+def _track(instance, created):
+    if created:
+        adjust_histogram(instance.book_id, new_rating=instance.rating)
+        instance._loaded_rating = (instance.book_id, instance.rating)
+        return
+    if not hasattr(instance, '_loaded_rating'):
+        # Saved without being loaded first, so the previous rating is unknown;
+        # rebuild_rating_histograms reconciles these.
+        return
+    old_book_id, old_rating = instance._loaded_rating
+    if old_book_id != instance.book_id:
+        adjust_histogram(old_book_id, old_rating=old_rating)
+        adjust_histogram(instance.book_id, new_rating=instance.rating)
+    else:
+        adjust_histogram(instance.book_id, old_rating, instance.rating)
+    instance._loaded_rating = (instance.book_id, instance.rating)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Rating)
+def update_histogram_on_save(sender, instance, created, **kwargs):
+    if kwargs.get('raw'):
+        return
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not {'rating', 'book_id'} & set(update_fields):
+        return
+    _track(instance, created)
+
+
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Rating)
+def update_histogram_on_delete(sender, instance, **kwargs):
+    old_book_id, old_rating = getattr(instance, '_loaded_rating', (instance.book_id, instance.rating))
+    adjust_histogram(old_book_id, old_rating=old_rating)
@@ -1,3 +1,94 @@
-from django.shortcuts import render
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django.shortcuts import get_object_or_404
+from apps.marketplace.entitlements import owns
+from .models import Review
+from .serializers import ReviewSerializer
+from .votes import add_vote, remove_vote, voted_review_ids
 
-# Create your views here.
+
+class HelpfulReviewPagination(CursorPagination):
+    """Cursor pagination over the (book_id, helpfulness_score, id) index."""
+    ordering = ('-helpfulness_score', '-id')
+    page_size = 20
+
+
+class ReviewViewSet(viewsets.ModelViewSet):
+    """ViewSet for book reviews."""
+    serializer_class = ReviewSerializer
+    
+    def get_queryset(self):
+        queryset = Review.objects.select_related('user')
+        book_id = self.request.query_params.get('book_id')
+        if book_id:
+            queryset = queryset.filter(book_id=book_id)
+        return queryset
+    
+    def perform_create(self, serializer):
+        serializer.save(
+            user=self.request.user,
+            is_verified_purchase=owns(self.request.user, serializer.validated_data['book_id']),
+        )
+    
+    def perform_update(self, serializer):
+        if serializer.instance.user_id != self.request.user.id:
+            raise PermissionDenied("You can only edit your own reviews.")
+        serializer.save()
+    
+    def perform_destroy(self, instance):
+        if instance.user_id != self.request.user.id:
+            raise PermissionDenied("You can only delete your own reviews.")
+        instance.delete()
+    
+    @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
+    def helpful(self, request, pk=None):
+        """Vote (POST) or withdraw a vote (DELETE) marking this review helpful."""
+        review = get_object_or_404(Review.objects.only('id', 'user_id'), pk=pk)
+        if review.user_id == request.user.id:
+            return Response(
+                {"error": "You cannot vote on your own review."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if request.method == 'POST':
+            changed = add_vote(review.id, request.user)
+        else:
+            changed = remove_vote(review.id, request.user)
+        helpful_count = Review.objects.filter(pk=review.id).values_list('helpful_count', flat=True).first()
+        return Response({
+            "voted": request.method == 'POST',
+            "changed": changed,
+            "helpful_count": helpful_count,
+        })
+    
+    @action(detail=False, methods=['get'], url_path='my-votes', permission_classes=[IsAuthenticated])
+    def my_votes(self, request):
+        """Which of ``?ids=1,2,3`` the current user voted helpful."""
+        try:
+            review_ids = [int(value) for value in request.query_params.get('ids', '').split(',') if value]
+        except ValueError:
+            return Response(
+                {"error": "ids must be a comma-separated list of review ids."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        voted = voted_review_ids(request.user, review_ids[:200])
+        return Response({str(review_id): review_id in voted for review_id in review_ids[:200]})
+    
+    @action(detail=False, methods=['get'])
+    def top(self, request):
+        """Most helpful reviews of ``?book_id=``, cursor-paginated."""
+        try:
+            book_id = int(request.query_params.get('book_id', ''))
+        except ValueError:
+            return Response(
+                {"error": "book_id is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = Review.objects.select_related('user').filter(book_id=book_id)
+        paginator = HelpfulReviewPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
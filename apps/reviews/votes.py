@@ -0,0 +1,67 @@
+"""
+Helpful votes on reviews.
+
+Votes live in ``ReviewVote`` with a unique ``(review, user)`` constraint, so
+a duplicate vote is rejected by the database. ``Review.helpful_count`` and
+``Review.helpfulness_score`` are rewritten in the same transaction as the
+vote row, only when a row was actually inserted or deleted. The review row is
+locked first so concurrent votes apply their counts one after another.
+"""
+
+from django.db import IntegrityError, transaction
+
+from .models import Review, ReviewVote
+from .ranking import helpfulness_score
+
+
+def _lock_review(review_id):
+    return (
+        Review.objects.select_for_update(no_key=True)
+        .filter(pk=review_id)
+        .values_list('helpful_count', 'created_at')
+        .first()
+    )
+
+
+def _set_count(review_id, helpful_count, created_at):
+    Review.objects.filter(pk=review_id).update(
+        helpful_count=helpful_count,
+        helpfulness_score=helpfulness_score(helpful_count, created_at),
+    )
+
+
+def add_vote(review_id, user):
+    """Record ``user``'s helpful vote; return ``False`` if it already existed."""
+    try:
+        with transaction.atomic():
+            review = _lock_review(review_id)
+            if review is None:
+                return False
+            ReviewVote.objects.create(review_id=review_id, user=user)
+            helpful_count, created_at = review
+            _set_count(review_id, helpful_count + 1, created_at)
+    except IntegrityError:
+        return False
+    return True
+
+
+def remove_vote(review_id, user):
+    """Withdraw ``user``'s helpful vote; return ``False`` if there was none."""
+    with transaction.atomic():
+        review = _lock_review(review_id)
+        if review is None:
+            return False
+        deleted, _ = ReviewVote.objects.filter(review_id=review_id, user=user).delete()
+        if deleted:
+            helpful_count, created_at = review
+            _set_count(review_id, max(helpful_count - 1, 0), created_at)
+    return bool(deleted)
+
+
+def voted_review_ids(user, review_ids):
+    """Return the subset of ``review_ids`` that ``user`` has voted helpful, in one query."""
+    if not user.is_authenticated or not review_ids:
+        return set()
+    return set(
+        ReviewVote.objects.filter(user=user, review_id__in=review_ids).values_list('review_id', flat=True)
+    )